@@ -1,14 +1,26 @@
+import startup_profiler
+startup_profiler.install_from_env()  # antes del resto de imports, para poder medirlos
+
 import streamlit as st
-import pandas as pd
 import os
 import datetime
 import json
-import base64
-from bs4 import BeautifulSoup
-hola estoy provando si esto funcionas
-# Importaciones para la integración con Google Drive
-from pydrive2.auth import GoogleAuth
-from pydrive2.drive import GoogleDrive
+import hashlib
+import itertools
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import db
+import template_engine
+from client_directory import ClientDirectory, paginate
+from draft_cache import DraftCache
+from draft_journal import DraftJournal
+from drive_client import DriveClient
+from drive_metrics import DriveMetrics, InstrumentedBackend
+from drive_scheduler import DriveScheduler, ScheduledBackend
+from drive_index import DriveIndex, split_trainings
+from storage import DriveBackend, LocalBackend, MemoryBackend, NotFoundError, FOLDER_MIME_TYPE
 
 # --- CONFIGURACIÓN DE LA PÁGINA ---
 st.set_page_config(
@@ -21,170 +33,514 @@ st.set_page_config(
 CREDENTIALS_FILE = "credentials.json"
 MAIN_FOLDER_NAME = "JCT Entrenamientos"
 DRAFT_SUFFIX = ".draft.json"
+FOLDER_CACHE_TTL = 300  # segundos que un ID de carpeta se considera válido
+BULK_FINALIZE_WORKERS = 4  # subidas simultáneas al finalizar en bloque
+EXPORT_DIR = os.path.join("database", "exports")
+HTML_DIGEST_PROPERTY = "jct_sha256"  # propiedad del archivo de Drive con el hash del HTML subido
+JOURNAL_PATH = os.path.join("database", "draft_journal.db")
+DRAFT_CACHE_PATH = os.path.join("database", "draft_cache.db")
+INDEX_PATH = os.path.join("database", "drive_index.db")
+INDEX_SYNC_INTERVAL = 2.0  # segundos mínimos entre consultas al feed de cambios
+FINALIZED_PAGE_SIZE = 20  # entrenamientos finalizados que se muestran de entrada (y por cada "Cargar más")
 
 # --- LÓGICA DE GOOGLE DRIVE (MODIFICADA Y AMPLIADA) ---
 
-try:
-    # Mantenemos tu método de configuración de secrets
-    GOOGLE_AUTH_SETTINGS = {
-        "client_config_backend": "settings",
-        "client_config": {
-            "web": {
-                "client_id": st.secrets["client_id"],
-                "client_secret": st.secrets["client_secret"],
-                "auth_uri": st.secrets["auth_uri"],
-                "token_uri": st.secrets["token_uri"],
-                "auth_provider_x509_cert_url": st.secrets["auth_provider_x509_cert_url"],
-                "redirect_uris": st.secrets["redirect_uris"]
-            }
-        },
-        "oauth_scope": ["https://www.googleapis.com/auth/drive"]
-    }
-except KeyError as e:
-    st.error(f"Error: Falta un secreto esencial en la configuración de tu app: {e}")
-    st.info("Por favor, ve a 'Manage app' -> 'Secrets' y asegúrate de que todas las claves de Google (client_id, client_secret, etc.) estén definidas.")
-    st.stop()
+def get_google_auth_settings():
+    """Construye la configuración de PyDrive2 a partir de los secrets de Streamlit."""
+    try:
+        # Mantenemos tu método de configuración de secrets
+        return {
+            "client_config_backend": "settings",
+            "client_config": {
+                "web": {
+                    "client_id": st.secrets["client_id"],
+                    "client_secret": st.secrets["client_secret"],
+                    "auth_uri": st.secrets["auth_uri"],
+                    "token_uri": st.secrets["token_uri"],
+                    "auth_provider_x509_cert_url": st.secrets["auth_provider_x509_cert_url"],
+                    "redirect_uris": st.secrets["redirect_uris"]
+                }
+            },
+            "oauth_scope": ["https://www.googleapis.com/auth/drive"]
+        }
+    except KeyError as e:
+        st.error(f"Error: Falta un secreto esencial en la configuración de tu app: {e}")
+        st.info("Por favor, ve a 'Manage app' -> 'Secrets' y asegúrate de que todas las claves de Google (client_id, client_secret, etc.) estén definidas.")
+        st.stop()
+
+@st.cache_resource
+def get_drive_client():
+    """Cliente de Drive compartido por todas las sesiones del proceso (el token se renueva en segundo plano)."""
+    return DriveClient(get_google_auth_settings(), CREDENTIALS_FILE)
 
 def authenticate_gdrive():
-    """Realiza la autenticación con Google Drive usando el flujo OAuth 2.0."""
+    """Devuelve el cliente de Google Drive compartido; si aún no hay credenciales, muestra el flujo OAuth 2.0."""
     try:
-        gauth = GoogleAuth(settings=GOOGLE_AUTH_SETTINGS)
-        if os.path.exists(CREDENTIALS_FILE):
-            gauth.LoadCredentialsFile(CREDENTIALS_FILE)
-
-        if gauth.credentials is None:
+        client = get_drive_client()
+        drive = client.drive()
+        if drive is None:
             st.warning("Se necesita autorización para acceder a Google Drive.")
-            auth_url = gauth.GetAuthUrl()
+            auth_url = client.auth_url()
             st.markdown(f"**1. Haz clic aquí para autorizar:** [Enlace de Autorización de Google]({auth_url})", unsafe_allow_html=True)
             code = st.text_input("2. Pega el código de autorización que recibiste aquí:")
             if st.button("Autorizar App"):
                 if code:
-                    gauth.Auth(code)
-                    gauth.SaveCredentialsFile(CREDENTIALS_FILE)
+                    client.authorize(code)
                     st.success("¡Autorización exitosa! La página se refrescará para continuar.")
                     st.rerun()
                 else:
                     st.error("El código no puede estar vacío.")
             st.stop()
-
-        elif gauth.access_token_expired:
-            gauth.Refresh()
-            gauth.SaveCredentialsFile(CREDENTIALS_FILE)
-        else:
-            gauth.Authorize()
-
-        return GoogleDrive(gauth)
+        return drive
 
     except Exception as e:
         st.error(f"Error en la autenticación con Google Drive: {e}")
         st.info("Verifica la configuración de 'Secrets' en Streamlit Cloud.")
         return None
 
-def get_or_create_folder(drive, folder_name, parent_id=None):
-    """Busca una carpeta por nombre. Si no existe, la crea. Devuelve el ID de la carpeta."""
-    query = f"title='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-    if parent_id:
-        query += f" and '{parent_id}' in parents"
-
-    file_list = drive.ListFile({'q': query}).GetList()
-    if file_list:
-        return file_list[0]['id']
+# --- BACKEND DE ALMACENAMIENTO ---
+# Toda la persistencia pasa por un backend de storage.py. Por defecto es Google
+# Drive; JCT_STORAGE=local:<directorio> o JCT_STORAGE=memory permiten usar la app
+# sin conexión (y son los que usan los benchmarks).
+
+@st.cache_resource
+def _shared_memory_backend():
+    """Backend en memoria compartido por todas las sesiones del proceso."""
+    return MemoryBackend()
+
+@st.cache_resource
+def get_drive_metrics():
+    """Métricas de llamadas al backend de todo el proceso (JCT_TRACE_PATH añade las trazas a un archivo)."""
+    return DriveMetrics(trace_path=os.environ.get("JCT_TRACE_PATH"))
+
+@st.cache_resource
+def get_drive_scheduler():
+    """Ritmo, reintentos y deduplicación de las llamadas a Drive de todo el proceso."""
+    return DriveScheduler()
+
+def open_storage():
+    """Devuelve el backend configurado en JCT_STORAGE, o None si falla la autenticación.
+
+    Cada llamada pasa por el planificador (que reintenta) y después por las
+    métricas, así que cada intento queda registrado por separado.
+    """
+    spec = os.environ.get("JCT_STORAGE", "drive")
+    if spec.startswith("local:"):
+        backend = LocalBackend(spec[len("local:"):])
+    elif spec == "memory":
+        backend = _shared_memory_backend()
     else:
-        folder_metadata = {'title': folder_name, 'mimeType': 'application/vnd.google-apps.folder'}
-        if parent_id:
-            folder_metadata['parents'] = [{'id': parent_id}]
-        folder = drive.CreateFile(folder_metadata)
-        folder.Upload()
-        return folder['id']
-
-def list_clients(drive):
-    """Devuelve una lista con los nombres de las carpetas de clientes."""
-    main_folder_id = get_or_create_folder(drive, MAIN_FOLDER_NAME)
-    query = f"'{main_folder_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
-    client_folders = drive.ListFile({'q': query}).GetList()
-    return sorted([folder['title'] for folder in client_folders])
-
-def create_client(drive, client_name):
+        drive = authenticate_gdrive()
+        if not drive:
+            return None
+        backend = DriveBackend(drive, http_pool=get_drive_client().http)
+    return ScheduledBackend(InstrumentedBackend(backend, get_drive_metrics()), get_drive_scheduler())
+
+# --- CACHÉ DE CARPETAS ---
+# Cada helper de Drive necesita el ID de la carpeta principal y el de la carpeta
+# del cliente. Guardamos esos IDs en la sesión, indexados por (parent_id, título),
+# para no repetir dos búsquedas en Drive en cada rerun de Streamlit.
+
+def _folder_cache():
+    """Devuelve el diccionario de la sesión con los IDs de carpeta ya resueltos."""
+    if 'folder_cache' not in st.session_state:
+        st.session_state.folder_cache = {}
+    return st.session_state.folder_cache
+
+def invalidate_folder_cache(folder_id=None, cache=None):
+    """Olvida una carpeta (y las subcarpetas resueltas dentro de ella). Sin ID, vacía el caché."""
+    cache = _folder_cache() if cache is None else cache
+    if folder_id is None:
+        cache.clear()
+        return
+    for key, (cached_id, _) in list(cache.items()):
+        if cached_id == folder_id or key[0] == folder_id:
+            del cache[key]
+
+def get_or_create_folder(storage, folder_name, parent_id=None, cache=None):
+    """Busca una carpeta por nombre. Si no existe, la crea. Devuelve el ID de la carpeta.
+
+    Por defecto usa el caché de la sesión; los hilos en segundo plano pasan su propio diccionario.
+    """
+    cache = _folder_cache() if cache is None else cache
+    key = (parent_id, folder_name)
+    cached = cache.get(key)
+    if cached and time.monotonic() - cached[1] < FOLDER_CACHE_TTL:
+        return cached[0]
+
+    folder_id = storage.find_folder(folder_name, parent_id)
+    if folder_id is None:
+        folder_id = storage.create_folder(folder_name, parent_id)['id']
+    cache[key] = (folder_id, time.monotonic())
+    return folder_id
+
+def get_client_folder(storage, client_name, cache=None):
+    """Devuelve el ID de la carpeta del cliente dentro de la carpeta principal."""
+    main_folder_id = get_or_create_folder(storage, MAIN_FOLDER_NAME, cache=cache)
+    return get_or_create_folder(storage, client_name, parent_id=main_folder_id, cache=cache)
+
+def with_client_folder(storage, client_name, operation, cache=None):
+    """Ejecuta operation(client_folder_id). Si Drive responde que la carpeta ya no existe
+    (borrada o en la papelera), invalida el caché y reintenta una vez con el ID actualizado."""
+    client_folder_id = get_client_folder(storage, client_name, cache=cache)
+    try:
+        return operation(client_folder_id)
+    except NotFoundError:
+        invalidate_folder_cache(client_folder_id, cache=cache)
+        return operation(get_client_folder(storage, client_name, cache=cache))
+
+# --- ÍNDICE LOCAL DEL ÁRBOL DE DRIVE ---
+# Los listados de clientes y entrenamientos se leen de un índice SQLite que se
+# mantiene al día con el feed de cambios de Drive (ver drive_index.py).
+
+@st.cache_resource
+def get_drive_index():
+    """Índice del árbol de Drive compartido por todas las sesiones del proceso."""
+    return DriveIndex(INDEX_PATH)
+
+def sync_drive_index(storage):
+    """Aplica los cambios pendientes de Drive al índice y lo devuelve."""
+    index = get_drive_index()
+    main_folder_id = get_or_create_folder(storage, MAIN_FOLDER_NAME)
+    removed = index.sync(storage, main_folder_id, min_interval=INDEX_SYNC_INTERVAL)
+    for folder_id in removed:
+        invalidate_folder_cache(folder_id)
+    return index
+
+@st.cache_resource
+def get_client_directory():
+    """Directorio de clientes del índice; solo se recarga cuando cambian las carpetas de clientes."""
+    index = get_drive_index()
+    return ClientDirectory(index.client_folders, lambda: index.clients_generation)
+
+def list_clients(storage, snapshot=None):
+    """Devuelve una lista con los nombres de las carpetas de clientes.
+
+    Con un snapshot (de walk_tree o DriveIndex.snapshot) se responde sin llamar a Drive.
+    """
+    if snapshot is not None:
+        return sorted(snapshot)
+    return sync_drive_index(storage).clients()
+
+def create_client(storage, client_name):
     """Crea una nueva carpeta de cliente."""
-    main_folder_id = get_or_create_folder(drive, MAIN_FOLDER_NAME)
-    get_or_create_folder(drive, client_name, parent_id=main_folder_id)
+    main_folder_id = get_or_create_folder(storage, MAIN_FOLDER_NAME)
+    # Forzamos una búsqueda real: la carpeta puede haberse borrado o creado fuera de la app.
+    _folder_cache().pop((main_folder_id, client_name), None)
+    folder_id = get_or_create_folder(storage, client_name, parent_id=main_folder_id)
+    get_drive_index().note_file({'id': folder_id, 'title': client_name, 'mimeType': FOLDER_MIME_TYPE, 'parents': [main_folder_id]})
 
-def list_trainings(drive, client_name):
+def list_trainings(storage, client_name, snapshot=None):
     """Devuelve dos listas: una de borradores (.json) y otra de entrenamientos finalizados (.html)."""
-    main_folder_id = get_or_create_folder(drive, MAIN_FOLDER_NAME)
-    client_folder_id = get_or_create_folder(drive, client_name, parent_id=main_folder_id)
-
-    file_list = drive.ListFile({'q': f"'{client_folder_id}' in parents and trashed=false"}).GetList()
-    drafts, finalized = [], []
-    for f in file_list:
-        if f['title'].endswith(DRAFT_SUFFIX):
-            drafts.append(f['title'].replace(DRAFT_SUFFIX, ''))
-        elif f['mimeType'] == 'text/html' or f['title'].endswith('.html'):
-            finalized.append({'title': f['title'], 'alternateLink': f['alternateLink']})
-    return sorted(drafts), sorted(finalized, key=lambda x: x['title'], reverse=True)
-
-def get_draft_data(drive, client_name, draft_name):
+    if snapshot is not None:
+        drafts, finalized = split_trainings(snapshot.get(client_name, {}).get('files', []))
+    else:
+        drafts, finalized = sync_drive_index(storage).trainings(client_name)
+    # Borradores guardados en el journal local que aún no han llegado a Drive
+    drafts = set(drafts) | set(get_draft_journal().pending_drafts(client_name))
+    return sorted(drafts), finalized
+
+def list_trainings_page(storage, client_name, limit):
+    """Borradores y los `limit` finalizados más recientes del cliente, sin leer el resto del historial.
+
+    Devuelve (borradores, finalizados, hay_más).
+    """
+    index = sync_drive_index(storage)
+    drafts = set(index.drafts(client_name)) | set(get_draft_journal().pending_drafts(client_name))
+    newest = list(itertools.islice(index.iter_finalized(client_name), limit + 1))
+    return sorted(drafts), newest[:limit], len(newest) > limit
+
+def get_draft_data(storage, client_name, draft_name):
     """Obtiene el contenido de un archivo de borrador y lo devuelve como un diccionario."""
-    main_folder_id = get_or_create_folder(drive, MAIN_FOLDER_NAME)
-    client_folder_id = get_or_create_folder(drive, client_name, parent_id=main_folder_id)
-    file_name = f"{draft_name}{DRAFT_SUFFIX}"
-
-    file_list = drive.ListFile({'q': f"title='{file_name}' and '{client_folder_id}' in parents and trashed=false"}).GetList()
-    return json.loads(file_list[0].GetContentString()) if file_list else {}
+    pending = get_draft_journal().read(client_name, draft_name)
+    if pending is not None:
+        return pending
+    file_id = get_drive_index().find_file(client_name, f"{draft_name}{DRAFT_SUFFIX}")
+    if file_id is not None:
+        draft_file = {'id': file_id}  # read_draft_file pedirá los metadatos frescos
+    else:
+        draft_file = _find_draft_file(storage, get_client_folder(storage, client_name), draft_name)
+    if draft_file is None:
+        return {}
+    try:
+        data = json.loads(read_draft_file(storage, get_draft_cache(), draft_file))
+    except NotFoundError:
+        return {}
+    # Lo que acabamos de leer ya está en Drive: volver a guardarlo sin cambios no lo sube
+    get_draft_journal().mark_synced(client_name, draft_name, data)
+    return data
+
+def save_draft(storage, client_name, draft_name, data):
+    """Guarda el borrador en el journal local; el hilo de sincronización lo subirá a Drive.
+
+    Devuelve False si el contenido no ha cambiado desde el último guardado.
+    """
+    return get_draft_journal().write(client_name, draft_name, data)
+
+def discard_draft(storage, client_name, draft_name, client_folder_id=None):
+    """Olvida el borrador en el journal y lo borra de Drive si ya se había subido."""
+    # Tras descartarlo del journal ya no puede haber una subida en curso del borrador
+    get_draft_journal().discard(client_name, draft_name)
+    if client_folder_id is None:
+        client_folder_id = get_client_folder(storage, client_name)
+    draft_file = _find_draft_file(storage, client_folder_id, draft_name)
+    if draft_file:
+        storage.delete(draft_file['id'])
+        get_drive_index().note_removed(draft_file['id'])
+        get_draft_cache().discard(draft_file['id'])
+
+def draft_digest(data):
+    """Huella de los campos editables de un borrador (los que faltan cuentan como vacíos)."""
+    fields = {field: data.get(field) or '' for field in db.TRAINING_FIELDS}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()
+
+def open_training_editor(training_name, data, saved):
+    """Abre el editor; saved indica si ya hay un borrador guardado con ese nombre."""
+    st.session_state.training_name = training_name
+    st.session_state.training_data = data
+    # (nombre con el que está guardado el borrador, huella de lo guardado): el autoguardado solo escribe si cambian
+    st.session_state.training_saved = (training_name if saved else None, draft_digest(data))
+    set_page('training_editor')
 
-def save_draft(drive, client_name, draft_name, data):
+def upload_draft(storage, client_name, draft_name, data, cache=None, draft_cache=None):
     """Guarda o actualiza un archivo de borrador (.json) en la carpeta del cliente."""
-    main_folder_id = get_or_create_folder(drive, MAIN_FOLDER_NAME)
-    client_folder_id = get_or_create_folder(drive, client_name, parent_id=main_folder_id)
     file_name = f"{draft_name}{DRAFT_SUFFIX}"
-
-    file_list = drive.ListFile({'q': f"title='{file_name}' and '{client_folder_id}' in parents and trashed=false"}).GetList()
-    draft_file = file_list[0] if file_list else drive.CreateFile({'title': file_name, 'parents': [{'id': client_folder_id}]})
-    draft_file.SetContentString(json.dumps(data, indent=4))
-    draft_file.Upload()
-
-def finalize_training(drive, client_name, training_name, html_content):
-    """Sube el archivo HTML final y elimina el borrador correspondiente."""
-    main_folder_id = get_or_create_folder(drive, MAIN_FOLDER_NAME)
-    client_folder_id = get_or_create_folder(drive, client_name, parent_id=main_folder_id)
-
-    html_file_name = f"{training_name}.html"
-    html_file = drive.CreateFile({'title': html_file_name, 'parents': [{'id': client_folder_id}], 'mimeType': 'text/html'})
-    html_file.SetContentString(html_content, 'utf-8')
-    html_file.Upload()
-
-    draft_file_name = f"{training_name}{DRAFT_SUFFIX}"
-    file_list = drive.ListFile({'q': f"title='{draft_file_name}' and '{client_folder_id}' in parents and trashed=false"}).GetList()
-    if file_list:
-        file_list[0].Delete()
+    content = json.dumps(data, indent=4)
+
+    def upload(client_folder_id):
+        draft_file = _find_draft_file(storage, client_folder_id, draft_name)
+        written = storage.write_text(client_folder_id, file_name, content, file_id=draft_file['id'] if draft_file else None)
+        if draft_cache is not None and written['modifiedDate']:
+            # Quien lo reabra después solo necesitará los metadatos para validar la caché
+            draft_cache.put(written['id'], written['modifiedDate'], content)
+
+    with_client_folder(storage, client_name, upload, cache=cache)
+
+# --- CACHÉ DE CONTENIDO DE BORRADORES ---
+
+@st.cache_resource
+def get_draft_cache():
+    """Caché de borradores (memoria + disco) compartida por todas las sesiones del proceso."""
+    return DraftCache(DRAFT_CACHE_PATH)
+
+def read_draft_file(storage, draft_cache, draft_file):
+    """Contenido de un borrador de Drive, de la caché si la versión coincide.
+
+    draft_file son sus metadatos; si no traen modifiedDate (p. ej. solo el ID que
+    da el índice) se piden con get_metadata, que es mucho más barato que descargarlo.
+    """
+    if not draft_file.get('modifiedDate'):
+        draft_file = storage.get_metadata(draft_file['id'])
+    content = draft_cache.get(draft_file['id'], draft_file['modifiedDate'])
+    if content is None:
+        content = storage.read_text(draft_file['id'])
+        draft_cache.put(draft_file['id'], draft_file['modifiedDate'], content)
+    return content
+
+# --- JOURNAL LOCAL DE BORRADORES ---
+
+@st.cache_resource
+def get_draft_journal():
+    """Journal de borradores compartido por todas las sesiones del proceso."""
+    return DraftJournal(JOURNAL_PATH)
+
+@st.cache_resource
+def _sync_folder_cache():
+    """Caché de carpetas propio del hilo de sincronización (no tiene acceso a la sesión)."""
+    return {}
+
+def start_draft_sync(storage):
+    """Arranca el hilo que sube los borradores pendientes (y los que quedaron de un reinicio)."""
+    cache, draft_cache = _sync_folder_cache(), get_draft_cache()
+    get_draft_journal().start(
+        lambda client, draft, data: upload_draft(storage, client, draft, data, cache=cache, draft_cache=draft_cache)
+    )
+
+def _find_draft_file(storage, client_folder_id, draft_name):
+    """Devuelve los metadatos del borrador en la carpeta del cliente, o None si no existe."""
+    file_list = storage.list_children([client_folder_id], title=f"{draft_name}{DRAFT_SUFFIX}")
+    return file_list[0] if file_list else None
+
+def html_digest(html_content):
+    return hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+
+def _upload_html(storage, client_folder_id, training_name, html_content):
+    """Sube el HTML final a la carpeta del cliente. Devuelve (metadatos, si se ha subido).
+
+    Si ya hay un archivo con ese título se actualiza en su sitio en lugar de crear
+    otro, y si el hash guardado en sus propiedades coincide con el del HTML nuevo
+    no se sube nada.
+    """
+    title = f"{training_name}.html"
+    digest = html_digest(html_content)
+    existing = storage.list_children([client_folder_id], title=title)
+    file_id = None
+    if existing:
+        current = max(existing, key=lambda f: f['modifiedDate'])
+        if current.get('properties', {}).get(HTML_DIGEST_PROPERTY) == digest:
+            return current, False
+        file_id = current['id']
+    html_file = storage.write_text(client_folder_id, title, html_content, mime_type='text/html',
+                                   file_id=file_id, properties={HTML_DIGEST_PROPERTY: digest})
+    return html_file, True
+
+def finalize_training(storage, client_name, training_name, html_content):
+    """Sube el archivo HTML final y elimina el borrador correspondiente.
+
+    Devuelve (enlace, si se ha subido); no se sube si Drive ya tiene ese mismo HTML.
+    """
+    def upload(client_folder_id):
+        return client_folder_id, _upload_html(storage, client_folder_id, training_name, html_content)
+
+    client_folder_id, (html_file, uploaded) = with_client_folder(storage, client_name, upload)
+    if uploaded:
+        get_drive_index().note_file(html_file)
+
+    discard_draft(storage, client_name, training_name, client_folder_id)
+    return html_file['alternateLink'], uploaded
+
+# --- FINALIZACIÓN EN BLOQUE ---
+# Los backends pueden usarse desde varios hilos (PyDrive2 usa un objeto HTTP por
+# hilo), así que las llamadas pueden hacerse desde un pool. Los hilos no tienen acceso a st.session_state, por eso las
+# carpetas se resuelven antes, en el hilo de Streamlit.
+
+def _finalize_draft(storage, journal, draft_cache, client_name, client_folder_id, draft_name, series_path=None):
+    """Descarga un borrador, genera su HTML, lo sube y elimina el borrador. Devuelve el enlace."""
+    data = journal.read(client_name, draft_name)
+    if data is None:
+        draft_file = _find_draft_file(storage, client_folder_id, draft_name)
+        if draft_file is None:
+            raise FileNotFoundError(f"No se encontró el borrador '{draft_name}'.")
+        data = json.loads(read_draft_file(storage, draft_cache, draft_file))
+    html_content = template_engine.render(data, client_name)
+    html_file, _ = _upload_html(storage, client_folder_id, draft_name, html_content)
+    record_training_series(client_name, draft_name, data, series_path)
+    # Tras descartarlo del journal ya no puede haber una subida en curso del borrador
+    journal.discard(client_name, draft_name)
+    draft_file = _find_draft_file(storage, client_folder_id, draft_name)
+    if draft_file:
+        storage.delete(draft_file['id'])
+        draft_cache.discard(draft_file['id'])
     return html_file['alternateLink']
 
+def bulk_finalize(storage, items, max_workers=BULK_FINALIZE_WORKERS, on_progress=None):
+    """Finaliza muchos borradores a la vez.
+
+    items es una colección de pares (cliente, borrador). Cada elemento se procesa en un
+    pool de como mucho max_workers hilos; on_progress(hechos, total, resultado) se llama
+    desde el hilo actual a medida que terminan. Devuelve una lista de resultados, en el
+    mismo orden que items, con las claves 'client', 'draft', 'link' y 'error'.
+    """
+    items = list(dict.fromkeys(items))
+    folder_ids = {client: get_client_folder(storage, client) for client, _ in items}
+    journal, draft_cache, series_path = get_draft_journal(), get_draft_cache(), get_series_db()
+    results = [None] * len(items)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_finalize_draft, storage, journal, draft_cache, client, folder_ids[client], draft, series_path): i
+            for i, (client, draft) in enumerate(items)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            client, draft = items[i]
+            result = {'client': client, 'draft': draft, 'link': None, 'error': None}
+            try:
+                result['link'] = future.result()
+            except Exception as e:
+                result['error'] = str(e)
+            results[i] = result
+            if on_progress:
+                on_progress(done, len(items), result)
+    return results
+
+# --- SERIES Y PROGRESO ---
+# Al finalizar, las series de la sesión se guardan en la base de db.py (la misma
+# que usa googledrive.py), con la sesión identificada por cliente y nombre.
+
+@st.cache_resource
+def get_series_db():
+    """Ruta de la base de series, con las migraciones aplicadas una vez por proceso."""
+    db.migrate()
+    return db.DB_PATH
+
+def record_training_series(client_name, training_name, data, path=None):
+    """Guarda las series de un entrenamiento finalizado (las reemplaza si se vuelve a finalizar)."""
+    db.record_series(f"drive:{client_name}/{training_name}", client_name, data, path=path or get_series_db())
+
+def section_client_progress(client_name):
+    """Volumen semanal, 1RM estimado y tonelaje por ejercicio del cliente."""
+    import training_load  # pandas y NumPy solo se cargan al abrir el progreso
+
+    frame = training_load.load_frame(client_name, get_series_db())
+    if frame.empty:
+        st.info("Todavía no hay series registradas para este cliente. Se guardan al finalizar cada entrenamiento.")
+        return
+    weekly = training_load.weekly_volume(frame).set_index('semana')
+    st.caption("Tonelaje semanal (kg)")
+    st.bar_chart(weekly['tonelaje_kg'])
+    st.caption("Repeticiones semanales")
+    st.bar_chart(weekly['repeticiones'])
+
+    trend = training_load.e1rm_trend(frame)
+    if not trend.empty:
+        exercises = trend['ejercicio'].value_counts().index.tolist()
+        chosen = st.multiselect("1RM estimado (Epley) de:", exercises, default=exercises[:3], key=f"e1rm_{client_name}")
+        chosen_trend = trend[trend['ejercicio'].isin(chosen)]
+        st.line_chart(chosen_trend.pivot(index='semana', columns='ejercicio', values='e1rm_kg'))
+
+    st.caption("Tonelaje por ejercicio")
+    st.dataframe(training_load.tonnage_by_exercise(frame).drop(columns='cliente'), hide_index=True,
+                 use_container_width=True)
+
+# --- DEDUPLICACIÓN DE FINALIZADOS ---
+
+def find_duplicate_trainings(snapshot):
+    """{cliente: [metadatos de las copias sobrantes]} de los HTML finalizados repetidos.
+
+    Dos finalizados son duplicados si tienen el mismo título en la carpeta del
+    cliente; de cada grupo se conserva el modificado más recientemente.
+    """
+    duplicates = {}
+    for client_name, entry in snapshot.items():
+        by_title = {}
+        for f in entry['files']:
+            if f['mimeType'] == 'text/html' or f['title'].endswith('.html'):
+                by_title.setdefault(f['title'], []).append(f)
+        extra = []
+        for files in by_title.values():
+            files.sort(key=lambda f: f['modifiedDate'], reverse=True)
+            extra += files[1:]
+        if extra:
+            duplicates[client_name] = extra
+    return duplicates
+
+def dedupe_finalized(storage, duplicates, max_workers=BULK_FINALIZE_WORKERS):
+    """Borra en paralelo las copias de find_duplicate_trainings. Devuelve (borrados, errores)."""
+    files = [f for extra in duplicates.values() for f in extra]
+    index = get_drive_index()
+    deleted, errors = 0, []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(storage.delete, f['id']): f for f in files}
+        for future in as_completed(futures):
+            f = futures[future]
+            try:
+                future.result()
+            except NotFoundError:
+                pass  # ya no estaba
+            except Exception as e:
+                errors.append(f"{f['title']}: {e}")
+                continue
+            index.note_removed(f['id'])
+            deleted += 1
+    return deleted, errors
+
 # --- LÓGICA DE GENERACIÓN DE HTML ---
 def generate_html_from_template(data, client_name):
     """Rellena la plantilla HTML con los datos del entrenamiento."""
     try:
-        with open("template.html", "r", encoding="utf-8") as f:
-            soup = BeautifulSoup(f, "html.parser")
-
-        # Función para reemplazar texto de forma segura
-        def replace_content(tag_id, content):
-            element = soup.find(id=tag_id)
-            if element:
-                element.string = content
-
-        # Rellenar datos
-        replace_content('client_name', client_name)
-        replace_content('training_day', data.get('dia_semana', 'DÍA'))
-        replace_content('training_date', datetime.datetime.fromisoformat(data['fecha_creacion']).strftime('%Y·%m·%d'))
-
-        # Rellenar áreas de texto, convirtiendo saltos de línea a <br>
-        for key in ['objetivo_sesion', 'warmup_general', 'specific_warmup', 'fuerza', 'trabajo_especifico', 'conditioning', 'anotaciones_coach']:
-            element = soup.find(id=key)
-            if element:
-                element.clear() # Limpia el contenido placeholder
-                element.append(BeautifulSoup(data.get(key, '').replace('\n', '<br/>'), 'html.parser'))
-        
-        return str(soup)
+        # La plantilla se compila una vez por proceso (ver template_engine.py)
+        return template_engine.render(data, client_name)
     except FileNotFoundError:
         st.error("Error: No se encontró el archivo 'template.html'. Asegúrate de que está en la misma carpeta que app.py.")
         return None
@@ -196,6 +552,10 @@ def generate_html_from_template(data, client_name):
 if 'page' not in st.session_state:
     st.session_state.page = 'client_selection'
 
+def show_more(key, count):
+    """Callback de los botones "Cargar más": amplía el número de elementos mostrados."""
+    st.session_state[key] = count
+
 def set_page(page_name):
     st.session_state.page = page_name
 
@@ -207,32 +567,115 @@ def page_client_selection():
     st.markdown("---")
 
     with st.spinner("Cargando clientes desde Google Drive..."):
-        clients = list_clients(st.session_state.drive)
+        sync_drive_index(st.session_state.storage)
+        directory = get_client_directory().refresh()
 
-    if not clients:
+    if not len(directory):
         st.info("Aún no has creado ningún cliente. Los clientes son carpetas en Google Drive.")
     else:
         st.subheader("Selecciona un cliente:")
+        query = st.text_input("🔍 Buscar cliente", key="client_query", placeholder="Nombre o parte del nombre",
+                              on_change=lambda: st.session_state.update(client_page=0))
+        results = directory.search(query)
+        if not results:
+            st.info("Ningún cliente coincide con la búsqueda.")
+        page_items, st.session_state.client_page, pages = paginate(results, st.session_state.get('client_page', 0))
         cols = st.columns(4)
-        for i, client in enumerate(clients):
+        for i, (_, client) in enumerate(page_items):
             if cols[i % 4].button(client, key=f"client_{client}", use_container_width=True):
                 st.session_state.selected_client = client
                 set_page('training_list')
                 st.rerun()
+        if pages > 1:
+            c1, c2, c3 = st.columns([1, 2, 1])
+            if c1.button("◀ Anteriores", disabled=st.session_state.client_page == 0):
+                st.session_state.client_page -= 1
+                st.rerun()
+            c2.caption(f"Página {st.session_state.client_page + 1} de {pages} · {len(results)} clientes")
+            if c3.button("Siguientes ▶", disabled=st.session_state.client_page == pages - 1):
+                st.session_state.client_page += 1
+                st.rerun()
+
+    if len(directory):
+        with st.expander("📊 Resumen de todos los clientes"):
+            section_clients_overview()
 
     st.markdown("---")
     with st.expander("➕ Crear un nuevo cliente"):
         with st.form("new_client_form"):
             new_client_name = st.text_input("Nombre del nuevo cliente (se creará una carpeta):")
             if st.form_submit_button("Crear Cliente"):
-                if new_client_name and new_client_name not in clients:
+                if new_client_name and directory.find(new_client_name) is None:
                     with st.spinner(f"Creando carpeta para '{new_client_name}'..."):
-                        create_client(st.session_state.drive, new_client_name)
+                        create_client(st.session_state.storage, new_client_name)
                     st.success(f"¡Cliente '{new_client_name}' creado!")
                     st.rerun()
                 else:
                     st.warning("El nombre no puede estar vacío o ya existe.")
 
+def section_clients_overview():
+    """Tabla con borradores y finalizados de todos los clientes, a partir de un único snapshot."""
+    snapshot = get_drive_index().snapshot()
+    rows = []
+    for client in list_clients(None, snapshot=snapshot):
+        drafts, finalized = list_trainings(None, client, snapshot=snapshot)
+        modified = [f['modifiedDate'] for f in snapshot[client]['files'] if f['modifiedDate']]
+        rows.append({
+            'Cliente': client,
+            'Borradores': len(drafts),
+            'Finalizados': len(finalized),
+            'Última modificación': max(modified)[:10] if modified else '',
+        })
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+    duplicates = find_duplicate_trainings(snapshot)
+    if duplicates:
+        total = sum(len(extra) for extra in duplicates.values())
+        st.warning(f"Hay {total} entrenamiento(s) finalizado(s) duplicado(s) en {len(duplicates)} cliente(s).")
+        if st.button("🧹 Eliminar duplicados (se conserva la versión más reciente de cada uno)"):
+            with st.spinner("Eliminando duplicados de Google Drive..."):
+                deleted, errors = dedupe_finalized(st.session_state.storage, duplicates)
+            st.success(f"Se han eliminado {deleted} archivo(s) duplicado(s).")
+            for error in errors:
+                st.error(error)
+
+    st.markdown("**🗜️ Exportar todos los clientes a ZIP**")
+    section_export()
+
+def section_export(client_name=None):
+    """Genera (o reanuda) el ZIP de un cliente o de todos y ofrece descargarlo."""
+    scope = client_name or MAIN_FOLDER_NAME
+    include_drafts = st.checkbox("Incluir borradores (.json)", key=f"export_drafts_{scope}")
+    if st.button("Preparar ZIP", key=f"export_{scope}"):
+        import archive_export  # zipfile solo se carga al exportar
+        storage = st.session_state.storage
+        tree = sync_drive_index(storage).snapshot()
+        if client_name is not None:
+            tree = {client_name: tree[client_name]} if client_name in tree else {}
+        zip_path = os.path.join(EXPORT_DIR, scope.replace(os.sep, "_") + ".zip")
+        progress = st.progress(0.0, text="Descargando entrenamientos de Google Drive...")
+
+        def on_progress(done, total):
+            progress.progress(done / total if total else 1.0, text=f"{done} de {total} archivos")
+
+        result = archive_export.export_zip(storage, tree, zip_path, include_drafts=include_drafts, on_progress=on_progress)
+        if result['errors']:
+            st.error(f"No se pudieron descargar {len(result['errors'])} archivo(s). Vuelve a pulsar para reintentar solo esos.")
+            for error in result['errors']:
+                st.caption(error)
+        else:
+            st.session_state[f"export_path_{scope}"] = zip_path
+            st.success(f"ZIP listo: {result['written']} archivo(s) descargado(s), {result['skipped']} reutilizado(s).")
+
+    zip_path = st.session_state.get(f"export_path_{scope}")
+    if zip_path and os.path.exists(zip_path):
+        def read_zip():
+            with open(zip_path, 'rb') as f:
+                return f.read()
+        # Diferido: el ZIP solo se lee al pulsar, no en cada rerun de la página
+        st.download_button("📥 Descargar ZIP", read_zip, file_name=os.path.basename(zip_path), mime="application/zip",
+                           key=f"export_download_{scope}", on_click="ignore")
+
 def page_training_list():
     """Página para ver los entrenamientos (borradores y finalizados) de un cliente."""
     client_name = st.session_state.selected_client
@@ -243,13 +686,14 @@ def page_training_list():
 
     st.title(f"Entrenamientos para: {client_name}")
 
+    shown_key = f"finalized_shown_{client_name}"
+    shown = st.session_state.get(shown_key, FINALIZED_PAGE_SIZE)
     with st.spinner("Cargando entrenamientos..."):
-        drafts, finalized = list_trainings(st.session_state.drive, client_name)
+        drafts, finalized, more = list_trainings_page(st.session_state.storage, client_name, shown)
 
     if st.button("➕ Crear Nuevo Entrenamiento", type="primary", use_container_width=True):
-        st.session_state.training_name = f"Entrenamiento {datetime.date.today().isoformat()}"
-        st.session_state.training_data = {'fecha_creacion': datetime.date.today().isoformat()}
-        set_page('training_editor')
+        open_training_editor(f"Entrenamiento {datetime.date.today().isoformat()}",
+                             {'fecha_creacion': datetime.date.today().isoformat()}, saved=False)
         st.rerun()
 
     st.markdown("---")
@@ -263,9 +707,7 @@ def page_training_list():
             for draft_name in drafts:
                 if st.button(f"Continuar '{draft_name}'", key=f"edit_{draft_name}", use_container_width=True):
                     with st.spinner("Cargando borrador..."):
-                        st.session_state.training_data = get_draft_data(st.session_state.drive, client_name, draft_name)
-                        st.session_state.training_name = draft_name
-                    set_page('training_editor')
+                        open_training_editor(draft_name, get_draft_data(st.session_state.storage, client_name, draft_name), saved=True)
                     st.rerun()
     
     with col2:
@@ -275,6 +717,51 @@ def page_training_list():
         else:
             for final_file in finalized:
                 st.markdown(f"📄 [{final_file['title']}]({final_file['alternateLink']})")
+            if more:
+                st.button("⬇️ Cargar más", key="finalized_more", on_click=show_more,
+                          args=(shown_key, shown + FINALIZED_PAGE_SIZE), use_container_width=True)
+
+    st.markdown("---")
+    if st.toggle("📈 Progreso del cliente", key="progress_mode"):
+        section_client_progress(client_name)
+
+    if st.toggle("📦 Finalizar borradores en bloque", key="bulk_mode"):
+        section_bulk_finalize(client_name, drafts)
+
+    with st.expander("🗜️ Exportar los entrenamientos del cliente a ZIP"):
+        section_export(client_name)
+
+def section_bulk_finalize(client_name, drafts):
+    """Selector de borradores (de uno o varios clientes) para finalizarlos de una vez."""
+    storage = st.session_state.storage
+    other_clients = [c for c in list_clients(storage) if c != client_name]
+    extra_clients = st.multiselect("Incluir también borradores de:", other_clients)
+
+    options = [(client_name, d) for d in drafts]
+    for client in extra_clients:
+        options += [(client, d) for d in list_trainings(storage, client)[0]]
+    if not options:
+        st.info("No hay borradores que finalizar.")
+        return
+
+    selected = st.multiselect("Borradores a finalizar:", options, default=options, format_func=lambda item: f"{item[0]} · {item[1]}")
+    if st.button(f"✅ Finalizar {len(selected)} borradores", type="primary", disabled=not selected):
+        progress = st.progress(0.0, text="Finalizando...")
+        log = st.container()
+
+        def on_progress(done, total, result):
+            progress.progress(done / total, text=f"{done}/{total} finalizados")
+            if result['error']:
+                log.error(f"{result['client']} · {result['draft']}: {result['error']}")
+            else:
+                log.markdown(f"✅ {result['client']} · [{result['draft']}]({result['link']})")
+
+        results = bulk_finalize(storage, selected, on_progress=on_progress)
+        failed = [r for r in results if r['error']]
+        if failed:
+            st.warning(f"{len(results) - len(failed)} finalizados, {len(failed)} con errores.")
+        else:
+            st.success(f"¡{len(results)} entrenamientos finalizados!")
 
 def page_training_editor():
     """Página para crear o editar un entrenamiento."""
@@ -306,45 +793,146 @@ def page_training_editor():
     st.session_state.training_data = data
     st.markdown("---")
 
+    autosave = st.toggle("🔄 Autoguardado", value=True, key="autosave",
+                         help="Guarda el borrador con cada cambio. Solo se sube a Drive cuando el contenido cambia de verdad, agrupando las ediciones seguidas.")
     b1, b2 = st.columns([1, 2])
-    if b1.button("💾 Guardar Borrador", use_container_width=True):
-        if st.session_state.training_name:
-            with st.spinner("Guardando borrador en Google Drive..."):
-                save_draft(st.session_state.drive, client_name, st.session_state.training_name, data)
-            st.toast("¡Borrador guardado!", icon="💾")
+    save_clicked = b1.button("💾 Guardar Borrador", use_container_width=True)
+    finalize_clicked = b2.button("✅ Finalizar y Generar HTML", type="primary", use_container_width=True)
+
+    training_name = st.session_state.training_name
+    saved_name, saved_digest = st.session_state.get('training_saved', (None, None))
+    digest = draft_digest(data)
+    renamed = saved_name is not None and training_name != saved_name
+
+    def store_draft():
+        written = save_draft(st.session_state.storage, client_name, training_name, data)
+        if renamed:
+            # El borrador guardado con el nombre anterior quedaría huérfano en Drive
+            discard_draft(st.session_state.storage, client_name, saved_name)
+        st.session_state.training_saved = (training_name, digest)
+        return written
+
+    if save_clicked:
+        if training_name:
+            if store_draft():
+                st.toast("¡Borrador guardado! Se sincronizará con Google Drive en segundo plano.", icon="💾")
+            else:
+                st.toast("Sin cambios desde el último guardado.", icon="✅")
         else:
             st.warning("El nombre del archivo no puede estar vacío.")
-
-    if b2.button("✅ Finalizar y Generar HTML", type="primary", use_container_width=True):
+    elif autosave and training_name and not finalize_clicked and (digest != saved_digest or renamed):
+        # Solo con cambios reales: abrir el editor o un rerun cualquiera no escribe nada
+        store_draft()
+
+    if st.session_state.training_name and not finalize_clicked:
+        status = get_draft_journal().status(client_name, st.session_state.training_name)
+        if status == 'pending':
+            st.caption("⏳ Cambios guardados, pendientes de subir a Google Drive.")
+        elif status == 'synced':
+            st.caption("✅ Borrador sincronizado con Google Drive.")
+
+    if finalize_clicked:
         if st.session_state.training_name:
             final_html = generate_html_from_template(data, client_name)
             if final_html:
                 with st.spinner("Subiendo HTML a Google Drive..."):
-                    file_link = finalize_training(st.session_state.drive, client_name, st.session_state.training_name, final_html)
+                    file_link, uploaded = finalize_training(st.session_state.storage, client_name, st.session_state.training_name, final_html)
+                record_training_series(client_name, st.session_state.training_name, data)
+                if not uploaded:
+                    st.info("Google Drive ya tenía este entrenamiento con el mismo contenido; no se ha vuelto a subir.")
                 
                 st.success(f"¡Entrenamiento finalizado! [Ver en Google Drive]({file_link})")
-                b64 = base64.b64encode(final_html.encode('utf-8')).decode()
-                st.markdown(f'<a href="data:file/html;base64,{b64}" download="{st.session_state.training_name}.html" class="button">📥 Descargar HTML</a>', unsafe_allow_html=True)
+                st.download_button("📥 Descargar HTML", final_html, file_name=f"{st.session_state.training_name}.html",
+                                   mime="text/html", on_click="ignore")
                 st.balloons()
+                # El siguiente rerun vuelve a la lista: el autoguardado no puede recrear el borrador finalizado
+                for key in ('training_name', 'training_data', 'training_saved'):
+                    st.session_state.pop(key, None)
+                set_page('training_list')
         else:
             st.warning("El nombre del archivo no puede estar vacío para finalizar.")
 
+# --- PANEL DE MÉTRICAS ---
+def sidebar_metrics_panel():
+    """Muestra en la barra lateral las llamadas al backend de esta sesión."""
+    metrics = get_drive_metrics()
+    session_id = st.session_state.session_uid
+    current = metrics.traces(session_id, st.session_state.rerun_count)
+    st.sidebar.caption(f"Este rerun: {len(current)} llamada(s), {sum(t['duration_ms'] for t in current):.0f} ms")
+
+    st.sidebar.markdown("**Llamadas más lentas**")
+    st.sidebar.dataframe(
+        [{'op': t['op'], 'consulta': t['query'], 'ms': t['duration_ms'], 'página': t['page']} for t in metrics.slowest(10, session_id)],
+        hide_index=True,
+    )
+    st.sidebar.markdown("**Percentiles por operación (ms)**")
+    st.sidebar.dataframe([{'op': op, **stats} for op, stats in metrics.percentiles().items()], hide_index=True)
+    st.sidebar.markdown("**Por página**")
+    st.sidebar.dataframe(
+        [{'página': page, 'llamadas': v['calls'], 'ms': round(v['total_ms'])} for page, v in metrics.by_page(session_id).items()],
+        hide_index=True,
+    )
+    scheduler = get_drive_scheduler().stats()
+    st.sidebar.caption(
+        f"Planificador: {scheduler['queue_depth']} en cola, {scheduler['in_flight']} en curso · "
+        f"{scheduler['retries']} reintentos ({scheduler['rate_limited']} por límite de ritmo, "
+        f"{scheduler['server_errors']} por 5xx), {scheduler['gave_up']} abandonadas · "
+        f"{scheduler['throttled']} esperas de turno · {scheduler['deduplicated']} lecturas deduplicadas"
+    )
+    draft_cache = get_draft_cache()
+    st.sidebar.caption(
+        f"Caché de borradores: {draft_cache.hits['memory']} aciertos en memoria, "
+        f"{draft_cache.hits['disk']} en disco, {draft_cache.misses} fallos"
+    )
+    st.sidebar.download_button("⬇️ Exportar trazas (JSONL)", metrics.export_jsonl(), file_name="drive_traces.jsonl", mime="application/x-ndjson")
+
+def sidebar_startup_profile():
+    """Informe del perfilador de arranque (solo con JCT_PROFILE_STARTUP=1)."""
+    profile = startup_profiler.report()
+    with st.sidebar.expander(f"⏱️ Arranque: {profile['import_total_ms']:.0f} ms en imports"):
+        # Tablas en markdown: st.dataframe importaría pandas y falsearía el propio informe
+        st.markdown("| paso | ms |\n|---|---:|\n" + "\n".join(
+            f"| {name} | {ms} |" for name, ms in profile['stages']))
+        st.markdown("| módulo | acumulado | propio |\n|---|---:|---:|\n" + "\n".join(
+            f"| `{name}` | {c} | {s} |" for name, c, s in profile['imports']))
+
 # --- ROUTER PRINCIPAL DE LA APLICACIÓN ---
 def main():
     st.sidebar.title("JCT Training Panel")
-    # Autenticamos al inicio y guardamos el objeto 'drive' en la sesión
-    if 'drive' not in st.session_state:
-        st.session_state.drive = authenticate_gdrive()
+    # Identificamos sesión y rerun para agrupar las métricas de llamadas al backend
+    if 'session_uid' not in st.session_state:
+        st.session_state.session_uid = uuid.uuid4().hex[:8]
+        st.session_state.rerun_count = 0
+    st.session_state.rerun_count += 1
+    get_drive_metrics().begin_rerun(st.session_state.session_uid, st.session_state.rerun_count, st.session_state.page)
+
+    # Abrimos el backend al inicio y lo guardamos en la sesión
+    if 'storage' not in st.session_state:
+        with startup_profiler.stage("open_storage"):
+            st.session_state.storage = open_storage()
     
     # Si la autenticación es exitosa, mostramos la app
-    if st.session_state.drive:
+    if st.session_state.storage:
+        with startup_profiler.stage("start_draft_sync"):
+            start_draft_sync(st.session_state.storage)
+        pending, failed = get_draft_journal().pending_count()
+        if pending:
+            st.sidebar.caption(f"⏳ {pending} borrador(es) pendiente(s) de subir a Drive")
+        if failed:
+            st.sidebar.warning(f"{failed} borrador(es) no se han podido subir; se reintentará automáticamente.")
         pages = {
             'client_selection': page_client_selection,
             'training_list': page_training_list,
             'training_editor': page_training_editor,
         }
         # Ejecuta la función de la página actual
-        pages.get(st.session_state.page, page_client_selection)()
+        with startup_profiler.stage(f"primera carga de {st.session_state.page}"):
+            pages.get(st.session_state.page, page_client_selection)()
+
+        if st.sidebar.toggle("📈 Métricas de Drive", key="show_metrics"):
+            sidebar_metrics_panel()
+        if startup_profiler.enabled():
+            sidebar_startup_profile()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,212 @@
+"""Exportación de los entrenamientos a un archivo ZIP.
+
+Recorre un árbol con el formato de walk_tree / DriveIndex.snapshot (un cliente o
+todo 'JCT Entrenamientos'), descarga los HTML finalizados (y, si se pide, los
+borradores .json) con un número acotado de descargas simultáneas y escribe
+cada entrada en el ZIP en cuanto llega, de modo que en memoria solo hay unos
+pocos archivos a la vez sea cual sea el tamaño del archivo final.
+
+El ZIP se construye en '<destino>.part' y solo se renombra al destino cuando
+todas las entradas se han escrito bien. Cada entrada guarda en su comentario el
+ID y la fecha de modificación del archivo de Drive, así que volver a exportar
+sobre un .part a medias (o sobre un ZIP ya terminado) solo descarga lo que falta.
+
+Un .part que no se llegó a cerrar (el proceso murió) no tiene directorio
+central. Por eso cada entrada terminada se apunta también en el manifiesto
+'<destino>.part.jsonl', con su posición en el archivo: con él se recorta lo que
+quedó a medias y se rehace el directorio central sin volver a descargar nada.
+"""
+import datetime
+import json
+import logging
+import os
+import threading
+import zipfile
+
+from drive_index import DRAFT_SUFFIX
+from storage import iter_downloads
+
+logger = logging.getLogger(__name__)
+
+EXPORT_WORKERS = 4  # descargas simultáneas
+DRAFTS_DIR = "borradores"
+MANIFEST_SUFFIX = ".jsonl"  # junto al .part
+# Lo que no sale de _zip_info y hace falta para rehacer el directorio central
+_MANIFEST_FIELDS = ('header_offset', 'CRC', 'compress_size', 'file_size', 'flag_bits', 'external_attr',
+                    'create_version', 'extract_version')
+
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+def _lock_for(path):
+    """Un lock por archivo de destino: dos sesiones no pueden escribir el mismo ZIP a la vez."""
+    with _path_locks_guard:
+        return _path_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def export_entries(tree, include_drafts=False):
+    """{nombre dentro del ZIP: metadatos} de los archivos a exportar.
+
+    Los HTML van en '<cliente>/<título>' y los borradores en
+    '<cliente>/borradores/<título>'. Si hay títulos repetidos se exporta el más reciente.
+    """
+    entries = {}
+    for client_name in sorted(tree):
+        for f in tree[client_name]['files']:
+            if f['title'].endswith(DRAFT_SUFFIX):
+                if not include_drafts:
+                    continue
+                name = f"{client_name}/{DRAFTS_DIR}/{f['title']}"
+            elif f['mimeType'] == 'text/html' or f['title'].endswith('.html'):
+                name = f"{client_name}/{f['title']}"
+            else:
+                continue
+            if name not in entries or f['modifiedDate'] > entries[name]['modifiedDate']:
+                entries[name] = f
+    return entries
+
+
+def _stamp(f):
+    return f"{f['id']}|{f['modifiedDate']}".encode('utf-8')
+
+
+def _zip_info(name, f):
+    try:
+        modified = datetime.datetime.strptime(f['modifiedDate'][:19], '%Y-%m-%dT%H:%M:%S')
+    except ValueError:
+        modified = datetime.datetime.now()
+    info = zipfile.ZipInfo(name, date_time=modified.timetuple()[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.comment = _stamp(f)
+    return info
+
+
+def _manifest_record(info, end):
+    """Línea del manifiesto de una entrada ya escrita que termina en la posición end."""
+    record = {'name': info.filename, 'stamp': info.comment.decode('utf-8'), 'end': end}
+    record.update((field, getattr(info, field)) for field in _MANIFEST_FIELDS)
+    return record
+
+
+def _read_manifest(manifest_path):
+    records = []
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break  # la última línea puede haber quedado a medias
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def _recover_partial(part_path, manifest_path, entries):
+    """Rehace el .part a partir del manifiesto. Devuelve (zip, registros) o None.
+
+    Recorta lo que haya después de la última entrada apuntada (una entrada a
+    medias o un directorio central viejo) y abre el archivo para añadir: al
+    cerrarse, zipfile escribe el directorio central con las entradas
+    recuperadas y las nuevas.
+    """
+    records = _read_manifest(manifest_path)
+    if not records or any(r['name'] not in entries or r['stamp'].encode('utf-8') != _stamp(entries[r['name']])
+                          for r in records):
+        return None
+    end = records[-1]['end']
+    if os.path.getsize(part_path) < end:
+        return None
+    with open(part_path, 'r+b') as f:
+        f.truncate(end)
+    # Sin directorio central no es un ZIP válido, y en modo 'a' zipfile escribe al final
+    archive = zipfile.ZipFile(part_path, 'a', compression=zipfile.ZIP_DEFLATED)
+    for record in records:
+        info = _zip_info(record['name'], entries[record['name']])
+        for field in _MANIFEST_FIELDS:
+            setattr(info, field, record[field])
+        archive.filelist.append(info)
+        archive.NameToInfo[info.filename] = info
+    return archive, records
+
+
+def _open_partial(part_path, manifest_path, entries):
+    """Abre el ZIP parcial para seguir escribiendo. Devuelve (zip, registros del manifiesto ya exportados).
+
+    Se rehace con el manifiesto (el proceso pudo morir sin cerrarlo, o a mitad de
+    sobrescribir el directorio central); sin manifiesto, p. ej. con un ZIP ya
+    terminado, se usa su directorio central. Si nada de eso sirve, o hay entradas
+    que ya no coinciden con Drive, se empieza de cero: un ZIP no permite
+    reemplazar una entrada.
+    """
+    if os.path.exists(part_path):
+        recovered = _recover_partial(part_path, manifest_path, entries)
+        if recovered:
+            return recovered
+        try:
+            with zipfile.ZipFile(part_path) as archive:
+                infos = sorted(archive.infolist(), key=lambda i: i.header_offset)
+                start_dir = archive.start_dir
+        except zipfile.BadZipFile:
+            logger.warning("El ZIP parcial %s está dañado; se exporta de nuevo", part_path)
+        else:
+            if all(i.filename in entries and i.comment == _stamp(entries[i.filename]) for i in infos):
+                ends = [i.header_offset for i in infos[1:]] + [start_dir]
+                records = [_manifest_record(i, end) for i, end in zip(infos, ends)]
+                return zipfile.ZipFile(part_path, 'a', compression=zipfile.ZIP_DEFLATED), records
+            logger.info("El ZIP parcial %s tiene entradas obsoletas; se exporta de nuevo", part_path)
+        os.remove(part_path)
+    return zipfile.ZipFile(part_path, 'w', compression=zipfile.ZIP_DEFLATED), []
+
+
+def export_zip(storage, tree, zip_path, include_drafts=False, max_workers=EXPORT_WORKERS, on_progress=None):
+    """Exporta el árbol a zip_path. Devuelve {'path', 'written', 'skipped', 'errors'}.
+
+    on_progress(hechos, total) se llama desde el hilo actual tras cada entrada. Si
+    alguna descarga falla el ZIP se queda como '.part' (con todo lo demás ya
+    escrito) y 'path' es None; al repetir la exportación solo se reintenta lo que falta.
+    """
+    with _lock_for(zip_path):
+        return _export_zip(storage, export_entries(tree, include_drafts), zip_path, max_workers, on_progress)
+
+
+def _export_zip(storage, entries, zip_path, max_workers, on_progress):
+    part_path = zip_path + '.part'
+    manifest_path = part_path + MANIFEST_SUFFIX
+    os.makedirs(os.path.dirname(zip_path) or ".", exist_ok=True)
+    if not os.path.exists(part_path):
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)  # de un .part que ya no existe
+        if os.path.exists(zip_path):
+            os.replace(zip_path, part_path)  # un ZIP terminado se reutiliza como punto de partida
+
+    archive, records = _open_partial(part_path, manifest_path, entries)
+    done = {record['name'] for record in records}
+    pending = [name for name in entries if name not in done]
+    result = {'path': None, 'written': 0, 'skipped': len(entries) - len(pending), 'errors': []}
+    total = len(entries)
+    if on_progress:
+        on_progress(result['skipped'], total)
+
+    with archive, open(manifest_path, 'w', encoding='utf-8') as manifest:
+        manifest.writelines(json.dumps(record) + '\n' for record in records)
+        for name, future in iter_downloads(storage, pending, max_workers, file_id=lambda name: entries[name]['id']):
+            try:
+                archive.writestr(_zip_info(name, entries[name]), future.result().encode('utf-8'))
+            except Exception as e:
+                result['errors'].append(f"{name}: {e}")
+            else:
+                result['written'] += 1
+                # Primero los datos de la entrada y después su línea: el manifiesto nunca va por delante
+                archive.fp.flush()
+                manifest.write(json.dumps(_manifest_record(archive.getinfo(name), archive.fp.tell())) + '\n')
+                manifest.flush()
+            if on_progress:
+                on_progress(result['skipped'] + result['written'] + len(result['errors']), total)
+
+    if not result['errors']:
+        os.replace(part_path, zip_path)
+        os.remove(manifest_path)
+        result['path'] = zip_path
+    return result
@@ -0,0 +1,184 @@
+"""Benchmark de llamadas al backend por acción del usuario.
+
+Ejecuta app.py con AppTest contra los backends falsos de storage.py (en memoria,
+con latencia simulada, y directorio local) y recorre el flujo típico del
+entrenador: lista de clientes, crear cliente, abrir sus entrenamientos, crear y
+guardar un borrador, reabrirlo, volver a guardarlo sin cambios, renombrarlo y
+finalizarlo. Para cada acción informa de las llamadas al backend y de la
+latencia simulada que suman. Abrir el editor sin escribir y los reruns tras
+finalizar no deben subir nada, y al final no puede quedar ningún borrador en
+Drive (ni el del nombre anterior ni uno recreado tras finalizar).
+
+Si alguna acción supera su presupuesto de llamadas (BUDGETS) el script termina
+con código 1, para que una regresión en el número de viajes a Drive rompa la CI.
+
+Uso:
+    python benchmarks/bench_backend_calls.py [--latency 0.15]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit as st  # noqa: E402
+from streamlit.logger import set_log_level  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from draft_journal import DraftJournal  # noqa: E402
+from drive_index import DRAFT_SUFFIX  # noqa: E402
+from storage import LocalBackend, MemoryBackend  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "app.py")
+MAIN_FOLDER_NAME = "JCT Entrenamientos"  # el de app.py
+SECRETS = ["client_id", "client_secret", "auth_uri", "token_uri", "auth_provider_x509_cert_url", "redirect_uris"]
+
+# Máximo de llamadas al backend permitidas por acción.
+BUDGETS = {
+    "lista de clientes (arranque en frío)": 4,
+    "lista de clientes (recarga)": 1,
+    "crear cliente": 4,
+    "abrir entrenamientos del cliente": 1,
+    "crear entrenamiento nuevo": 0,
+    "editor sin cambios y sincronizar": 0,
+    "guardar borrador": 0,
+    "sincronizar borrador (segundo plano)": 4,
+    "continuar borrador": 2,
+    "guardar sin cambios y sincronizar": 0,
+    "renombrar borrador y sincronizar": 4,
+    "finalizar entrenamiento": 4,
+    "rerun tras finalizar y sincronizar": 1,
+}
+
+
+class CountingBackend:
+    """Envuelve un backend (p. ej. LocalBackend) para contar sus llamadas como hace MemoryBackend."""
+
+    def __init__(self, backend, latency):
+        self._backend = backend
+        self.latency = latency
+        self.calls = Counter()
+        self.simulated_latency = 0.0
+
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+        if not callable(attr):
+            return attr
+
+        def wrapper(*args, **kwargs):
+            self.calls[name] += 1
+            self.simulated_latency += self.latency
+            return attr(*args, **kwargs)
+        return wrapper
+
+
+def new_app(backend):
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    for key in SECRETS:
+        at.secrets[key] = "benchmark"
+    at.session_state["storage"] = backend
+    return at
+
+
+def click(at, label_prefix):
+    next(b for b in at.button if b.label.startswith(label_prefix)).click().run()
+
+
+def wait_for_sync(timeout=15.0):
+    journal = DraftJournal(os.path.join("database", "draft_journal.db"))
+    deadline = time.monotonic() + timeout
+    while journal.pending_count()[0] and time.monotonic() < deadline:
+        time.sleep(0.1)
+
+
+def run_flow(backend):
+    """Recorre el flujo y devuelve [(acción, llamadas, latencia simulada)]."""
+    st.cache_resource.clear()
+    at = new_app(backend)
+    results = []
+
+    def measure(action, step):
+        calls, latency = sum(backend.calls.values()), backend.simulated_latency
+        step()
+        if at.exception:
+            raise SystemExit(f"Excepción en '{action}': {at.exception[0].value}")
+        results.append((action, sum(backend.calls.values()) - calls, backend.simulated_latency - latency))
+
+    def create_client():
+        next(t for t in at.text_input if t.label.startswith("Nombre del nuevo cliente")).input("Cliente Benchmark")
+        click(at, "Crear Cliente")
+
+    def open_draft():
+        click(at, "⬅️ Volver")
+        click(at, "Continuar")
+
+    measure("lista de clientes (arranque en frío)", at.run)
+    measure("lista de clientes (recarga)", at.run)
+    measure("crear cliente", create_client)
+    measure("abrir entrenamientos del cliente", lambda: at.button(key="client_Cliente Benchmark").click().run())
+    measure("crear entrenamiento nuevo", lambda: click(at, "➕ Crear Nuevo Entrenamiento"))
+    measure("editor sin cambios y sincronizar", lambda: (at.run(), wait_for_sync()))
+    at.text_area[3].input("Back squat 5x5 @ 80kg")
+    measure("guardar borrador", lambda: click(at, "💾 Guardar Borrador"))
+    measure("sincronizar borrador (segundo plano)", wait_for_sync)
+    measure("continuar borrador", open_draft)
+
+    def save_unchanged():
+        click(at, "💾 Guardar Borrador")
+        wait_for_sync()
+    measure("guardar sin cambios y sincronizar", save_unchanged)
+
+    def rename():
+        next(t for t in at.text_input if t.label.startswith("Nombre del archivo")).input("Sesión renombrada").run()
+        wait_for_sync()
+    measure("renombrar borrador y sincronizar", rename)
+    measure("finalizar entrenamiento", lambda: click(at, "✅ Finalizar"))
+    measure("rerun tras finalizar y sincronizar", lambda: (at.run(), wait_for_sync()))
+    return results
+
+
+def leftover_drafts(backend):
+    """Borradores que quedan en Drive del cliente del flujo (todos se finalizaron o renombraron)."""
+    main_folder_id = backend.find_folder(MAIN_FOLDER_NAME)
+    client_folder_id = backend.find_folder("Cliente Benchmark", parent_id=main_folder_id)
+    return [f['title'] for f in backend.list_children([client_folder_id]) if f['title'].endswith(DRAFT_SUFFIX)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.15, help="latencia simulada por llamada (s)")
+    args = parser.parse_args()
+    set_log_level("error")
+
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        backends = {
+            "memoria": MemoryBackend(latency=args.latency),
+            "local": CountingBackend(LocalBackend(os.path.join(workdir, "drive")), args.latency),
+        }
+        for name, backend in backends.items():
+            print(f"\nBackend: {name} (latencia simulada {args.latency * 1000:.0f} ms/llamada)")
+            print(f"{'acción':42} {'llamadas':>8} {'presupuesto':>11} {'latencia':>9}")
+            for action, calls, latency in run_flow(backend):
+                budget = BUDGETS[action]
+                mark = "" if calls <= budget else "  ✗"
+                print(f"{action:42} {calls:8d} {budget:11d} {latency * 1000:7.0f}ms{mark}")
+                if calls > budget:
+                    failures.append(f"{name}: {action} ({calls} > {budget})")
+            drafts = leftover_drafts(backend)
+            if drafts:
+                print(f"✗ borradores que siguen en Drive: {', '.join(drafts)}")
+                failures.append(f"{name}: borradores huérfanos ({len(drafts)})")
+
+    if failures:
+        print("\nComprobaciones fallidas:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark del selector de clientes del asistente de googledrive.py.
+
+Compara, con N clientes en SQLite, lo que costaba preparar el selectbox en cada
+rerun (leer users a un DataFrame y llamar al format_func original, que filtra el
+DataFrame entero por cada opción) con el directorio de client_directory.py
+(recarga solo si cambia users, búsqueda y una página de opciones).
+
+Uso:
+    python benchmarks/bench_client_directory.py [--clients 10000] [--reruns 20]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import db  # noqa: E402
+from client_directory import ClientDirectory, paginate  # noqa: E402
+
+FIRST = ('Ana', 'Carlos', 'José', 'María', 'Lucía', 'Pedro', 'Javier', 'Elena', 'Sofía', 'Diego')
+LAST = ('García', 'Sánchez', 'López', 'Martínez', 'Pérez', 'Gómez', 'Ruiz', 'Díaz', 'Moreno', 'Álvarez')
+
+
+def legacy_rerun(path):
+    """Lo que hacía el paso 1 del asistente en cada rerun."""
+    clientes = pd.read_sql_query("SELECT id, nombre FROM users", db.get_connection(path))
+    format_func = lambda x: clientes[clientes['id'] == x]['nombre'].iloc[0]  # noqa: E731
+    return [format_func(x) for x in clientes['id']]  # selectbox formatea todas las opciones
+
+
+def directory_rerun(directory, query):
+    directory.refresh()
+    page, _, _ = paginate(directory.search(query), 0)
+    return [directory.name(client_id) for client_id, _ in page]
+
+
+def timed(fn, reruns):
+    start = time.perf_counter()
+    for _ in range(reruns):
+        fn()
+    return (time.perf_counter() - start) / reruns * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "clients.db")
+        db.migrate(path)
+        with db.transaction(path) as conn:
+            conn.executemany(
+                "INSERT INTO users (nombre) VALUES (?)",
+                [(f"{rng.choice(FIRST)} {rng.choice(LAST)} {rng.choice(LAST)} {i}",) for i in range(args.clients)],
+            )
+        directory = ClientDirectory(lambda: db.list_clients(path), lambda: db.users_version(path))
+
+        legacy_reruns = max(1, min(args.reruns, 3))  # cuadrático: con 10.000 clientes cada rerun tarda segundos
+        print(f"{args.clients} clientes\n")
+        print(f"{'caso':44} {'ms por rerun':>12}")
+        print(f"{'antes: DataFrame + format_func':44} {timed(lambda: legacy_rerun(path), legacy_reruns):12.1f}")
+        print(f"{'directorio: primera carga':44} {timed(directory.refresh, 1):12.1f}")
+        for query in ('', 'maria', 'lopez ruiz', 'marai'):
+            label = f"directorio: búsqueda {query!r}, página 1"
+            print(f"{label:44} {timed(lambda: directory_rerun(directory, query), args.reruns):12.2f}")
+        with db.transaction(path) as conn:
+            conn.execute("INSERT INTO users (nombre) VALUES ('Cliente nuevo')")
+        print(f"{'directorio: recarga tras un alta':44} {timed(directory.refresh, 1):12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark del arranque en frío: cuánto cuesta importar app.py y googledrive.py.
+
+Cada medición se hace en un proceso nuevo y se toma la mediana de varias
+repeticiones. Primero se carga lo que `streamlit run` ya tiene importado antes
+de ejecutar el script (servidor, runtime y la tabla de emojis del page_icon),
+que ninguna de las dos apps puede evitar, y solo se cronometra lo que añade
+importar la app después. Además se comprueba que al arrancar no se cargan las dependencias pesadas que solo hacen
+falta en algunas acciones (PyDrive2 al autenticar, passlib al crear usuarios,
+BeautifulSoup al compilar la plantilla, pandas/numpy/PIL en ningún caso).
+
+Sale con código 1 si el coste propio de alguna app supera --budget-ms o si se
+importa alguno de los módulos prohibidos, para que una regresión rompa la CI.
+La mediana ronda los 15 ms, pero en una máquina cargada la misma medición ha
+llegado a variar más de 20 ms entre ejecuciones sin cambios en el código:
+BUDGET_MS deja margen para ese ruido, y las dependencias pesadas ya las detecta
+la lista de prohibidos.
+Para ver qué módulos tardan más en una app en marcha usa JCT_PROFILE_STARTUP=1.
+
+Uso:
+    python benchmarks/bench_cold_start.py [--runs 7] [--budget-ms 150]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Lo que carga `streamlit run` antes del script, más streamlit.emojis, que
+# st.set_page_config importa para validar el page_icon (~100 ms, ajeno a las apps).
+BASELINE = "import streamlit.web.bootstrap\nimport streamlit.emojis"
+BUDGET_MS = 150.0  # coste propio máximo por app, con margen sobre la mediana medida
+FORBIDDEN = ("pandas", "numpy", "PIL", "pydrive2", "googleapiclient", "passlib", "bs4")
+
+CHILD = """
+import json, sys, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+{baseline}
+middle = time.perf_counter()
+{imports}
+elapsed = (time.perf_counter() - middle) * 1000
+base = (middle - start) * 1000
+heavy = sorted({{name.split('.')[0] for name in sys.modules}} & set({forbidden!r}))
+print(json.dumps({{'base': base, 'ms': elapsed, 'heavy': heavy}}))
+"""
+
+
+def measure(imports, runs):
+    """Medianas en ms de cargar BASELINE y después 'imports' en un proceso nuevo, y módulos pesados cargados."""
+    code = CHILD.format(baseline=BASELINE, imports=imports, forbidden=FORBIDDEN)
+    base, timings, heavy = [], [], set()
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        )
+        if out.returncode != 0:
+            raise RuntimeError(f"Falló el import:\n{out.stderr.strip()}")
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        base.append(result['base'])
+        timings.append(result['ms'])
+        heavy.update(result['heavy'])
+    return statistics.median(base), statistics.median(timings), sorted(heavy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="coste propio máximo por app")
+    args = parser.parse_args()
+
+    print(f"{'app':14} {'streamlit (ms)':>14} {'propio (ms)':>12}  módulos pesados")
+    failed = False
+    for module in ("app", "googledrive"):
+        baseline, own, heavy = measure(f"import {module}", args.runs)
+        ok = own <= args.budget_ms and not heavy
+        failed |= not ok
+        print(f"{module:14} {baseline:14.1f} {own:12.1f}  {', '.join(heavy) or '-'} {'✓' if ok else '✗'}")
+
+    if failed:
+        print(f"\nEl arranque supera el presupuesto ({args.budget_ms:.0f} ms) o importa {', '.join(FORBIDDEN)}.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
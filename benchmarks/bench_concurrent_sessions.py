@@ -0,0 +1,364 @@
+"""Prueba de carga: varias sesiones de entrenador a la vez contra app.py y googledrive.py.
+
+Lanza --sessions sesiones de AppTest por app, cada una en su hilo, dentro del
+mismo proceso (como las sesiones de un servidor de Streamlit: comparten las
+cachés de st.cache_resource, el GIL y los archivos SQLite de database/). Todas
+usan un Drive falso compartido (MemoryBackend, o LocalBackend con --backend
+local) que duerme --latency segundos por llamada, detrás de un DriveScheduler
+común, como en producción. Cada sesión repite --flows veces el flujo del
+entrenador:
+
+- app.py: buscar y elegir el cliente, abrir un borrador, editarlo, guardarlo y
+  finalizarlo (y volver a la lista para el siguiente);
+- googledrive.py: buscar y elegir el cliente en el asistente, continuar su
+  borrador, editarlo, guardarlo y finalizarlo (SQLite + subida a Drive).
+
+Informa de los percentiles de latencia de cada rerun por paso, del rendimiento
+(flujos y reruns por segundo), de las llamadas al Drive falso y de la
+contención de bloqueos de escritura en database/jct_main.db (db.lock_stats()).
+Sale con código 1 si alguna sesión falla, si hay errores "database is locked" o
+si el p95 de los reruns supera --max-p95.
+
+Uso:
+    python benchmarks/bench_concurrent_sessions.py [--sessions 6] [--flows 2] [--latency 0.05]
+        [--app app|googledrive|both] [--backend memory|local] [--max-p95 5000] [--json informe.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit as st  # noqa: E402
+from streamlit import config  # noqa: E402
+from streamlit.logger import set_log_level  # noqa: E402
+from streamlit.runtime import Runtime  # noqa: E402
+from streamlit.testing.v1 import AppTest, local_script_runner  # noqa: E402
+
+import db  # noqa: E402
+from drive_metrics import percentile  # noqa: E402
+from drive_scheduler import RATE, DriveScheduler, ScheduledBackend  # noqa: E402
+from storage import LocalBackend, MemoryBackend  # noqa: E402
+
+APP_SECRETS = ["client_id", "client_secret", "auth_uri", "token_uri", "auth_provider_x509_cert_url", "redirect_uris"]
+# Los secretos de las dos apps juntos: AppTest cambia st.secrets (global) en cada
+# rerun, así que todas las sesiones tienen que ver los mismos.
+SECRETS = {**{key: "benchmark" for key in APP_SECRETS},
+           'google_credentials': {key: "benchmark" for key in APP_SECRETS + ["project_id"]}}
+MAIN_FOLDER_NAME = "JCT Entrenamientos"  # el de app.py y googledrive.py
+DRAFT_SUFFIX = ".draft.json"
+FUERZA = "Back squat\n5x5 @ {load}kg\n3x8 press banca 60kg"
+
+# Piezas que un servidor de Streamlit crea una sola vez por proceso y AppTest una vez por instancia
+_shared = {}
+
+
+class SlowBackend:
+    """Envuelve un backend (LocalBackend) y duerme `latency` segundos en cada llamada, como MemoryBackend(sleep=True)."""
+
+    def __init__(self, backend, latency):
+        self._backend = backend
+        self.latency = latency
+        self.calls = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+        if not callable(attr):
+            return attr
+
+        def wrapper(*args, **kwargs):
+            with self._lock:
+                self.calls[name] += 1
+            time.sleep(self.latency)
+            return attr(*args, **kwargs)
+        return wrapper
+
+
+class Recorder:
+    """Duraciones de los reruns por (app, paso) y errores de las sesiones, seguro entre hilos."""
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.errors = []
+        self.flows = 0
+        self._lock = threading.Lock()
+
+    def step(self, at, app, name, action):
+        start = time.perf_counter()
+        try:
+            action()
+        except Exception as e:
+            raise RuntimeError(f"{name}: {type(e).__name__} {e}") from e
+        elapsed = time.perf_counter() - start
+        # st.error también cuenta: las apps muestran así las excepciones que capturan
+        failure = at.exception or at.error
+        if failure:
+            raise RuntimeError(f"{name}: {failure[0].value}")
+        with self._lock:
+            self.durations[(app, name)].append(elapsed)
+
+    def flow_done(self):
+        with self._lock:
+            self.flows += 1
+
+    def error(self, session, error):
+        with self._lock:
+            self.errors.append(f"{session}: {error}")
+
+
+def allow_concurrent_apptests():
+    """Permite ejecutar varios AppTest a la vez desde hilos distintos.
+
+    Cada AppTest.run() instala un Runtime simulado global y activa la opción
+    global.appTest, y los quita al terminar (Runtime._instance = None), así que la
+    primera sesión que acaba un rerun se los quitaría a las que siguen ejecutando
+    el suyo. Mientras dure la prueba, global.appTest queda activada y, si no hay
+    Runtime instalado, se usa el último que se instaló. Además todas las sesiones
+    comparten una ScriptCache, como en un servidor: el script se compila una vez
+    (compilar a la vez desde varios hilos falla en algunas versiones de Python 3.11).
+    """
+    config.set_option("global.appTest", True)
+    script_cache = local_script_runner.ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+    last = {}
+    original = Runtime.instance.__func__
+
+    def instance(cls):
+        if cls._instance is not None:
+            last['runtime'] = cls._instance
+            return cls._instance
+        return last['runtime'] if 'runtime' in last else original(cls)
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or 'runtime' in last)
+
+
+def new_app(script, storage):
+    at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=120)
+    # Sin esto, el primer rerun de cada sesión recorre los paquetes instalados buscando componentes (~0,5 s)
+    at._bidi_component_manager = _shared.get('components')
+    at.secrets.update(SECRETS)
+    at.session_state["storage"] = storage
+    return at
+
+
+def click(at, label_prefix):
+    next(b for b in at.button if b.label.startswith(label_prefix)).click().run()
+
+
+def text_area(at, label_prefix):
+    return next(t for t in at.text_area if t.label.startswith(label_prefix))
+
+
+# --- Datos iniciales ---
+
+def seed_drive(fake, sessions, flows):
+    """Carpeta principal, una carpeta por cliente y los borradores que abrirá cada sesión de app.py."""
+    main_id = fake.create_folder(MAIN_FOLDER_NAME)['id']
+    plan = {}
+    for i in range(sessions):
+        client = f"Cliente {i:02d}"
+        folder_id = fake.create_folder(client, parent_id=main_id)['id']
+        drafts = [f"Sesión {i:02d}-{k}" for k in range(flows)]
+        for draft in drafts:
+            data = {'fecha_creacion': datetime.date.today().isoformat(), 'objetivo_sesion': "Fuerza"}
+            fake.write_text(folder_id, draft + DRAFT_SUFFIX, json.dumps(data), mime_type='application/json')
+        plan[i] = (client, drafts)
+    return plan
+
+
+def seed_db(sessions):
+    """Un cliente en users por sesión de googledrive.py, con un borrador que continuar."""
+    db.migrate()
+    clients = {}
+    with db.transaction() as conn:
+        for i in range(sessions):
+            name = f"Atleta {i:02d}"
+            cursor = conn.execute("INSERT INTO users (nombre, objetivo, username) VALUES (?, ?, ?)",
+                                  (name, "Fuerza", f"atleta{i:02d}"))
+            clients[i] = (cursor.lastrowid, name)
+    return clients
+
+
+# --- Flujos ---
+
+def app_flow(recorder, storage, client, drafts):
+    at = new_app("app.py", storage)
+    step = lambda name, action: recorder.step(at, "app.py", name, action)  # noqa: E731
+    step("abrir la app", at.run)
+    step("buscar cliente", lambda: at.text_input(key="client_query").input(client).run())
+    step("elegir cliente", lambda: at.button(key=f"client_{client}").click().run())
+    for k, draft in enumerate(drafts):
+        if k:
+            step("volver a la lista", lambda: click(at, "⬅️ Volver a los entrenamientos"))
+        step("abrir borrador", lambda: at.button(key=f"edit_{draft}").click().run())
+        step("editar", lambda: text_area(at, "🏋️ Fuerza").input(FUERZA.format(load=80 + k * 5)).run())
+        step("guardar", lambda: click(at, "💾 Guardar Borrador"))
+        step("finalizar", lambda: click(at, "✅ Finalizar"))
+        recorder.flow_done()
+
+
+def googledrive_flow(recorder, storage, user_id, name, flows):
+    at = new_app("googledrive.py", storage)
+    at.session_state["page"] = "crear_entrenamiento"
+    step = lambda label, action: recorder.step(at, "googledrive.py", label, action)  # noqa: E731
+    step("abrir la app", at.run)
+    for k in range(flows):
+        if k:
+            step("nuevo entrenamiento", at.run)
+        # El borrador que el entrenador dejó a medias (fuera del tiempo medido)
+        db.save_draft(user_id, {'user_id': user_id, 'client_name': name, 'objetivo_sesion': "Fuerza",
+                                'fecha_creacion': datetime.date.today().isoformat()})
+        step("buscar cliente", lambda: at.text_input(key="wizard_client_query").input(name).run())
+        step("elegir cliente", lambda: at.selectbox[0].set_value(user_id).run())
+        step("abrir borrador", lambda: click(at, "Continuar borrador"))
+        step("editar", lambda: text_area(at, "🏋️ Fuerza").input(FUERZA.format(load=80 + k * 5)).run())
+        step("guardar", lambda: click(at, "💾 Guardar Borrador"))
+        step("finalizar", lambda: click(at, "✅ Finalizar y Guardar en Drive"))
+        recorder.flow_done()
+
+
+def warm_up(storage):
+    """Un rerun de cada app sin medir: imports, migraciones y cachés de st.cache_resource listos, como en un servidor ya arrancado."""
+    for script in ("app.py", "googledrive.py"):
+        at = new_app(script, storage)
+        at.run()
+        if at.exception:
+            raise SystemExit(f"{script} falla al arrancar: {at.exception[0].value}")
+        _shared['components'] = at._bidi_component_manager
+
+
+def run_sessions(targets, recorder):
+    """Lanza cada (nombre, función) en su hilo a la vez y espera a que terminen todas."""
+    start_line = threading.Barrier(len(targets))
+
+    def run(session, target):
+        start_line.wait()
+        try:
+            target()
+        except Exception as e:  # una sesión que falla no detiene a las demás
+            recorder.error(session, f"{type(e).__name__}: {e}")
+
+    threads = [threading.Thread(target=run, args=item, name=item[0]) for item in targets]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+# --- Informe ---
+
+def summarize(durations):
+    values = sorted(durations)
+    return {'reruns': len(values), **{f"p{p}": round(percentile(values, p) * 1000) for p in (50, 95, 99)},
+            'max': round(values[-1] * 1000)}
+
+
+def print_report(report):
+    print(f"\n{'paso':36} {'reruns':>6} {'p50':>7} {'p95':>7} {'p99':>7} {'máx':>7}  (ms)")
+    for name, row in report['steps'].items():
+        print(f"{name:36} {row['reruns']:6d} {row['p50']:7d} {row['p95']:7d} {row['p99']:7d} {row['max']:7d}")
+    total = report['total']
+    print(f"{'total':36} {total['reruns']:6d} {total['p50']:7d} {total['p95']:7d} {total['p99']:7d} {total['max']:7d}")
+
+    throughput = report['throughput']
+    print(f"\nRendimiento: {throughput['flows']} flujos en {throughput['elapsed_s']:.1f} s → "
+          f"{throughput['flows_per_min']:.1f} flujos/min, {throughput['reruns_per_s']:.1f} reruns/s")
+    drive = report['drive']
+    print(f"Drive falso: {drive['calls']} llamadas ({drive['calls_per_flow']:.1f} por flujo); planificador: "
+          f"{drive['throttled']} esperaron turno, {drive['retries']} reintentos")
+    locks = report['sqlite']
+    print(f"SQLite (jct_main.db): {locks['transactions']} transacciones de escritura, {locks['contended']} esperaron el "
+          f"bloqueo (total {locks['wait_total_ms']:.0f} ms, máx {locks['wait_max_ms']:.0f} ms), "
+          f"{locks['busy_errors']} errores 'database is locked'")
+    for error in report['errors']:
+        print(f"✗ {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=6, help="sesiones simultáneas por app")
+    parser.add_argument("--flows", type=int, default=2, help="flujos completos por sesión")
+    parser.add_argument("--latency", type=float, default=0.05, help="latencia del Drive falso por llamada (s)")
+    parser.add_argument("--app", choices=("app", "googledrive", "both"), default="both")
+    parser.add_argument("--backend", choices=("memory", "local"), default="memory")
+    parser.add_argument("--rate", type=float, default=RATE, help="peticiones/s del planificador de Drive")
+    parser.add_argument("--max-p95", type=float, default=None, help="p95 máximo de los reruns (ms)")
+    parser.add_argument("--json", help="guarda además el informe en este archivo")
+    args = parser.parse_args()
+    set_log_level("error")
+    allow_concurrent_apptests()
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # database/ y las cachés de las apps se crean aquí
+        st.cache_resource.clear()
+        if args.backend == "memory":
+            fake = MemoryBackend(latency=args.latency, sleep=True)
+        else:
+            fake = SlowBackend(LocalBackend(os.path.join(workdir, "drive")), args.latency)
+        storage = ScheduledBackend(fake, DriveScheduler(rate=args.rate))
+
+        recorder = Recorder()
+        targets = []
+        if args.app in ("app", "both"):
+            for i, (client, drafts) in seed_drive(fake, args.sessions, args.flows).items():
+                targets.append((f"app.py #{i}", lambda c=client, d=drafts: app_flow(recorder, storage, c, d)))
+        if args.app in ("googledrive", "both"):
+            for i, (user_id, name) in seed_db(args.sessions).items():
+                targets.append((f"googledrive.py #{i}",
+                                lambda u=user_id, n=name: googledrive_flow(recorder, storage, u, n, args.flows)))
+
+        warm_up(storage)
+        fake.calls.clear()
+        db.lock_stats(reset=True)
+        print(f"{len(targets)} sesiones ({args.app}) · {args.flows} flujos por sesión · Drive {args.backend} "
+              f"con {args.latency * 1000:.0f} ms por llamada · planificador a {args.rate:g}/s")
+        elapsed = run_sessions(targets, recorder)
+        locks = db.lock_stats()
+
+    all_durations = [d for values in recorder.durations.values() for d in values]
+    if not all_durations:
+        raise SystemExit("Ninguna sesión ha llegado a ejecutar un rerun:\n  " + "\n  ".join(recorder.errors))
+    scheduler_stats = storage.scheduler.stats()
+    calls = sum(fake.calls.values())
+    report = {
+        'config': vars(args),
+        # Agrupados por app; dentro de cada una, en el orden del flujo (sorted es estable)
+        'steps': {f"{app} · {name}": summarize(values)
+                  for (app, name), values in sorted(recorder.durations.items(), key=lambda item: item[0][0])},
+        'total': summarize(all_durations),
+        'throughput': {
+            'flows': recorder.flows, 'elapsed_s': round(elapsed, 2),
+            'flows_per_min': recorder.flows / elapsed * 60, 'reruns_per_s': len(all_durations) / elapsed,
+        },
+        'drive': {'calls': calls, 'calls_per_flow': calls / max(1, recorder.flows),
+                  'throttled': scheduler_stats['throttled'], 'retries': scheduler_stats['retries']},
+        'sqlite': locks,
+        'errors': recorder.errors,
+    }
+    print_report(report)
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    failed = bool(recorder.errors) or locks['busy_errors'] > 0
+    if args.max_p95 is not None and report['total']['p95'] > args.max_p95:
+        print(f"\nEl p95 de los reruns ({report['total']['p95']} ms) supera el máximo de {args.max_p95:g} ms.")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Benchmark del cliente de Drive compartido (drive_client.py) frente a autenticar por sesión.
+
+Usa un GoogleAuth falso cuyo Refresh() tarda --refresh-latency segundos y cuyo
+token caduca a los --ttl segundos. N sesiones (hilos) piden el cliente a la vez
+en varias rondas mientras el token va caducando, y se cuentan renovaciones,
+escrituras de credentials.json y el tiempo que cada petición pasa esperando a
+la autenticación:
+
+- antes: cada sesión crea su GoogleAuth, lee el archivo, renueva si ha
+  caducado y lo reescribe (lo que hacía authenticate_gdrive);
+- ahora: un DriveClient por proceso que renueva en segundo plano antes de la
+  caducidad y con un solo vuelo.
+
+Sale con código 1 si el cliente compartido renueva más de una vez por
+caducidad o si alguna petición paga la latencia de la renovación.
+
+Uso:
+    python benchmarks/bench_drive_client.py [--sessions 8] [--rounds 6]
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drive_client import DriveClient  # noqa: E402
+
+
+class FakeCredentials:
+    def __init__(self, ttl):
+        self.invalid = False
+        self.ttl = ttl
+        self.token_expiry = datetime.datetime.utcnow() + datetime.timedelta(seconds=ttl)
+
+    @property
+    def access_token_expired(self):
+        return datetime.datetime.utcnow() >= self.token_expiry
+
+
+class FakeAuth:
+    """Lo que DriveClient y authenticate_gdrive usan de pydrive2.auth.GoogleAuth."""
+
+    stats = {'refreshes': 0, 'writes': 0}
+    lock = threading.Lock()
+
+    def __init__(self, ttl, refresh_latency):
+        self.ttl = ttl
+        self.refresh_latency = refresh_latency
+        self.credentials = None
+        self.thread_local = threading.local()
+
+    def LoadCredentialsFile(self, path):
+        with open(path, encoding='utf-8') as f:
+            expiry = datetime.datetime.fromisoformat(json.load(f)['expiry'])
+        self.credentials = FakeCredentials(self.ttl)
+        self.credentials.token_expiry = expiry
+
+    def SaveCredentialsFile(self, path):
+        with FakeAuth.lock:
+            FakeAuth.stats['writes'] += 1
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'expiry': self.credentials.token_expiry.isoformat()}, f)
+
+    @property
+    def access_token_expired(self):
+        return self.credentials is None or self.credentials.access_token_expired
+
+    def Refresh(self):
+        time.sleep(self.refresh_latency)
+        with FakeAuth.lock:
+            FakeAuth.stats['refreshes'] += 1
+        self.credentials = FakeCredentials(self.ttl)
+
+    def Authorize(self):
+        pass
+
+    def Get_Http_Object(self):
+        return object()
+
+
+def legacy_session(path, ttl, refresh_latency):
+    """authenticate_gdrive antes del cliente compartido."""
+    gauth = FakeAuth(ttl, refresh_latency)
+    gauth.LoadCredentialsFile(path)
+    if gauth.access_token_expired:
+        gauth.Refresh()
+        gauth.SaveCredentialsFile(path)
+    return gauth
+
+
+def run(label, session, sessions, rounds, ttl):
+    """Lanza `sessions` peticiones a la vez en cada ronda; devuelve la espera máxima por petición."""
+    FakeAuth.stats = {'refreshes': 0, 'writes': 0}
+    waits = []
+
+    def timed(_):
+        start = time.perf_counter()
+        session()
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        for _ in range(rounds):
+            waits += pool.map(timed, range(sessions))
+            time.sleep(ttl / 2)
+    worst = max(waits) * 1000
+    print(f"{label:34} {FakeAuth.stats['refreshes']:>12} {FakeAuth.stats['writes']:>10} {worst:>16.0f}")
+    return FakeAuth.stats['refreshes'], worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=6)
+    parser.add_argument("--ttl", type=float, default=1.0, help="vida del token de acceso (s)")
+    parser.add_argument("--refresh-latency", type=float, default=0.2, help="duración de Refresh() (s)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "credentials.json")
+        expired = {'expiry': datetime.datetime.utcnow().isoformat()}
+
+        print(f"{'caso':34} {'renovaciones':>12} {'escrituras':>10} {'espera máx (ms)':>16}")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(expired, f)
+        run("antes: GoogleAuth por sesión", lambda: legacy_session(path, args.ttl, args.refresh_latency),
+            args.sessions, args.rounds, args.ttl)
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(expired, f)
+        client = DriveClient({}, path, refresh_margin=args.ttl / 2, check_interval=args.ttl / 10,
+                             auth_factory=lambda settings: FakeAuth(args.ttl, args.refresh_latency))
+        client.drive()  # primer arranque: credenciales caducadas, se renueva una vez al conectar
+        refreshes, worst = run("ahora: DriveClient compartido", client.drive, args.sessions, args.rounds, args.ttl)
+        client.close()
+
+    # Con un margen de ttl/2 el token se renueva cada ttl/2 segundos: como mucho una vez por ronda.
+    ok = refreshes <= args.rounds + 1 and worst < args.refresh_latency * 1000 / 2
+    if not ok:
+        print("\nEl cliente compartido renueva de más o alguna petición ha esperado a la renovación.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Benchmark y comprobaciones de la importación del archivo de Drive (drive_import.py).
+
+Genera en un MemoryBackend con latencia real un árbol 'JCT Entrenamientos' de
+--clients clientes con --files HTML finalizados renderizados con template.html
+(y un borrador por cliente, que no se importa) y comprueba:
+
+- la importación completa da de alta los clientes y recupera cada sección tal
+  como se renderizó (también en la búsqueda FTS);
+- cortada a la mitad, la siguiente importación descarga solo lo que faltaba;
+- volver a importar sin cambios no descarga nada, y tras modificar unos pocos
+  archivos solo descarga y actualiza esos (sin filas nuevas);
+- las series que app.py ya guardó al finalizar se reemplazan, no se duplican;
+- la importación completa con IMPORT_WORKERS descargas simultáneas frente a una sola.
+
+Sale con código 1 si alguna comprobación falla.
+
+Uso:
+    python benchmarks/bench_drive_import.py [--clients 50] [--files 2000] [--latency 0.005]
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import drive_import  # noqa: E402
+import template_engine  # noqa: E402
+from exercise_parser import extract_sets  # noqa: E402
+from drive_index import walk_tree  # noqa: E402
+from storage import IN_FLIGHT_PER_WORKER, MemoryBackend  # noqa: E402
+
+MAIN_FOLDER_NAME = "JCT Entrenamientos"  # el de app.py y googledrive.py
+
+
+class Interrupted(Exception):
+    pass
+
+
+def training(k, client_name):
+    day = datetime.date(2024, 1, 1) + datetime.timedelta(days=k // 7)
+    return {
+        'fecha_creacion': day.isoformat(), 'dia_semana': f"SESIÓN {k}",
+        'objetivo_sesion': f"Fuerza máxima & técnica <{k}>",
+        'warmup_general': "5' remo\n10 air squats",
+        'fuerza': f"Back squat\n5x5 @ {60 + k % 40}kg\n3x8 press banca 70%",
+        'conditioning': "AMRAP 12'\n- 10 wall balls\n- 200m run",
+        'anotaciones_coach': f"Notas para {client_name}",
+    }
+
+
+def build_archive(memory, clients, files):
+    """Crea el árbol en el backend y devuelve {file_id: (cliente, título, datos)}."""
+    root = memory.create_folder(MAIN_FOLDER_NAME)['id']
+    folders = [(f"Cliente {c:03d}", memory.create_folder(f"Cliente {c:03d}", parent_id=root)['id']) for c in range(clients)]
+    expected = {}
+    for k in range(files):
+        client_name, folder_id = folders[k % clients]
+        data = training(k, client_name)
+        title = f"Entrenamiento_{k:05d}"
+        f = memory.write_text(folder_id, f"{title}.html", template_engine.render(data, client_name), mime_type='text/html')
+        expected[f['id']] = (client_name, title, data)
+    for client_name, folder_id in folders:
+        memory.write_text(folder_id, "Sesion nueva.draft.json", "{}", mime_type='application/json')
+    return root, expected
+
+
+def run(memory, root, path, **options):
+    """Importa el árbol actual; devuelve (resultado, descargas, segundos)."""
+    tree = walk_tree(memory, root)
+    before = memory.calls['read_text']
+    start = time.perf_counter()
+    try:
+        result = drive_import.import_tree(memory, tree, path, **options)
+    except Interrupted:
+        result = None
+    return result, memory.calls['read_text'] - before, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.005, help="segundos por descarga del Drive falso")
+    parser.add_argument("--modified", type=int, default=25, help="archivos modificados antes de reimportar")
+    args = parser.parse_args()
+    checks = []
+
+    memory = MemoryBackend(latency=args.latency, sleep=True)
+    root, expected = build_archive(memory, args.clients, args.files)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        timings = {}
+        for workers in (1, drive_import.IMPORT_WORKERS):
+            path = os.path.join(workdir, f"hilos_{workers}.db")
+            db.migrate(path)
+            _, _, timings[workers] = run(memory, root, path, max_workers=workers)
+            db.get_connection(path).close()
+
+        path = os.path.join(workdir, "jct_main.db")
+        db.migrate(path)
+        # Series que app.py ya guardó al finalizar el primer entrenamiento
+        first_id = next(iter(expected))
+        client_name, title, data = expected[first_id]
+        db.record_series(f"drive:{client_name}/{title}", client_name, data, path)
+
+        # Importación cortada a la mitad (como si se cerrara la página)
+        half = args.files // 2
+
+        def stop_at_half(done, total):
+            if done >= half:
+                raise Interrupted()
+
+        _, first_downloads, _ = run(memory, root, path, on_progress=stop_at_half)
+        saved = len(db.import_checkpoints(path))
+        result, downloads, _ = run(memory, root, path)
+        checks.append((saved >= half and first_downloads + downloads <= args.files + 2 * drive_import.IMPORT_WORKERS
+                       * IN_FLIGHT_PER_WORKER and result['skipped'] == saved,
+                       f"cortada tras {saved} archivos guardados; al reanudar se descargan {downloads} "
+                       f"({first_downloads + downloads} en total para {args.files})"))
+
+        conn = db.get_connection(path)
+        rows = conn.execute(
+            f"SELECT i.file_id, u.nombre, {', '.join('e.' + f for f in db.TRAINING_FIELDS)} FROM drive_import i "
+            "JOIN entrenamientos e ON e.id = i.entrenamiento_id JOIN users u ON u.id = e.user_id"
+        ).fetchall()
+        same = all(
+            row['nombre'] == expected[row['file_id']][0]
+            and all((row[f] or '') == expected[row['file_id']][2].get(f, '') for f in db.TRAINING_FIELDS)
+            for row in rows
+        )
+        clients = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        found = len(db.search_trainings("técnica", limit=args.files + 1, path=path))
+        checks.append((len(rows) == args.files and same and clients == args.clients and found == args.files,
+                       f"{len(rows)} entrenamientos de {clients} clientes, con las secciones intactas y en la búsqueda"))
+        series = conn.execute("SELECT COUNT(*) FROM series WHERE sesion = ?",
+                              (f"drive:{client_name}/{title}",)).fetchone()[0]
+        checks.append((series == len(extract_sets(data)),
+                       f"las {series} series ya guardadas por app.py no se duplican"))
+
+        # Reimportar sin cambios y tras modificar unos pocos
+        result, downloads, unchanged = run(memory, root, path)
+        checks.append((downloads == 0 and result['skipped'] == args.files,
+                       f"sin cambios: {downloads} descargas ({unchanged * 1000:.0f} ms)"))
+        time.sleep(0.01)  # modifiedDate tiene resolución de milisegundos
+        for file_id in list(expected)[:args.modified]:
+            client_name, title, data = expected[file_id]
+            data['fuerza'] += "\nPeso muerto 3x3 @ 140kg"
+            memory.write_text(None, f"{title}.html", template_engine.render(data, client_name), file_id=file_id)
+        result, downloads, _ = run(memory, root, path)
+        total = conn.execute("SELECT COUNT(*) FROM entrenamientos").fetchone()[0]
+        checks.append((downloads == args.modified and result['updated'] == args.modified and total == args.files,
+                       f"{args.modified} modificados: {downloads} descargas, {result['updated']} actualizados, "
+                       f"{total} entrenamientos en total"))
+        conn.close()
+
+    print(f"{args.files} archivos de {args.clients} clientes, {args.latency * 1000:g} ms por descarga")
+    for workers, seconds in timings.items():
+        print(f"{workers} hilo(s): {seconds:6.2f} s  ({args.files / seconds:,.0f} archivos/s)")
+    print()
+    for ok, detail in checks:
+        print(f"{'✓' if ok else '✗'} {detail}")
+    if not all(ok for ok, _ in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
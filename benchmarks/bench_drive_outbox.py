@@ -0,0 +1,176 @@
+"""Benchmark y comprobaciones del outbox de Drive de googledrive.py (drive_outbox.py).
+
+Con un MemoryBackend con latencia real detrás del planificador de Drive:
+
+- finalizar como antes (insertar, subir a Drive dentro del rerun y borrar el
+  borrador) frente a db.finalize_training(), que solo hace un commit local;
+- el hilo del outbox sube después todos los entrenamientos, con 500 inyectados
+  en algunas creaciones: los fallos se reintentan hasta que se suben, cada
+  archivo queda una sola vez y cada entrenamiento guarda su enlace;
+- las carpetas de cada cliente se buscan una vez por proceso, no por subida;
+- si el proceso muere a mitad de lote, un despachador nuevo sube lo que queda
+  sin duplicar los archivos que ya se habían subido;
+- un reintento reutiliza el archivo que un intento anterior llegó a crear.
+
+Sale con código 1 si alguna comprobación falla.
+
+Uso:
+    python benchmarks/bench_drive_outbox.py [--trainings 40] [--clients 5] [--latency 0.05] [--rate 8]
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import googledrive  # noqa: E402
+from drive_outbox import DriveOutbox  # noqa: E402
+from drive_scheduler import DriveScheduler, ScheduledBackend  # noqa: E402
+from storage import MemoryBackend  # noqa: E402
+
+
+def new_storage(latency, rate):
+    memory = MemoryBackend(latency=latency, sleep=True)
+    scheduler = DriveScheduler(rate=rate, burst=max(1, int(rate)), base_delay=0.001, rng=random.Random(7))
+    return memory, ScheduledBackend(memory, scheduler)
+
+
+def seed(path, clients, trainings):
+    """Clientes en users y un borrador por entrenamiento a finalizar."""
+    db.migrate(path)
+    users = []
+    with db.transaction(path) as conn:
+        for i in range(clients):
+            cursor = conn.execute("INSERT INTO users (nombre, objetivo, username) VALUES (?, ?, ?)",
+                                  (f"Atleta {i:02d}", "Fuerza", f"atleta{i:02d}"))
+            users.append((cursor.lastrowid, f"Atleta {i:02d}"))
+    start = datetime.date(2025, 1, 1)
+    plans = []
+    for k in range(trainings):
+        user_id, name = users[k % clients]
+        data = {'user_id': user_id, 'client_name': name, 'objetivo_sesion': "Fuerza",
+                'fecha_creacion': (start + datetime.timedelta(days=k)).isoformat(), 'fuerza': "Back squat\n5x5 @ 80kg"}
+        db.save_draft(user_id, data, path)
+        plans.append(data)
+    return plans
+
+
+class Crash(BaseException):
+    """El proceso muere: dispatch() no llega a apuntar el lote."""
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def timed_each(fn, items):
+    times = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def drain(outbox, path, max_batches=100):
+    """Vacía el outbox ignorando las esperas entre reintentos; devuelve (lotes, intentos fallidos)."""
+    batches = failed = 0
+    while db.outbox_counts(path)[0] and batches < max_batches:
+        failed += outbox.dispatch(now=float('inf'))[1]
+        batches += 1
+    return batches, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trainings", type=int, default=40)
+    parser.add_argument("--clients", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="segundos por llamada al Drive falso")
+    parser.add_argument("--rate", type=float, default=8.0, help="peticiones por segundo del planificador")
+    parser.add_argument("--failures", type=int, default=5, help="500 inyectados al crear archivos")
+    args = parser.parse_args()
+    checks = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Antes: la subida a Drive dentro del rerun de "Finalizar"
+        path = os.path.join(workdir, "inline.db")
+        plans = seed(path, args.clients, args.trainings)
+        _, storage = new_storage(args.latency, args.rate)
+
+        def finalize_inline(data):
+            db.insert_training(data, path)
+            googledrive.create_training_file_in_drive(storage, data['client_name'], data)
+            db.delete_draft(data['user_id'], path)
+
+        inline = timed_each(finalize_inline, plans)
+        db.get_connection(path).close()
+
+        # Ahora: commit local y subida en segundo plano
+        path = os.path.join(workdir, "outbox.db")
+        plans = seed(path, args.clients, args.trainings)
+        memory, storage = new_storage(args.latency, args.rate)
+        local = timed_each(lambda data: db.finalize_training(data, path), plans)
+        queued = db.outbox_counts(path)[0]
+        drafts_left = db.get_connection(path).execute("SELECT COUNT(*) FROM drafts").fetchone()[0]
+        checks.append((queued == args.trainings and drafts_left == 0,
+                       f"finalizar encola {queued} subidas y borra los borradores en la misma transacción"))
+
+        folders = {}
+        mirror = lambda row: googledrive.create_training_file_in_drive(storage, row['client_name'], row, folders)  # noqa: E731
+        # Un despachador que muere a mitad del primer lote: el resto lo sube uno nuevo
+        uploads = []
+
+        def crash_midway(row):
+            if len(uploads) == 5:
+                raise Crash()
+            uploads.append(mirror(row))
+
+        try:
+            DriveOutbox(path, batch_size=10, mirror=crash_midway).dispatch(now=float('inf'))
+        except Crash:
+            pass
+        outbox = DriveOutbox(path, batch_size=10, mirror=mirror)
+        start = time.perf_counter()
+        outbox.dispatch(now=float('inf'))  # el lote a medias, sin fallos que fuercen la búsqueda
+        memory.inject_errors(*[500] * args.failures, operation='write_text')
+        batches, failed = drain(outbox, path)
+        batches += 1
+        drain_time = time.perf_counter() - start
+
+        conn = db.get_connection(path)
+        linked = conn.execute("SELECT COUNT(*) FROM entrenamientos WHERE drive_link IS NOT NULL").fetchone()[0]
+        titles = [f['title'] for f in memory.files.values() if f['title'].startswith("Entrenamiento_")]
+        checks.append((db.outbox_counts(path)[0] == 0 and linked == args.trainings,
+                       f"{linked}/{args.trainings} subidos con enlace en {batches} lotes tras morir a mitad de lote "
+                       f"y {failed} intentos fallidos ({drain_time:.1f} s)"))
+        checks.append((len(titles) == len(set(titles)) == args.trainings, f"{len(titles)} archivos, sin duplicados"))
+        lookups = memory.calls['find_folder'] + memory.calls['create_folder']
+        checks.append((lookups <= 2 * (args.clients + 1) + 2,
+                       f"{lookups} búsquedas/creaciones de carpetas para {args.clients} clientes y {args.trainings} subidas"))
+
+        # Un intento anterior creó el archivo pero no llegó a apuntar el enlace
+        row = dict(plans[0], entrenamiento_id=999, intentos=1, fecha_creacion="2030-01-01")
+        before = googledrive.create_training_file_in_drive(storage, row['client_name'], dict(row, intentos=0), folders)
+        again = googledrive.create_training_file_in_drive(storage, row['client_name'], row, folders)
+        checks.append((before == again, "un reintento reutiliza el archivo ya creado"))
+        conn.close()
+
+    print(f"{'finalizar':28} {'p50 (ms)':>10} {'p95 (ms)':>10} {'máx (ms)':>10}")
+    for label, times in (("subiendo a Drive en el rerun", inline), ("commit local (outbox)", local)):
+        print(f"{label:28} {statistics.median(times):>10.1f} {percentile(times, 95):>10.1f} {max(times):>10.1f}")
+    print()
+    for ok, detail in checks:
+        print(f"{'✓' if ok else '✗'} {detail}")
+    if not all(ok for ok, _ in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
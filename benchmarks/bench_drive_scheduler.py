@@ -0,0 +1,152 @@
+"""Comprobaciones y benchmark del planificador de llamadas a Drive (drive_scheduler.py).
+
+Usa MemoryBackend.inject_errors() para simular las respuestas de Drive:
+
+- 403 rateLimitExceeded y 500 en lecturas: se reintentan y la operación acaba bien;
+- 500 al crear un archivo: no se reintenta (podría duplicarlo) y llega al llamador;
+- un 403 persistente: se abandona tras MAX_RETRIES reintentos;
+- create_training_file_in_drive de googledrive.py con fallos intercalados;
+- N hilos leyendo el mismo archivo a la vez: una sola petición a Drive, también
+  si cada uno lo lee con su propio proxy (como las sesiones de app.py);
+- una ráfaga de peticiones: el ritmo conseguido no supera el configurado.
+
+Sale con código 1 si alguna comprobación falla.
+
+Uso:
+    python benchmarks/bench_drive_scheduler.py [--rate 50] [--requests 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drive_metrics import DriveMetrics, InstrumentedBackend  # noqa: E402
+from drive_scheduler import MAX_RETRIES, DriveScheduler, ScheduledBackend  # noqa: E402
+from storage import MemoryBackend, RateLimitedError, TransientError  # noqa: E402
+
+
+def new_backend(latency=0.0, sleep=False, **scheduler_options):
+    """(MemoryBackend, proxy planificado, planificador); las esperas de reintento no se duermen."""
+    memory = MemoryBackend(latency=latency, sleep=sleep)
+    options = dict(base_delay=0.001, rng=random.Random(7))
+    options.update(scheduler_options)
+    scheduler = DriveScheduler(**options)
+    return memory, ScheduledBackend(memory, scheduler), scheduler
+
+
+def check_read_retries():
+    memory, storage, scheduler = new_backend()
+    file_id = memory.write_text(memory.create_folder("c")['id'], "a.txt", "hola")['id']
+    memory.inject_errors(403, 500, 403, operation='read_text')
+    ok = storage.read_text(file_id) == "hola"
+    stats = scheduler.stats()
+    detail = f"{stats['retries']} reintentos ({stats['rate_limited']} 403, {stats['server_errors']} 500)"
+    return ok and stats['retries'] == 3 and memory.calls['read_text'] == 4, detail
+
+
+def check_create_not_retried():
+    memory, storage, scheduler = new_backend()
+    folder_id = memory.create_folder("c")['id']
+    memory.inject_errors(500, operation='write_text')
+    try:
+        storage.write_text(folder_id, "nuevo.txt", "x")
+        raised = False
+    except TransientError:
+        raised = True
+    created = [f for f in memory.files.values() if f['title'] == "nuevo.txt"]
+    return raised and not created and scheduler.stats()['retries'] == 0, "500 al crear: se propaga sin reintentar"
+
+
+def check_rate_limited_create_retried():
+    memory, storage, scheduler = new_backend()
+    folder_id = memory.create_folder("c")['id']
+    memory.inject_errors(403, operation='write_text')
+    storage.write_text(folder_id, "nuevo.txt", "x")
+    created = [f for f in memory.files.values() if f['title'] == "nuevo.txt"]
+    return len(created) == 1 and scheduler.stats()['retries'] == 1, "403 al crear: se reintenta (Drive no lo creó)"
+
+
+def check_gives_up():
+    memory, storage, scheduler = new_backend()
+    memory.inject_errors(*[403] * (MAX_RETRIES + 1), operation='find_folder')
+    try:
+        storage.find_folder("x")
+        raised = False
+    except RateLimitedError:
+        raised = True
+    stats = scheduler.stats()
+    return raised and stats['gave_up'] == 1, f"abandona tras {stats['retries']} reintentos"
+
+
+def check_googledrive_upload():
+    import googledrive
+
+    memory, storage, scheduler = new_backend()
+    memory.inject_errors(500, operation='find_folder')
+    memory.inject_errors(403, operation='create_folder')
+    memory.inject_errors(403, operation='write_text')
+    link = googledrive.create_training_file_in_drive(storage, "Ana García", {'fecha_creacion': "2025-10-01"})
+    files = [f['title'] for f in memory.files.values()]
+    ok = bool(link) and files.count("Entrenamiento_2025-10-01.txt") == 1 and files.count("Ana García") == 1
+    return ok, f"create_training_file_in_drive con {scheduler.stats()['retries']} reintentos"
+
+
+def check_dedupe(threads):
+    memory, storage, scheduler = new_backend(latency=0.05, sleep=True, rate=1000, burst=1000)
+    file_id = memory.write_text(memory.create_folder("c")['id'], "a.txt", "hola")['id']
+    metrics = DriveMetrics()
+    # Cada sesión de app.py envuelve el backend compartido en su propio proxy
+    session_storage = lambda: ScheduledBackend(InstrumentedBackend(memory, metrics), scheduler)  # noqa: E731
+    memory.calls.clear()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        shared = list(pool.map(lambda _: storage.read_text(file_id), range(threads)))
+        sessions = list(pool.map(lambda _: session_storage().read_text(file_id), range(threads)))
+    calls = memory.calls['read_text']
+    ok = shared == sessions == ["hola"] * threads and calls < threads
+    return ok, f"{2 * threads} lecturas simultáneas → {calls} petición(es), {scheduler.stats()['deduplicated']} deduplicadas"
+
+
+def check_rate(rate, requests):
+    burst = max(1, int(rate) // 5)
+    memory, storage, scheduler = new_backend(rate=rate, burst=burst)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lambda i: storage.find_folder(f"carpeta {i}"), range(requests)))
+    elapsed = time.perf_counter() - start
+    achieved = (requests - burst) / elapsed if elapsed else float('inf')
+    stats = scheduler.stats()
+    detail = f"{requests} peticiones en {elapsed:.2f}s → {achieved:.1f}/s (límite {rate:g}/s), {stats['throttled']} esperaron turno"
+    return achieved <= rate * 1.1, detail
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=50.0, help="peticiones por segundo del planificador")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=20, help="lecturas simultáneas para la deduplicación")
+    args = parser.parse_args()
+
+    checks = [
+        ("lectura con 403/500/403", check_read_retries),
+        ("crear con 500", check_create_not_retried),
+        ("crear con 403", check_rate_limited_create_retried),
+        ("403 persistente", check_gives_up),
+        ("googledrive.py con fallos", check_googledrive_upload),
+        ("deduplicación", lambda: check_dedupe(args.threads)),
+        ("token bucket", lambda: check_rate(args.rate, args.requests)),
+    ]
+    failures = 0
+    for name, check in checks:
+        ok, detail = check()
+        failures += not ok
+        print(f"{'✓' if ok else '✗'} {name:28} {detail}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Benchmark de la capa SQLite de googledrive.py.
+
+Crea dos bases con 1.000 clientes y 100.000 sesiones: una con el esquema y el
+acceso originales (una conexión nueva por llamada, modo de diario por defecto y
+sin índices) y otra con db.py (conexión por hilo, WAL, pragmas e índices).
+Mide en ambas el guardado y la carga de borradores, la consulta del historial
+de un cliente y la búsqueda de texto en todo el historial (LIKE frente a FTS5).
+
+Uso:
+    python benchmarks/bench_sqlite.py [--users 1000] [--sessions 100000] [--ops 500]
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+SAMPLE = {
+    'fecha_creacion': '2025-10-07', 'dia_semana': 'MARTES 7', 'objetivo_sesion': 'Fuerza tren inferior',
+    'warmup_general': '5 min remo\n10 air squats', 'specific_warmup': 'Sentadilla barra vacía 2x8',
+    'fuerza': 'Back squat 5x5 @ 80kg', 'trabajo_especifico': 'Core 3x30"',
+    'conditioning': 'AMRAP 12: 10 wall balls, 10 box jumps', 'anotaciones_coach': 'Controlar la excéntrica',
+}
+
+
+# --- Acceso original (copiado de googledrive.py antes de db.py) ---
+
+def legacy_init(path):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, nombre TEXT, objetivo TEXT, username TEXT UNIQUE, password_hash TEXT, fecha_registro TEXT)')
+    conn.execute('CREATE TABLE IF NOT EXISTS entrenamientos (id INTEGER PRIMARY KEY, user_id INTEGER, fecha_creacion TEXT, dia_semana TEXT, objetivo_sesion TEXT, warmup_general TEXT, specific_warmup TEXT, fuerza TEXT, trabajo_especifico TEXT, conditioning TEXT, anotaciones_coach TEXT, FOREIGN KEY (user_id) REFERENCES users (id))')
+    conn.execute('CREATE TABLE IF NOT EXISTS drafts (user_id INTEGER PRIMARY KEY, draft_data TEXT, last_updated TEXT, FOREIGN KEY (user_id) REFERENCES users (id))')
+    conn.commit()
+    conn.close()
+
+
+def legacy_connection(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def legacy_get_draft(path, user_id):
+    conn = legacy_connection(path)
+    draft = conn.execute("SELECT draft_data FROM drafts WHERE user_id = ?", (user_id,)).fetchone()
+    conn.close()
+    return json.loads(draft['draft_data']) if draft else None
+
+
+def legacy_save_draft(path, user_id, data):
+    conn = legacy_connection(path)
+    conn.execute("REPLACE INTO drafts (user_id, draft_data, last_updated) VALUES (?, ?, ?)", (user_id, json.dumps(data), datetime.datetime.now().isoformat()))
+    conn.commit()
+    conn.close()
+
+
+def legacy_history(path, user_id, limit=20):
+    conn = legacy_connection(path)
+    rows = conn.execute("SELECT * FROM entrenamientos WHERE user_id = ? ORDER BY fecha_creacion DESC LIMIT ?", (user_id, limit)).fetchall()
+    conn.close()
+    return rows
+
+
+# --- Datos ---
+
+def legacy_search(path, text, limit=50):
+    """Búsqueda sin índice: LIKE sobre todas las columnas de texto."""
+    conn = legacy_connection(path)
+    where = ' OR '.join(f"{field} LIKE ?" for field in db.SEARCH_FIELDS)
+    rows = conn.execute(f"SELECT id FROM entrenamientos WHERE {where} LIMIT ?", (f"%{text}%",) * len(db.SEARCH_FIELDS) + (limit,)).fetchall()
+    conn.close()
+    return rows
+
+
+# Términos selectivos (como los que busca un entrenador); 'bulgarian' aparece en ~1% de las sesiones
+SEARCH_TERMS = ('bulgarian split', 'por pierna', 'deadlift', 'bulgarian')
+
+
+def seed(path, users, sessions):
+    """Inserta los clientes y sesiones de prueba en una sola transacción."""
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO users (id, nombre, objetivo, username, password_hash, fecha_registro) VALUES (?, ?, ?, ?, ?, ?)",
+        [(i, f"Cliente {i}", "General", f"cliente{i}", "x", "2024-01-01") for i in range(1, users + 1)],
+    )
+    start = datetime.date(2020, 1, 1)
+    rng = random.Random(42)
+    rows = []
+    for _ in range(sessions):
+        day = start + datetime.timedelta(days=rng.randrange(2000))
+        values = dict(SAMPLE)
+        if rng.random() < 0.01:
+            values['fuerza'] = 'Bulgarian split squat 3x10 por pierna'
+        rows.append((rng.randrange(1, users + 1), day.isoformat()) + tuple(values[f] for f in db.TRAINING_FIELDS[1:]))
+    conn.executemany(
+        f"INSERT INTO entrenamientos (user_id, {', '.join(db.TRAINING_FIELDS)}) VALUES ({', '.join('?' * (len(db.TRAINING_FIELDS) + 1))})", rows
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, args_list):
+    """Ejecuta fn con cada tupla de argumentos y devuelve (media_ms, p95_ms)."""
+    durations = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return sum(durations) / len(durations), durations[int(len(durations) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--ops", type=int, default=500, help="operaciones medidas por caso")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    user_ids = [(rng.randrange(1, args.users + 1),) for _ in range(args.ops)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        legacy_path = os.path.join(workdir, "legacy.db")
+        pooled_path = os.path.join(workdir, "pooled.db")
+        legacy_init(legacy_path)
+        db.migrate(pooled_path)
+        for path in (legacy_path, pooled_path):
+            seed(path, args.users, args.sessions)
+        with db.transaction(pooled_path) as conn:
+            # seed() alimenta el índice vía triggers; optimize fusiona sus segmentos
+            conn.execute("INSERT INTO entrenamientos_fts (entrenamientos_fts) VALUES ('optimize')")
+        print(f"{args.users} clientes, {args.sessions} sesiones, {args.ops} operaciones por caso\n")
+
+        cases = [
+            ("guardar borrador",
+             lambda u: legacy_save_draft(legacy_path, u, SAMPLE), lambda u: db.save_draft(u, SAMPLE, path=pooled_path)),
+            ("cargar borrador",
+             lambda u: legacy_get_draft(legacy_path, u), lambda u: db.get_draft(u, path=pooled_path)),
+            ("historial del cliente (20 últimas)",
+             lambda u: legacy_history(legacy_path, u), lambda u: db.client_history(u, path=pooled_path)),
+        ]
+        searches = [(SEARCH_TERMS[i % len(SEARCH_TERMS)],) for i in range(50)]
+        search_case = ("buscar en el historial (50 búsquedas)",
+                       lambda t: legacy_search(legacy_path, t), lambda t: db.search_trainings(t, path=pooled_path))
+        print(f"{'caso':36} {'antes media/p95 (ms)':>22} {'después media/p95 (ms)':>24}")
+        for (name, before_fn, after_fn), inputs in [(case, user_ids) for case in cases] + [(search_case, searches)]:
+            before = timed(before_fn, inputs)
+            after = timed(after_fn, inputs)
+            print(f"{name:36} {before[0]:10.3f} / {before[1]:8.3f} {after[0]:12.3f} / {after[1]:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Micro-benchmark del render de template.html.
+
+Compara el render original (BeautifulSoup en cada llamada) con el motor compilado
+de template_engine.py. Antes de medir comprueba que ambos producen exactamente
+el mismo HTML para el conjunto de fixtures.
+
+Uso:
+    python benchmarks/bench_template.py [--seconds 2]
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import template_engine  # noqa: E402
+
+FIXTURES = [
+    ("Ana García", {'fecha_creacion': '2025-10-06'}),
+    ("Carlos Sánchez", {
+        'fecha_creacion': '2025-10-07',
+        'dia_semana': 'MARTES 7',
+        'objetivo_sesion': 'Fuerza de tren inferior',
+        'warmup_general': '5 min remo\n2 rondas:\n10 air squats\n10 PVC pass-through',
+        'specific_warmup': 'Sentadilla con barra vacía 2x8',
+        'fuerza': 'Back squat 5x5 @ 80kg\nBulgarian split squat 3x10 / pierna',
+        'trabajo_especifico': 'Core: 3x30" plancha',
+        'conditioning': 'AMRAP 12\'\n10 wall balls\n10 box jumps\n200 m run',
+        'anotaciones_coach': 'Controlar la excéntrica.\nRPE < 8 & sin dolor de rodilla',
+    }),
+    ("María \"Mery\" O'Neill", {
+        'fecha_creacion': '2025-12-31',
+        'dia_semana': 'MIÉRCOLES 31',
+        'objetivo_sesion': '',
+        'fuerza': '\n\nDeadlift 3x3 @ 90%\n\n',
+        'conditioning': 'EMOM 10: 5 burpees → 3 pull-ups',
+    }),
+]
+
+
+def render_legacy(data, client_name, path=template_engine.TEMPLATE_PATH):
+    """Render original de app.py: analiza la plantilla completa en cada llamada."""
+    from bs4 import BeautifulSoup
+
+    with open(path, "r", encoding="utf-8") as f:
+        soup = BeautifulSoup(f, "html.parser")
+
+    def replace_content(tag_id, content):
+        element = soup.find(id=tag_id)
+        if element:
+            element.string = content
+
+    replace_content('client_name', client_name)
+    replace_content('training_day', data.get('dia_semana', 'DÍA'))
+    replace_content('training_date', datetime.datetime.fromisoformat(data['fecha_creacion']).strftime('%Y·%m·%d'))
+
+    for key in ['objetivo_sesion', 'warmup_general', 'specific_warmup', 'fuerza', 'trabajo_especifico', 'conditioning', 'anotaciones_coach']:
+        element = soup.find(id=key)
+        if element:
+            element.clear()
+            element.append(BeautifulSoup(data.get(key, '').replace('\n', '<br/>'), 'html.parser'))
+
+    return str(soup)
+
+
+def check_fixtures():
+    """Verifica que el motor compilado reproduce byte a byte el render original."""
+    for client_name, data in FIXTURES:
+        expected = render_legacy(data, client_name).encode("utf-8")
+        actual = template_engine.render(data, client_name).encode("utf-8")
+        if expected != actual:
+            raise SystemExit(f"El render compilado no coincide con el original para '{client_name}'.")
+
+
+def renders_per_second(render_fn, seconds):
+    """Ejecuta render_fn sobre los fixtures durante `seconds` y devuelve renders/s."""
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for client_name, data in FIXTURES:
+            render_fn(data, client_name)
+            count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="duración de cada medición")
+    args = parser.parse_args()
+
+    check_fixtures()
+    print(f"Fixtures: {len(FIXTURES)} casos idénticos byte a byte")
+
+    before = renders_per_second(render_legacy, args.seconds)
+    after = renders_per_second(template_engine.render, args.seconds)
+    print(f"Antes  (BeautifulSoup por llamada): {before:10.0f} renders/s")
+    print(f"Después (plantilla compilada):     {after:10.0f} renders/s")
+    print(f"Mejora: x{after / before:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark de la lista de entrenamientos de un cliente con mucho historial.
+
+Para clientes con N entrenamientos finalizados compara lo que se lee del índice
+(todo el historial con DriveIndex.trainings frente a los primeros con
+iter_finalized) y mide con AppTest el primer render de la página, que ahora
+solo dibuja FINALIZED_PAGE_SIZE enlaces más el botón "Cargar más". También
+cuenta las páginas que pide iter_children al listar la carpeta en Drive
+y comprueba que quedarse con los primeros archivos no pide el resto.
+
+Uso:
+    python benchmarks/bench_training_list.py [--sizes 100 1000 10000]
+"""
+import argparse
+import datetime
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit as st  # noqa: E402
+from streamlit.logger import set_log_level  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from drive_index import DriveIndex  # noqa: E402
+from storage import MemoryBackend, iter_children  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "app.py")
+SECRETS = ["client_id", "client_secret", "auth_uri", "token_uri", "auth_provider_x509_cert_url", "redirect_uris"]
+CLIENT = "Cliente Histórico"
+
+
+def seed(n):
+    """Backend con un cliente que tiene n HTML finalizados, uno por día."""
+    backend = MemoryBackend()
+    root_id = backend.create_folder("JCT Entrenamientos")['id']
+    folder_id = backend.create_folder(CLIENT, root_id)['id']
+    day = datetime.date(2015, 1, 1)
+    for i in range(n):
+        title = f"Entrenamiento {(day + datetime.timedelta(days=i)).isoformat()}.html"
+        backend.write_text(folder_id, title, "<html></html>", mime_type="text/html")
+    return backend, root_id, folder_id
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def render(backend):
+    """Primer render de la página de entrenamientos. Devuelve (ms, enlaces dibujados)."""
+    st.cache_resource.clear()
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    for key in SECRETS:
+        at.secrets[key] = "benchmark"
+    at.session_state["storage"] = backend
+    at.run()  # construye el índice
+    at.session_state["page"] = "training_list"
+    at.session_state["selected_client"] = CLIENT
+    start = time.perf_counter()
+    at.run()
+    elapsed = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise SystemExit(f"Excepción: {at.exception[0].value}")
+    return elapsed, sum(1 for m in at.markdown if m.value.startswith("📄"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+    set_log_level("error")
+
+    print(f"{'finalizados':>11} {'índice: todo':>13} {'índice: 21':>11} {'páginas Drive':>14} "
+          f"{'render (ms)':>12} {'enlaces':>8}")
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        for n in args.sizes:
+            backend, root_id, folder_id = seed(n)
+            index = DriveIndex(os.path.join(workdir, f"index_{n}.db"))
+            index.sync(backend, root_id)
+            full = timed(lambda: index.trainings(CLIENT))
+            first = timed(lambda: list(itertools.islice(index.iter_finalized(CLIENT), 21)))
+
+            backend.calls.clear()
+            list(itertools.islice(iter_children(backend, [folder_id]), 21))
+            pages = backend.calls['list_page']
+
+            ms, links = render(backend)
+            print(f"{n:>11} {full:13.2f} {first:11.2f} {pages:>14} {ms:12.0f} {links:>8}")
+
+
+if __name__ == "__main__":
+    main()
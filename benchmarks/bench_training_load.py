@@ -0,0 +1,158 @@
+"""Benchmark de la extracción de series y la analítica de carga (exercise_parser.py, training_load.py).
+
+Genera un historial sintético de --clients clientes durante --years años
+(--sessions sesiones por semana con varios ejercicios cada una), guarda sus
+series en la tabla de db.py y mide:
+
+- el parser: sesiones de texto libre por segundo al finalizar;
+- la carga de la tabla de series como columnas y su conversión a DataFrame;
+- volumen semanal, tonelaje por ejercicio y 1RM estimado de todos los
+  clientes, vectorizados con pandas/NumPy frente a un bucle fila a fila en
+  Python puro (con los mismos resultados).
+
+Sale con código 1 si los resultados no coinciden o si la analítica vectorizada
+tarda más de --budget segundos.
+
+Uso:
+    python benchmarks/bench_training_load.py [--clients 200] [--years 3] [--budget 1.0]
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import training_load  # noqa: E402
+from exercise_parser import extract_sets  # noqa: E402
+
+EXERCISES = ('Back squat', 'Press banca', 'Peso muerto', 'Press militar', 'Remo con barra', 'Hip thrust',
+             'Front squat', 'Dominadas lastradas')
+
+
+def session_text(rng, base):
+    """Bloque de fuerza con el formato variado que escriben los entrenadores."""
+    lines = []
+    for exercise in rng.sample(EXERCISES, 4):
+        sets, reps = rng.choice(((5, 5), (3, 8), (4, 6), (3, 10), (5, 3), (6, 1)))
+        load = round(base * rng.uniform(0.5, 1.2) * 2) / 2
+        style = rng.randrange(4)
+        if style == 0:
+            lines.append(f"{exercise}\n{sets}x{reps} @ {load}kg")
+        elif style == 1:
+            lines.append(f"- {exercise}: {sets} x {reps} @ {str(load).replace('.', ',')} kg")
+        elif style == 2:
+            lines.append(f"{sets}x{reps} {exercise} {rng.choice((65, 70, 75, 80))}%")
+        else:
+            lines.append(f"A{rng.randint(1, 3)}) {sets}x{reps} {exercise} {round(load / 0.4536)}lbs")
+    return '\n'.join(lines)
+
+
+def build_history(path, clients, years, sessions_per_week, seed=7):
+    """Guarda el historial sintético y devuelve (sesiones, series, segundos del parser)."""
+    rng = random.Random(seed)
+    start = datetime.date.today() - datetime.timedelta(weeks=52 * years)
+    days = [start + datetime.timedelta(days=d) for d in range(0, 7 * 52 * years)
+            if d % 7 in (0, 2, 4, 5)[:sessions_per_week]]
+    rows, parse_time, sessions = [], 0.0, 0
+    for c in range(clients):
+        client_name = f"Cliente {c:04d}"
+        base = rng.uniform(40, 120)
+        for day in days:
+            data = {'fecha_creacion': day.isoformat(), 'fuerza': session_text(rng, base)}
+            started = time.perf_counter()
+            sets = extract_sets(data)
+            parse_time += time.perf_counter() - started
+            sessions += 1
+            rows += [(f"drive:{client_name}/{day}", client_name, data['fecha_creacion'], r['seccion'], r['ejercicio'],
+                      r['series'], r['repeticiones'], r['carga_kg'], r['porcentaje']) for r in sets]
+            base *= 1.001  # progresión lenta
+    with db.transaction(path) as conn:
+        conn.executemany(
+            "INSERT INTO series (sesion, cliente, fecha, seccion, ejercicio, series, repeticiones, carga_kg, porcentaje) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return sessions, len(rows), parse_time
+
+
+def loop_analytics(columns):
+    """Las mismas tres tablas recorriendo las series una a una (lo que haría un informe sin vectorizar)."""
+    weekly = defaultdict(lambda: [0, 0, 0.0])
+    tonnage = defaultdict(float)
+    e1rm = {}
+    for client_name, fecha, exercise, sets, reps, load, _ in zip(*(columns[c] for c in db.SERIES_COLUMNS)):
+        day = datetime.date.fromisoformat(fecha)
+        week = day - datetime.timedelta(days=day.weekday())
+        total = sets * reps
+        volume = weekly[(client_name, week)]
+        volume[0] += sets
+        volume[1] += total
+        volume[2] += total * (load or 0.0)
+        tonnage[(client_name, exercise)] += total * (load or 0.0)
+        if load and 1 <= reps <= training_load.E1RM_MAX_REPS:
+            estimate = round(load if reps == 1 else load * (1 + reps / 30), 1)
+            key = (client_name, exercise, week)
+            e1rm[key] = max(e1rm.get(key, 0.0), estimate)
+    return weekly, tonnage, e1rm
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--sessions", type=int, default=3, help="sesiones por semana (1-4)")
+    parser.add_argument("--budget", type=float, default=1.0, help="segundos máximos de la analítica vectorizada")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "jct_main.db")
+        db.migrate(path)
+        sessions, n_rows, parse_time = build_history(path, args.clients, args.years, args.sessions)
+        print(f"{args.clients} clientes · {args.years} años · {sessions} sesiones · {n_rows} series")
+        print(f"parser: {sessions / parse_time:,.0f} sesiones/s ({parse_time / sessions * 1e6:.0f} µs por sesión)\n")
+
+        columns, load_time = timed(db.load_series, None, path)
+        frame, frame_time = timed(training_load.to_frame, columns)
+        weekly, weekly_time = timed(training_load.weekly_volume, frame)
+        tonnage, tonnage_time = timed(training_load.tonnage_by_exercise, frame)
+        trend, trend_time = timed(training_load.e1rm_trend, frame)
+        vectorized = frame_time + weekly_time + tonnage_time + trend_time
+        (loop_weekly, loop_tonnage, loop_e1rm), loop_time = timed(loop_analytics, columns)
+        db.get_connection(path).close()
+
+    print(f"{'paso':34} {'tiempo (ms)':>12}")
+    print(f"{'leer series de SQLite':34} {load_time * 1000:>12.0f}")
+    print(f"{'columnas → DataFrame':34} {frame_time * 1000:>12.0f}")
+    print(f"{'volumen semanal':34} {weekly_time * 1000:>12.0f}")
+    print(f"{'tonelaje por ejercicio':34} {tonnage_time * 1000:>12.0f}")
+    print(f"{'1RM estimado por semana':34} {trend_time * 1000:>12.0f}")
+    print(f"{'total vectorizado':34} {vectorized * 1000:>12.0f}")
+    print(f"{'bucle fila a fila':34} {loop_time * 1000:>12.0f}  (x{loop_time / vectorized:.1f})")
+
+    same = (
+        len(weekly) == len(loop_weekly)
+        and abs(weekly['tonelaje_kg'].sum() - sum(v[2] for v in loop_weekly.values())) < 1e-3 * max(1, n_rows)
+        and len(tonnage) == len(loop_tonnage)
+        and len(trend) == len(loop_e1rm)
+        and abs(trend['e1rm_kg'].max() - max(loop_e1rm.values())) < 0.05
+    )
+    if not same:
+        print("\nLa analítica vectorizada no coincide con el bucle fila a fila.")
+    if vectorized > args.budget:
+        print(f"\nLa analítica vectorizada supera el presupuesto de {args.budget:g} s.")
+    if not same or vectorized > args.budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Directorio de clientes en memoria: índice id→nombre con búsqueda por prefijo y difusa.
+
+Se carga una vez desde su fuente (la tabla users de SQLite en googledrive.py, el
+índice de Drive en app.py) y solo se vuelve a cargar cuando cambia el sello de
+versión de esa fuente, así que un rerun normal no lee nada. Las búsquedas
+devuelven (id, nombre) y la UI dibuja solo una página de resultados, de modo que
+el selector no depende del número de clientes.
+"""
+import bisect
+import difflib
+import threading
+import unicodedata
+
+PAGE_SIZE = 24
+FUZZY_CUTOFF = 0.6  # similitud mínima (difflib) para los resultados aproximados
+FUZZY_LIMIT = 20  # resultados aproximados como máximo
+CACHED_QUERIES = 32  # búsquedas recientes guardadas (cambiar de página no repite la búsqueda)
+
+
+def normalize(text):
+    """Minúsculas, sin tildes y con los espacios colapsados, para comparar nombres."""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.lower().split())
+
+
+def paginate(items, page, page_size=PAGE_SIZE):
+    """Devuelve (elementos de la página, página ajustada al rango, número de páginas)."""
+    pages = max(1, -(-len(items) // page_size))
+    page = min(max(page, 0), pages - 1)
+    return items[page * page_size:(page + 1) * page_size], page, pages
+
+
+class ClientDirectory:
+    """Índice de clientes compartido por todo el proceso.
+
+    loader() devuelve un iterable de (id, nombre); stamp() un valor barato que
+    cambia cuando cambia la fuente (un contador de cambios, una generación...).
+    """
+
+    def __init__(self, loader, stamp):
+        self._loader = loader
+        self._stamp = stamp
+        self._lock = threading.Lock()
+        self._loaded_stamp = object()  # fuerza la primera carga
+        self._names = {}
+        self._ids_by_name = {}
+        self._keys = []  # [(nombre normalizado, id)] ordenada, para el prefijo con bisect
+        self._ids_by_key = {}  # nombre normalizado -> [ids], para la búsqueda difusa
+        self._results = {}
+
+    def refresh(self):
+        """Recarga el índice solo si la fuente ha cambiado desde la última carga."""
+        stamp = self._stamp()
+        if stamp == self._loaded_stamp:
+            return self
+        entries = list(self._loader())
+        names = {client_id: name for client_id, name in entries}
+        keys = sorted((normalize(name), client_id) for client_id, name in names.items())
+        ids_by_key = {}
+        for key, client_id in keys:
+            ids_by_key.setdefault(key, []).append(client_id)
+        with self._lock:
+            self._names = names
+            self._ids_by_name = {name: client_id for client_id, name in names.items()}
+            self._keys = keys
+            self._ids_by_key = ids_by_key
+            self._results = {}
+            self._loaded_stamp = stamp
+        return self
+
+    def __len__(self):
+        return len(self._names)
+
+    def name(self, client_id):
+        return self._names.get(client_id)
+
+    def find(self, name):
+        """ID del cliente con ese nombre exacto, o None."""
+        return self._ids_by_name.get(name)
+
+    def search(self, query=''):
+        """Clientes que coinciden con query, los mejores primero, como [(id, nombre)].
+
+        Primero los que empiezan por query (búsqueda binaria sobre los nombres
+        ordenados) y luego los que tienen alguna palabra que empieza por query. Si
+        no hay ninguno, los parecidos según difflib (errores de tecleo). Sin query
+        devuelve todos por orden alfabético.
+        """
+        q = normalize(query)
+        with self._lock:
+            keys, names, ids_by_key = self._keys, self._names, self._ids_by_key
+            cached = self._results.get(q)
+        if cached is not None:
+            return cached
+        results = [(client_id, names[client_id]) for client_id in self._match(q, keys, ids_by_key)]
+        with self._lock:
+            if self._keys is keys:
+                if len(self._results) >= CACHED_QUERIES:
+                    self._results.pop(next(iter(self._results)))
+                self._results[q] = results
+        return results
+
+    @staticmethod
+    def _match(q, keys, ids_by_key):
+        if not q:
+            return [client_id for _, client_id in keys]
+
+        ids, seen = [], set()
+
+        def add(client_id):
+            if client_id not in seen:
+                seen.add(client_id)
+                ids.append(client_id)
+
+        i = bisect.bisect_left(keys, (q,))
+        while i < len(keys) and keys[i][0].startswith(q):
+            add(keys[i][1])
+            i += 1
+        for key, client_id in keys:
+            if f' {q}' in f' {key}':
+                add(client_id)
+        if not ids:
+            for key in difflib.get_close_matches(q, ids_by_key, n=FUZZY_LIMIT, cutoff=FUZZY_CUTOFF):
+                for client_id in ids_by_key[key]:
+                    add(client_id)
+        return ids
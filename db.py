@@ -0,0 +1,538 @@
+"""Capa de acceso a la base de datos SQLite de googledrive.py.
+
+Cada hilo reutiliza su propia conexión (se cierra sola cuando el hilo termina)
+en lugar de abrir y cerrar una por consulta. Las conexiones se abren en modo WAL
+con pragmas pensados para una base pequeña y muy leída, y las escrituras van
+dentro de transacciones explícitas.
+
+El esquema se versiona con PRAGMA user_version: migrate() aplica, una sola vez y
+en orden, las migraciones de MIGRATIONS que la base todavía no tiene.
+"""
+import datetime
+import html
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+DB_DIR = "database"
+DB_PATH = os.path.join(DB_DIR, "jct_main.db")
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # seguro con WAL; solo se pierde la última transacción si se va la luz
+    "PRAGMA cache_size=-20000",  # ~20 MB de caché de páginas
+    "PRAGMA mmap_size=268435456",  # 256 MB mapeados en memoria
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA busy_timeout=5000",
+)
+
+TRAINING_FIELDS = (
+    'fecha_creacion', 'dia_semana', 'objetivo_sesion', 'warmup_general', 'specific_warmup',
+    'fuerza', 'trabajo_especifico', 'conditioning', 'anotaciones_coach',
+)
+
+# Columnas de texto libre indexadas para la búsqueda
+SEARCH_FIELDS = (
+    'objetivo_sesion', 'warmup_general', 'specific_warmup', 'fuerza',
+    'trabajo_especifico', 'conditioning', 'anotaciones_coach',
+)
+
+LOCK_WAIT_THRESHOLD = 0.001  # segundos de espera en BEGIN IMMEDIATE a partir de los que una transacción cuenta como bloqueada
+
+_local = threading.local()
+_lock_stats = Counter()
+_lock_stats_lock = threading.Lock()
+
+
+def get_connection(path=None):
+    """Devuelve la conexión del hilo actual a la base indicada (DB_PATH por defecto)."""
+    path = path or DB_PATH
+    connections = _local.__dict__.setdefault('connections', {})
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # isolation_level=None: sin transacciones implícitas, las abrimos nosotros.
+        conn = sqlite3.connect(path, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        connections[path] = conn
+    return conn
+
+
+@contextmanager
+def transaction(path=None):
+    """Ejecuta el bloque dentro de una transacción de escritura (BEGIN IMMEDIATE).
+
+    El tiempo que BEGIN IMMEDIATE espera a que otra conexión suelte el bloqueo de
+    escritura se acumula en lock_stats().
+    """
+    conn = get_connection(path)
+    started = time.perf_counter()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+    except sqlite3.OperationalError:
+        _note_lock_wait(time.perf_counter() - started, busy=True)  # busy_timeout agotado: "database is locked"
+        raise
+    _note_lock_wait(time.perf_counter() - started)
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _note_lock_wait(seconds, busy=False):
+    with _lock_stats_lock:
+        _lock_stats['transactions'] += 1
+        _lock_stats['wait_total'] += seconds
+        _lock_stats['wait_max'] = max(_lock_stats['wait_max'], seconds)
+        if seconds >= LOCK_WAIT_THRESHOLD:
+            _lock_stats['contended'] += 1
+        if busy:
+            _lock_stats['busy_errors'] += 1
+
+
+def lock_stats(reset=False):
+    """Transacciones de escritura del proceso, cuántas esperaron el bloqueo, espera total/máxima (ms) y errores por bloqueo."""
+    with _lock_stats_lock:
+        stats = {
+            'transactions': _lock_stats['transactions'],
+            'contended': _lock_stats['contended'],
+            'busy_errors': _lock_stats['busy_errors'],
+            'wait_total_ms': round(_lock_stats['wait_total'] * 1000, 1),
+            'wait_max_ms': round(_lock_stats['wait_max'] * 1000, 1),
+        }
+        if reset:
+            _lock_stats.clear()
+    return stats
+
+
+# --- MIGRACIONES ---
+# Cada migración recibe la conexión dentro de su transacción. Las primeras usan
+# IF NOT EXISTS porque las bases anteriores al versionado ya tienen parte del
+# esquema con user_version = 0. Para cambiar el esquema se añade una migración
+# al final; nunca se modifica una que ya se haya publicado.
+
+def _migration_base_tables(conn):
+    conn.execute('CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, nombre TEXT, objetivo TEXT, username TEXT UNIQUE, password_hash TEXT, fecha_registro TEXT)')
+    conn.execute('CREATE TABLE IF NOT EXISTS entrenamientos (id INTEGER PRIMARY KEY, user_id INTEGER, fecha_creacion TEXT, dia_semana TEXT, objetivo_sesion TEXT, warmup_general TEXT, specific_warmup TEXT, fuerza TEXT, trabajo_especifico TEXT, conditioning TEXT, anotaciones_coach TEXT, FOREIGN KEY (user_id) REFERENCES users (id))')
+    conn.execute('CREATE TABLE IF NOT EXISTS drafts (user_id INTEGER PRIMARY KEY, draft_data TEXT, last_updated TEXT, FOREIGN KEY (user_id) REFERENCES users (id))')
+
+
+def _migration_history_indexes(conn):
+    # Historial de un cliente ordenado por fecha, y listados globales por fecha
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_entrenamientos_user_fecha ON entrenamientos (user_id, fecha_creacion)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_entrenamientos_fecha ON entrenamientos (fecha_creacion)')
+
+
+def _migration_search_index(conn):
+    """Índice FTS5 sobre entrenamientos, mantenido por triggers en cada INSERT/UPDATE/DELETE."""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'entrenamientos_fts'").fetchone()
+    columns = ', '.join(SEARCH_FIELDS)
+    new_values = ', '.join(f'new.{f}' for f in SEARCH_FIELDS)
+    old_values = ', '.join(f'old.{f}' for f in SEARCH_FIELDS)
+    conn.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS entrenamientos_fts USING fts5({columns}, "
+        "content='entrenamientos', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+    )
+    conn.execute(
+        "CREATE TRIGGER IF NOT EXISTS entrenamientos_fts_ai AFTER INSERT ON entrenamientos BEGIN "
+        f"INSERT INTO entrenamientos_fts (rowid, {columns}) VALUES (new.id, {new_values}); END"
+    )
+    conn.execute(
+        "CREATE TRIGGER IF NOT EXISTS entrenamientos_fts_ad AFTER DELETE ON entrenamientos BEGIN "
+        f"INSERT INTO entrenamientos_fts (entrenamientos_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+    )
+    conn.execute(
+        "CREATE TRIGGER IF NOT EXISTS entrenamientos_fts_au AFTER UPDATE ON entrenamientos BEGIN "
+        f"INSERT INTO entrenamientos_fts (entrenamientos_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO entrenamientos_fts (rowid, {columns}) VALUES (new.id, {new_values}); END"
+    )
+    if not exists:
+        # Indexa el historial que ya existía antes de crear la tabla FTS
+        conn.execute("INSERT INTO entrenamientos_fts (entrenamientos_fts) VALUES ('rebuild')")
+
+
+def _migration_change_counters(conn):
+    """Contador de cambios de users, para que las cachés en memoria sepan cuándo recargar."""
+    conn.execute('CREATE TABLE IF NOT EXISTS change_counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+    conn.execute("INSERT OR IGNORE INTO change_counters (name, value) VALUES ('users', 0)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS users_changes_{event.lower()} AFTER {event} ON users BEGIN "
+            "UPDATE change_counters SET value = value + 1 WHERE name = 'users'; END"
+        )
+
+
+def _migration_exercise_sets(conn):
+    """Tabla de series (ejercicio, series, repeticiones, carga) extraídas de cada sesión finalizada.
+
+    La comparten las dos apps: 'sesion' identifica la sesión ('db:<id>' para las
+    de entrenamientos, 'drive:<cliente>/<nombre>' para las de app.py) y 'cliente'
+    es el nombre del cliente. Se rellena con las sesiones que ya existían.
+    """
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS series (id INTEGER PRIMARY KEY, sesion TEXT NOT NULL, '
+        'entrenamiento_id INTEGER REFERENCES entrenamientos (id) ON DELETE CASCADE, cliente TEXT NOT NULL, '
+        'fecha TEXT NOT NULL, seccion TEXT, ejercicio TEXT NOT NULL, series INTEGER, repeticiones INTEGER, '
+        'carga_kg REAL, porcentaje REAL)'
+    )
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_series_cliente_fecha ON series (cliente, fecha)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_series_sesion ON series (sesion)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_series_entrenamiento ON series (entrenamiento_id)')
+    trainings = conn.execute(
+        "SELECT e.*, u.nombre AS cliente FROM entrenamientos e JOIN users u ON u.id = e.user_id"
+    ).fetchall()
+    for row in trainings:
+        _replace_series(conn, f"db:{row['id']}", row['cliente'], dict(row), training_id=row['id'])
+
+
+def _migration_drive_outbox(conn):
+    """Outbox de las subidas a Drive de googledrive.py y enlace de Drive de cada entrenamiento.
+
+    Las sesiones anteriores se subían al finalizar, así que no se encolan.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(entrenamientos)")]
+    if 'drive_link' not in columns:
+        conn.execute('ALTER TABLE entrenamientos ADD COLUMN drive_link TEXT')
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS drive_outbox (id INTEGER PRIMARY KEY, '
+        'entrenamiento_id INTEGER NOT NULL UNIQUE REFERENCES entrenamientos (id) ON DELETE CASCADE, '
+        'cliente TEXT NOT NULL, creado REAL NOT NULL, proximo_intento REAL NOT NULL, '
+        'intentos INTEGER NOT NULL DEFAULT 0, ultimo_error TEXT)'
+    )
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_drive_outbox_proximo ON drive_outbox (proximo_intento)')
+
+
+def _migration_drive_import(conn):
+    """Punto de control de la importación del archivo de Drive: qué versión de cada archivo ya está en la base."""
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS drive_import (file_id TEXT PRIMARY KEY, modified_date TEXT NOT NULL, '
+        'entrenamiento_id INTEGER REFERENCES entrenamientos (id) ON DELETE CASCADE, importado REAL NOT NULL)'
+    )
+
+
+# La versión del esquema es la posición en esta lista (1, 2, 3...)
+MIGRATIONS = (
+    _migration_base_tables,
+    _migration_history_indexes,
+    _migration_search_index,
+    _migration_change_counters,
+    _migration_exercise_sets,
+    _migration_drive_outbox,
+    _migration_drive_import,
+)
+
+
+def schema_version(path=None):
+    return get_connection(path).execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(path=None):
+    """Aplica las migraciones pendientes y devuelve la versión final del esquema.
+
+    Cada migración va en su propia transacción junto con el cambio de
+    user_version, así que una migración que falla no deja la base a medias y
+    varios procesos arrancando a la vez no aplican dos veces la misma.
+    """
+    for version, migration in enumerate(MIGRATIONS, start=1):
+        if schema_version(path) >= version:
+            continue
+        with transaction(path) as conn:
+            # Otro proceso puede habernos adelantado entre la lectura y el BEGIN IMMEDIATE
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                continue
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+    return schema_version(path)
+
+
+# --- BORRADORES ---
+
+def get_draft(user_id, path=None):
+    draft = get_connection(path).execute("SELECT draft_data FROM drafts WHERE user_id = ?", (user_id,)).fetchone()
+    return json.loads(draft['draft_data']) if draft else None
+
+
+def save_draft(user_id, data, path=None):
+    with transaction(path) as conn:
+        conn.execute("REPLACE INTO drafts (user_id, draft_data, last_updated) VALUES (?, ?, ?)", (user_id, json.dumps(data), datetime.datetime.now().isoformat()))
+
+
+def delete_draft(user_id, path=None):
+    with transaction(path) as conn:
+        conn.execute("DELETE FROM drafts WHERE user_id = ?", (user_id,))
+
+
+# --- ENTRENAMIENTOS ---
+
+def _insert_training(conn, data):
+    """Inserta el entrenamiento y sus series dentro de una transacción. Devuelve (ID, nombre del cliente)."""
+    columns = ', '.join(('user_id',) + TRAINING_FIELDS)
+    placeholders = ', '.join('?' * (len(TRAINING_FIELDS) + 1))
+    cursor = conn.execute(
+        f"INSERT INTO entrenamientos ({columns}) VALUES ({placeholders})",
+        (data['user_id'],) + tuple(data.get(field) for field in TRAINING_FIELDS),
+    )
+    training_id = cursor.lastrowid
+    client_name = data.get('client_name') or conn.execute(
+        "SELECT nombre FROM users WHERE id = ?", (data['user_id'],)
+    ).fetchone()[0]
+    _replace_series(conn, f"db:{training_id}", client_name, data, training_id=training_id)
+    return training_id, client_name
+
+
+def insert_training(data, path=None):
+    """Guarda un entrenamiento finalizado (y sus series) y devuelve su ID."""
+    with transaction(path) as conn:
+        return _insert_training(conn, data)[0]
+
+
+def finalize_training(data, path=None):
+    """Finaliza un entrenamiento en una sola transacción local y devuelve su ID.
+
+    Inserta el entrenamiento y sus series, lo encola en drive_outbox para que el
+    hilo del outbox lo suba a Drive y borra el borrador del cliente: o se hace
+    todo o nada, y no espera a Drive.
+    """
+    with transaction(path) as conn:
+        training_id, client_name = _insert_training(conn, data)
+        now = time.time()
+        conn.execute(
+            "INSERT INTO drive_outbox (entrenamiento_id, cliente, creado, proximo_intento) VALUES (?, ?, ?, ?)",
+            (training_id, client_name, now, now),
+        )
+        conn.execute("DELETE FROM drafts WHERE user_id = ?", (data['user_id'],))
+        return training_id
+
+
+# --- OUTBOX DE DRIVE ---
+# Cada fila es un entrenamiento pendiente de subir. Al subirse se guarda el enlace
+# en entrenamientos.drive_link y se borra la fila; si falla, se apunta el error y
+# cuándo reintentarlo.
+
+def due_outbox(limit, now=None, path=None):
+    """Hasta `limit` entrenamientos con la subida pendiente y vencida (todos con now=inf), los más antiguos primero.
+
+    Cada uno es un dict con los campos del entrenamiento y 'outbox_id',
+    'entrenamiento_id', 'client_name' e 'intentos'.
+    """
+    rows = get_connection(path).execute(
+        f"SELECT o.id AS outbox_id, o.entrenamiento_id, o.cliente AS client_name, o.intentos, "
+        f"{', '.join('e.' + field for field in TRAINING_FIELDS)} "
+        "FROM drive_outbox o JOIN entrenamientos e ON e.id = o.entrenamiento_id "
+        "WHERE o.proximo_intento <= ? ORDER BY o.proximo_intento, o.id LIMIT ?",
+        (time.time() if now is None else now, limit),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def start_outbox_attempts(outbox_ids, path=None):
+    """Suma un intento a cada fila antes de subirla, en su propia transacción.
+
+    Si el proceso muere a mitad de lote, las filas ya subidas vuelven con
+    intentos > 0 y la subida busca primero el archivo que llegó a crear.
+    """
+    with transaction(path) as conn:
+        conn.executemany("UPDATE drive_outbox SET intentos = intentos + 1 WHERE id = ?",
+                         [(outbox_id,) for outbox_id in outbox_ids])
+
+
+def record_outbox_results(sent, failed, path=None):
+    """Apunta el resultado de un lote en una transacción.
+
+    sent: [(outbox_id, entrenamiento_id, enlace)]; failed: [(outbox_id, error, reintentar_en)].
+    El intento ya lo contó start_outbox_attempts.
+    """
+    with transaction(path) as conn:
+        conn.executemany("UPDATE entrenamientos SET drive_link = ? WHERE id = ?",
+                         [(link, training_id) for _, training_id, link in sent])
+        conn.executemany("DELETE FROM drive_outbox WHERE id = ?", [(outbox_id,) for outbox_id, _, _ in sent])
+        conn.executemany(
+            "UPDATE drive_outbox SET ultimo_error = ?, proximo_intento = ? WHERE id = ?",
+            [(error, retry_at, outbox_id) for outbox_id, error, retry_at in failed],
+        )
+
+
+def retry_outbox_now(path=None):
+    """Hace vencer ya todas las subidas pendientes (botón "Reintentar ahora")."""
+    with transaction(path) as conn:
+        conn.execute("UPDATE drive_outbox SET proximo_intento = ?", (time.time(),))
+
+
+def outbox_status(path=None):
+    """Entrenamientos todavía sin subir a Drive, con sus intentos, último error y próximo intento."""
+    rows = get_connection(path).execute(
+        "SELECT o.id, o.cliente, e.fecha_creacion, o.creado, o.intentos, o.ultimo_error, o.proximo_intento "
+        "FROM drive_outbox o JOIN entrenamientos e ON e.id = o.entrenamiento_id ORDER BY o.id"
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def outbox_counts(path=None):
+    """Número de subidas pendientes y cuántas de ellas han fallado alguna vez."""
+    return tuple(get_connection(path).execute(
+        "SELECT COUNT(*), COALESCE(SUM(ultimo_error IS NOT NULL), 0) FROM drive_outbox"
+    ).fetchone())
+
+
+# --- IMPORTACIÓN DEL ARCHIVO DE DRIVE ---
+# drive_import.py vuelca los HTML finalizados de app.py en users/entrenamientos.
+# Cada archivo importado deja en drive_import su modifiedDate, en la misma
+# transacción que sus filas: lo que ya está no se vuelve a descargar.
+
+def import_checkpoints(path=None):
+    """{ID del archivo de Drive: modifiedDate importado}."""
+    return dict(get_connection(path).execute("SELECT file_id, modified_date FROM drive_import").fetchall())
+
+
+def _client_id(conn, client_name, clients):
+    """ID del cliente en users por su nombre (dándolo de alta si no existe); clients es una caché del lote."""
+    if client_name not in clients:
+        row = conn.execute("SELECT id FROM users WHERE nombre = ? ORDER BY id LIMIT 1", (client_name,)).fetchone()
+        clients[client_name] = row[0] if row else conn.execute(
+            "INSERT INTO users (nombre, fecha_registro) VALUES (?, ?)", (client_name, datetime.datetime.now().isoformat())
+        ).lastrowid
+    return clients[client_name]
+
+
+def save_imported_trainings(items, path=None):
+    """Inserta o actualiza un lote de entrenamientos importados en una transacción. Devuelve (nuevos, actualizados).
+
+    items: dicts con 'file_id', 'modified_date', 'client_name', 'session' (clave
+    de sus series), 'link' y 'data' (los campos de TRAINING_FIELDS). Un archivo
+    ya importado actualiza su fila en lugar de crear otra.
+    """
+    columns = ('user_id',) + TRAINING_FIELDS + ('drive_link',)
+    inserted = updated = 0
+    clients = {}
+    with transaction(path) as conn:
+        for item in items:
+            data = item['data']
+            values = ((_client_id(conn, item['client_name'], clients),)
+                      + tuple(data.get(field) for field in TRAINING_FIELDS) + (item['link'],))
+            row = conn.execute(
+                "SELECT i.entrenamiento_id FROM drive_import i JOIN entrenamientos e ON e.id = i.entrenamiento_id "
+                "WHERE i.file_id = ?", (item['file_id'],)
+            ).fetchone()
+            if row:
+                training_id = row[0]
+                conn.execute(f"UPDATE entrenamientos SET {', '.join(c + ' = ?' for c in columns)} WHERE id = ?",
+                             values + (training_id,))
+                updated += 1
+            else:
+                training_id = conn.execute(
+                    f"INSERT INTO entrenamientos ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", values
+                ).lastrowid
+                inserted += 1
+            _replace_series(conn, item['session'], item['client_name'], data, training_id=training_id)
+            conn.execute(
+                "INSERT INTO drive_import (file_id, modified_date, entrenamiento_id, importado) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (file_id) DO UPDATE SET modified_date = excluded.modified_date, "
+                "entrenamiento_id = excluded.entrenamiento_id, importado = excluded.importado",
+                (item['file_id'], item['modified_date'], training_id, time.time()),
+            )
+    return inserted, updated
+
+
+# --- SERIES (CARGA DE ENTRENAMIENTO) ---
+
+SERIES_COLUMNS = ('cliente', 'fecha', 'ejercicio', 'series', 'repeticiones', 'carga_kg', 'porcentaje')
+
+
+def _replace_series(conn, session, client_name, data, training_id=None):
+    """Sustituye las series guardadas de una sesión por las extraídas de data (dentro de una transacción)."""
+    from exercise_parser import extract_sets  # sus expresiones regulares no se compilan al arrancar las apps
+
+    conn.execute("DELETE FROM series WHERE sesion = ?", (session,))
+    conn.executemany(
+        "INSERT INTO series (sesion, entrenamiento_id, cliente, fecha, seccion, ejercicio, series, repeticiones, "
+        "carga_kg, porcentaje) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(session, training_id, client_name, data.get('fecha_creacion') or '', row['seccion'], row['ejercicio'],
+          row['series'], row['repeticiones'], row['carga_kg'], row['porcentaje']) for row in extract_sets(data)],
+    )
+
+
+def record_series(session, client_name, data, path=None):
+    """Guarda (o reemplaza, si se finaliza de nuevo) las series de una sesión que no está en entrenamientos."""
+    with transaction(path) as conn:
+        _replace_series(conn, session, client_name, data)
+
+
+def load_series(client_name=None, path=None):
+    """Series de un cliente (o de todos) como columnas: {columna: lista}, con las de SERIES_COLUMNS."""
+    query = f"SELECT {', '.join(SERIES_COLUMNS)} FROM series"
+    params = ()
+    if client_name is not None:
+        query += " WHERE cliente = ?"
+        params = (client_name,)
+    cursor = get_connection(path).cursor()
+    cursor.row_factory = None  # tuplas: mucho más rápidas de trasponer que sqlite3.Row
+    columns = list(zip(*cursor.execute(query, params).fetchall())) or [()] * len(SERIES_COLUMNS)
+    return {column: list(values) for column, values in zip(SERIES_COLUMNS, columns)}
+
+
+def series_clients(path=None):
+    """Clientes con alguna serie registrada, por orden alfabético (sale del índice por cliente y fecha)."""
+    return [row[0] for row in get_connection(path).execute("SELECT DISTINCT cliente FROM series ORDER BY cliente")]
+
+
+def client_history(user_id, limit=20, path=None):
+    """Últimos entrenamientos de un cliente, del más reciente al más antiguo."""
+    return get_connection(path).execute(
+        "SELECT * FROM entrenamientos WHERE user_id = ? ORDER BY fecha_creacion DESC LIMIT ?", (user_id, limit)
+    ).fetchall()
+
+
+def list_clients(path=None):
+    """(id, nombre) de todos los clientes."""
+    return get_connection(path).execute("SELECT id, nombre FROM users").fetchall()
+
+
+def users_version(path=None):
+    """Contador que aumenta con cada alta, cambio o baja en users."""
+    return get_connection(path).execute("SELECT value FROM change_counters WHERE name = 'users'").fetchone()[0]
+
+
+# --- BÚSQUEDA EN EL HISTORIAL ---
+
+_HIGHLIGHT_START, _HIGHLIGHT_END = '\x02', '\x03'
+
+
+def _fts_query(text):
+    """Convierte lo que escribe el usuario en una consulta FTS5 segura (todas las palabras, por prefijo)."""
+    return ' '.join(f'"{token}"*' for token in re.findall(r'\w+', text))
+
+
+def _highlight_html(snippet):
+    """Escapa un fragmento y marca las coincidencias con <mark>."""
+    return html.escape(snippet).replace(_HIGHLIGHT_START, '<mark>').replace(_HIGHLIGHT_END, '</mark>')
+
+
+def search_trainings(text, limit=50, path=None):
+    """Busca en el historial de todos los clientes, ordenado por relevancia (bm25).
+
+    Devuelve dicts con id, user_id, nombre, fecha_creacion y snippet (HTML con las
+    coincidencias resaltadas).
+    """
+    query = _fts_query(text)
+    if not query:
+        return []
+    rows = get_connection(path).execute(
+        "SELECT e.id, e.user_id, u.nombre, e.fecha_creacion, "
+        "snippet(entrenamientos_fts, -1, ?, ?, '…', 16) AS snippet "
+        "FROM entrenamientos_fts JOIN entrenamientos e ON e.id = entrenamientos_fts.rowid "
+        "LEFT JOIN users u ON u.id = e.user_id "
+        "WHERE entrenamientos_fts MATCH ? ORDER BY bm25(entrenamientos_fts) LIMIT ?",
+        (_HIGHLIGHT_START, _HIGHLIGHT_END, query, limit),
+    ).fetchall()
+    return [dict(row, snippet=_highlight_html(row['snippet'])) for row in rows]
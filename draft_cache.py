@@ -0,0 +1,115 @@
+"""Caché de lectura del contenido de los borradores, en dos niveles.
+
+Las entradas se identifican por (ID de archivo de Drive, modifiedDate): si el
+archivo cambia en Drive su fecha cambia y la entrada deja de valer, así que
+basta con unos metadatos frescos para saber si el contenido guardado sirve.
+
+- Nivel 1: LRU en memoria con un número máximo de entradas.
+- Nivel 2: tabla SQLite en disco con un tamaño máximo en bytes; al superarlo se
+  expulsan las entradas usadas hace más tiempo. Sobrevive a los reinicios.
+
+Es seguro usarla desde varios hilos (el de Streamlit, el de sincronización del
+journal y los de la finalización en bloque).
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+MEMORY_ITEMS = 64
+DISK_BYTES = 50 * 1024 * 1024
+
+
+class DraftCache:
+    """Contenido de borradores por (file_id, modifiedDate)."""
+
+    def __init__(self, path, memory_items=MEMORY_ITEMS, disk_bytes=DISK_BYTES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cached_drafts ("
+            "file_id TEXT PRIMARY KEY, modified TEXT, content TEXT, size INTEGER, accessed REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cached_drafts_accessed ON cached_drafts (accessed)")
+        self._conn.commit()
+        self._disk_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cached_drafts").fetchone()[0]
+        self.hits = {'memory': 0, 'disk': 0}
+        self.misses = 0
+
+    def get(self, file_id, modified):
+        """Contenido guardado para esa versión del archivo, o None."""
+        key = (file_id, modified)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits['memory'] += 1
+                return self._memory[key]
+            row = self._conn.execute(
+                "SELECT content FROM cached_drafts WHERE file_id = ? AND modified = ?", key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE cached_drafts SET accessed = ? WHERE file_id = ?", (time.time(), file_id))
+            self._conn.commit()
+            self._remember(key, row[0])
+            self.hits['disk'] += 1
+            return row[0]
+
+    def put(self, file_id, modified, content):
+        """Guarda una versión (sustituye a cualquier otra del mismo archivo)."""
+        size = len(content.encode('utf-8'))
+        with self._lock:
+            self._forget_memory(file_id)
+            self._remember((file_id, modified), content)
+            if size > self.disk_bytes:
+                return
+            old = self._conn.execute("SELECT size FROM cached_drafts WHERE file_id = ?", (file_id,)).fetchone()
+            self._conn.execute(
+                "REPLACE INTO cached_drafts (file_id, modified, content, size, accessed) VALUES (?, ?, ?, ?, ?)",
+                (file_id, modified, content, size, time.time()),
+            )
+            self._disk_size += size - (old[0] if old else 0)
+            self._evict_disk()
+            self._conn.commit()
+
+    def discard(self, file_id):
+        """Olvida cualquier versión del archivo (p. ej. al borrarlo)."""
+        with self._lock:
+            self._forget_memory(file_id)
+            row = self._conn.execute("SELECT size FROM cached_drafts WHERE file_id = ?", (file_id,)).fetchone()
+            if row:
+                self._conn.execute("DELETE FROM cached_drafts WHERE file_id = ?", (file_id,))
+                self._conn.commit()
+                self._disk_size -= row[0]
+
+    # --- Internos (con self._lock tomado) ---
+
+    def _remember(self, key, content):
+        self._memory[key] = content
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _forget_memory(self, file_id):
+        for key in [k for k in self._memory if k[0] == file_id]:
+            del self._memory[key]
+
+    def _evict_disk(self):
+        while self._disk_size > self.disk_bytes:
+            rows = self._conn.execute(
+                "SELECT file_id, size FROM cached_drafts ORDER BY accessed LIMIT 32"
+            ).fetchall()
+            if not rows:
+                self._disk_size = 0
+                return
+            for file_id, size in rows:
+                self._conn.execute("DELETE FROM cached_drafts WHERE file_id = ?", (file_id,))
+                self._disk_size -= size
+                if self._disk_size <= self.disk_bytes:
+                    return
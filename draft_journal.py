@@ -0,0 +1,211 @@
+"""Journal local de borradores con sincronización diferida a Google Drive.
+
+Guardar un borrador escribe solo en una base SQLite local y vuelve enseguida. Un
+hilo en segundo plano sube después cada borrador pendiente; varias escrituras
+seguidas del mismo borrador se agrupan en una sola subida porque el journal solo
+guarda la última versión. Las filas se borran al sincronizarse, así que todo lo
+que queda en el archivo tras un reinicio se vuelve a subir.
+
+Cada borrador se identifica además por el hash de su contenido canónico. El
+journal recuerda el hash de la última versión que llegó a Drive y no programa
+ninguna subida si lo que se guarda es idéntico, de modo que el autoguardado
+solo escribe en Drive cuando el entrenador ha cambiado algo de verdad.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SYNC_DELAY = 2.0  # segundos sin cambios antes de subir un borrador (agrupa ráfagas de guardados)
+RETRY_DELAY_MAX = 60.0
+
+
+def content_hash(data):
+    """SHA-256 del borrador serializado de forma canónica (claves ordenadas, sin espacios)."""
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class DraftJournal:
+    """Borradores pendientes de subir, indexados por (cliente, borrador)."""
+
+    def __init__(self, path, sync_delay=SYNC_DELAY):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.sync_delay = sync_delay
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending_drafts ("
+            "client TEXT, draft TEXT, data TEXT, version INTEGER, updated_at REAL, "
+            "attempts INTEGER DEFAULT 0, last_error TEXT, PRIMARY KEY (client, draft))"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(pending_drafts)")]
+        if 'hash' not in columns:  # journals creados antes de guardar el hash
+            self._conn.execute("ALTER TABLE pending_drafts ADD COLUMN hash TEXT")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS synced_drafts (client TEXT, draft TEXT, hash TEXT, synced_at REAL, "
+            "PRIMARY KEY (client, draft))"
+        )
+        self._conn.commit()
+        self._db_lock = threading.Lock()
+        # Se mantiene durante una subida; discard() lo toma para no competir con ella.
+        self._upload_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._uploader = None
+        self._thread = None
+
+    # --- Escritura y lectura (hilo de Streamlit) ---
+
+    def write(self, client, draft, data):
+        """Guarda la última versión del borrador y programa su subida.
+
+        Devuelve False sin escribir nada si el contenido es el mismo que ya está
+        pendiente o, si no hay nada pendiente, el mismo que se subió por última vez.
+        """
+        digest = content_hash(data)
+        with self._db_lock:
+            pending = self._conn.execute(
+                "SELECT hash FROM pending_drafts WHERE client = ? AND draft = ?", (client, draft)
+            ).fetchone()
+            if pending is not None and pending[0] == digest:
+                return False
+            if pending is None and self._synced_hash(client, draft) == digest:
+                return False
+            self._conn.execute(
+                "INSERT INTO pending_drafts (client, draft, data, version, updated_at, hash) VALUES (?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT (client, draft) DO UPDATE SET data = excluded.data, version = version + 1, "
+                "updated_at = excluded.updated_at, hash = excluded.hash, attempts = 0, last_error = NULL",
+                (client, draft, json.dumps(data), time.time(), digest),
+            )
+            self._conn.commit()
+        self._wake.set()
+        return True
+
+    def mark_synced(self, client, draft, data):
+        """Registra que Drive tiene este contenido (p. ej. recién leído de allí)."""
+        with self._db_lock:
+            self._set_synced(client, draft, content_hash(data))
+            self._conn.commit()
+
+    def status(self, client, draft):
+        """'pending' si hay cambios sin subir, 'synced' si Drive tiene la última versión, None si no se conoce."""
+        with self._db_lock:
+            if self._conn.execute(
+                "SELECT 1 FROM pending_drafts WHERE client = ? AND draft = ?", (client, draft)
+            ).fetchone():
+                return 'pending'
+            return 'synced' if self._synced_hash(client, draft) else None
+
+    def _synced_hash(self, client, draft):
+        row = self._conn.execute(
+            "SELECT hash FROM synced_drafts WHERE client = ? AND draft = ?", (client, draft)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_synced(self, client, draft, digest):
+        self._conn.execute(
+            "REPLACE INTO synced_drafts (client, draft, hash, synced_at) VALUES (?, ?, ?, ?)",
+            (client, draft, digest, time.time()),
+        )
+
+    def read(self, client, draft):
+        """Devuelve el borrador pendiente de subir, o None si Drive ya tiene la última versión."""
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT data FROM pending_drafts WHERE client = ? AND draft = ?", (client, draft)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def pending_drafts(self, client):
+        """Nombres de los borradores del cliente que aún no se han subido."""
+        with self._db_lock:
+            rows = self._conn.execute("SELECT draft FROM pending_drafts WHERE client = ?", (client,)).fetchall()
+        return [row[0] for row in rows]
+
+    def pending_count(self):
+        """Número total de borradores pendientes y cuántos de ellos han fallado al subir."""
+        with self._db_lock:
+            return self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(last_error IS NOT NULL), 0) FROM pending_drafts"
+            ).fetchone()
+
+    def discard(self, client, draft):
+        """Olvida un borrador pendiente (p. ej. al finalizarlo). Espera a que acabe una subida en curso."""
+        with self._upload_lock, self._db_lock:
+            self._conn.execute("DELETE FROM pending_drafts WHERE client = ? AND draft = ?", (client, draft))
+            self._conn.execute("DELETE FROM synced_drafts WHERE client = ? AND draft = ?", (client, draft))
+            self._conn.commit()
+
+    # --- Sincronización (hilo en segundo plano) ---
+
+    def start(self, uploader):
+        """Registra uploader(cliente, borrador, datos) y arranca el hilo de sincronización si no corre."""
+        self._uploader = uploader
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="draft-journal-sync", daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(timeout=self.sync_delay)
+            self._wake.clear()
+            try:
+                self.sync_pending()
+            except Exception:
+                logger.exception("Error inesperado sincronizando borradores")
+
+    def _due_rows(self, now):
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT client, draft, version, updated_at, attempts FROM pending_drafts"
+            ).fetchall()
+        due = []
+        for client, draft, version, updated_at, attempts in rows:
+            wait = self.sync_delay if not attempts else min(self.sync_delay * 2 ** attempts, RETRY_DELAY_MAX)
+            if now - updated_at >= wait:
+                due.append((client, draft))
+        return due
+
+    def sync_pending(self, force=False):
+        """Sube los borradores pendientes. Devuelve cuántos se han sincronizado."""
+        uploader = self._uploader
+        if uploader is None:
+            return 0
+        synced = 0
+        due = self._due_rows(float("inf") if force else time.time())
+        for client, draft in due:
+            with self._upload_lock:
+                with self._db_lock:
+                    row = self._conn.execute(
+                        "SELECT data, version, hash FROM pending_drafts WHERE client = ? AND draft = ?", (client, draft)
+                    ).fetchone()
+                if row is None:  # descartado mientras tanto
+                    continue
+                data, version, digest = row
+                try:
+                    uploader(client, draft, json.loads(data))
+                except Exception as e:
+                    logger.warning("No se pudo subir el borrador %s/%s: %s", client, draft, e)
+                    with self._db_lock:
+                        self._conn.execute(
+                            "UPDATE pending_drafts SET attempts = attempts + 1, last_error = ?, updated_at = ? "
+                            "WHERE client = ? AND draft = ?",
+                            (str(e), time.time(), client, draft),
+                        )
+                        self._conn.commit()
+                    continue
+                with self._db_lock:
+                    # Si se ha vuelto a guardar durante la subida, la fila sigue pendiente.
+                    self._conn.execute(
+                        "DELETE FROM pending_drafts WHERE client = ? AND draft = ? AND version = ?",
+                        (client, draft, version),
+                    )
+                    self._set_synced(client, draft, digest or content_hash(json.loads(data)))
+                    self._conn.commit()
+                synced += 1
+        return synced
@@ -0,0 +1,182 @@
+"""Cliente de Google Drive compartido por todas las sesiones del proceso.
+
+Antes cada sesión (y en googledrive.py cada finalización) creaba su propio
+GoogleAuth: volvía a leer credentials.json, renovaba el token si había
+caducado y reescribía el archivo, de modo que varias sesiones podían renovar a
+la vez y pisarse al guardar. DriveClient tiene un único GoogleAuth/GoogleDrive
+por proceso y:
+
+- renueva el token de acceso en un hilo en segundo plano REFRESH_MARGIN
+  segundos antes de que caduque, así que las peticiones nunca esperan a la
+  renovación (si aun así llega caducado, se renueva en el momento);
+- la renovación es de un solo vuelo: con el lock tomado se vuelve a comprobar
+  la caducidad, y quien llega mientras otro hilo renueva usa su resultado;
+- guarda credentials.json de forma atómica (archivo temporal + rename);
+- presta objetos HTTP autorizados desde un pool (httplib2.Http no se puede
+  compartir entre hilos), que se reutilizan entre reruns en lugar de crear
+  uno por hilo.
+
+PyDrive2 se importa al crear el GoogleAuth, no al importar este módulo.
+"""
+import datetime
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+REFRESH_MARGIN = 300  # segundos antes de la caducidad en que se renueva el token
+CHECK_INTERVAL = 60  # espera máxima del hilo de renovación entre comprobaciones
+HTTP_POOL_SIZE = 8  # objetos HTTP libres que se guardan para reutilizar
+
+
+def _default_auth_factory(settings):
+    from pydrive2.auth import GoogleAuth
+    return GoogleAuth(settings=settings)
+
+
+class DriveClient:
+    """GoogleAuth y GoogleDrive únicos para el proceso, con el token siempre vigente."""
+
+    def __init__(self, settings, credentials_file, refresh_margin=REFRESH_MARGIN, check_interval=CHECK_INTERVAL,
+                 auth_factory=_default_auth_factory):
+        self.settings = settings
+        self.credentials_file = credentials_file
+        self.refresh_margin = refresh_margin
+        self.check_interval = check_interval
+        self._auth_factory = auth_factory
+        self._lock = threading.Lock()  # creación del cliente
+        self._refresh_lock = threading.Lock()  # renovación del token (un solo vuelo)
+        self._gauth = None
+        self._drive = None
+        self._pending_auth = None  # GoogleAuth del flujo de autorización en curso
+        self._pool = queue.LifoQueue(maxsize=HTTP_POOL_SIZE)
+        self._stop = threading.Event()
+        self._refresher = None
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.last_error = None
+
+    # --- Acceso ---
+
+    def drive(self):
+        """El GoogleDrive compartido, o None si todavía no hay credenciales autorizadas."""
+        with self._lock:
+            if self._drive is None:
+                gauth = self._auth_factory(self.settings)
+                if os.path.exists(self.credentials_file):
+                    gauth.LoadCredentialsFile(self.credentials_file)
+                if gauth.credentials is None:
+                    return None
+                self._connect(gauth)
+            drive = self._drive
+        if self.expires_in() <= 0:
+            self.refresh()  # el hilo de fondo no ha llegado a tiempo (p. ej. tras suspender la máquina)
+        return drive
+
+    def auth_url(self):
+        """URL para que el usuario autorice la app (primer arranque)."""
+        with self._lock:
+            if self._pending_auth is None:
+                self._pending_auth = self._auth_factory(self.settings)
+            return self._pending_auth.GetAuthUrl()
+
+    def authorize(self, code):
+        """Completa la autorización con el código que devolvió Google y guarda las credenciales."""
+        with self._lock:
+            gauth = self._pending_auth or self._auth_factory(self.settings)
+            gauth.Authenticate(code)
+            self._pending_auth = None
+            self._save(gauth)
+            self._connect(gauth)
+
+    @contextmanager
+    def http(self):
+        """Presta un objeto HTTP autorizado para una petición y lo devuelve al pool al terminar."""
+        try:
+            http = self._pool.get_nowait()
+        except queue.Empty:
+            http = self._gauth.Get_Http_Object()
+        try:
+            yield http
+        finally:
+            try:
+                self._pool.put_nowait(http)
+            except queue.Full:
+                pass
+
+    # --- Renovación del token ---
+
+    def expires_in(self):
+        """Segundos hasta que caduca el token de acceso (infinito si no caduca, 0 si no es válido)."""
+        credentials = self._gauth.credentials if self._gauth else None
+        if credentials is None or credentials.invalid:
+            return 0.0
+        if credentials.token_expiry is None:
+            return float('inf')
+        return (credentials.token_expiry - datetime.datetime.utcnow()).total_seconds()
+
+    def refresh(self, force=False):
+        """Renueva el token si caduca dentro del margen (o siempre, con force). Devuelve si lo ha renovado.
+
+        Si otro hilo está renovando se espera a que termine y, si ya ha dejado el
+        token vigente, no se repite la renovación.
+        """
+        with self._refresh_lock:
+            if not force and self.expires_in() > self.refresh_margin:
+                return False
+            try:
+                self._gauth.Refresh()
+            except Exception as e:
+                self.refresh_errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                raise
+            self._save(self._gauth)
+            self.refreshes += 1
+            self.last_error = None
+            return True
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("No se pudo renovar el token de Google Drive")
+            wait = min(self.check_interval, max(1.0, self.expires_in() - self.refresh_margin))
+            self._stop.wait(wait)
+
+    def close(self):
+        """Detiene el hilo de renovación."""
+        self._stop.set()
+
+    def stats(self):
+        expires_in = self.expires_in()
+        return {
+            'authorized': self._drive is not None,
+            'expires_in': None if expires_in == float('inf') else round(expires_in),
+            'refreshes': self.refreshes,
+            'refresh_errors': self.refresh_errors,
+            'last_error': self.last_error,
+        }
+
+    # --- Internos ---
+
+    def _connect(self, gauth):
+        """Deja gauth listo y compartido (con self._lock tomado) y arranca la renovación en segundo plano."""
+        from pydrive2.drive import GoogleDrive
+
+        self._gauth = gauth
+        if self.expires_in() <= self.refresh_margin:
+            self.refresh()
+        gauth.Authorize()
+        self._drive = GoogleDrive(gauth)
+        if self._refresher is None:
+            self._refresher = threading.Thread(target=self._refresh_loop, name="drive-token-refresh", daemon=True)
+            self._refresher.start()
+
+    def _save(self, gauth):
+        tmp_path = self.credentials_file + '.tmp'
+        gauth.SaveCredentialsFile(tmp_path)
+        os.replace(tmp_path, self.credentials_file)
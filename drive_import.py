@@ -0,0 +1,108 @@
+"""Importación del archivo de Drive a la base SQLite de googledrive.py.
+
+app.py guarda los entrenamientos finalizados como HTML en
+'JCT Entrenamientos/<cliente>', mientras que googledrive.py trabaja con las
+tablas users y entrenamientos. import_tree recorre un árbol con el formato de
+walk_tree / DriveIndex.snapshot, descarga los HTML con un número acotado de
+descargas simultáneas, los convierte de nuevo en campos con
+template_engine.parse y los guarda por lotes de BATCH_SIZE, cada uno en su
+transacción (dando de alta los clientes que falten).
+
+Cada lote apunta en drive_import el modifiedDate de sus archivos junto con sus
+filas, así que una importación interrumpida sigue donde se quedó sin volver a
+descargar nada, y las siguientes solo descargan los archivos nuevos o con otro
+modifiedDate. Los borradores (.draft.json) no se importan: siguen en Drive.
+"""
+import logging
+
+import db
+import template_engine
+from storage import iter_downloads
+
+logger = logging.getLogger(__name__)
+
+IMPORT_WORKERS = 4  # descargas simultáneas
+BATCH_SIZE = 200  # entrenamientos por transacción
+
+
+def _is_finalized(f):
+    return f['mimeType'] == 'text/html' or f['title'].endswith('.html')
+
+
+def import_entries(tree, checkpoints):
+    """(pendientes, al día): [(cliente, metadatos)] de los HTML que faltan o cambiaron, y cuántos ya están importados."""
+    pending, up_to_date = [], 0
+    for client_name in sorted(tree):
+        for f in tree[client_name]['files']:
+            if f.get('trashed') or not _is_finalized(f):
+                continue
+            if checkpoints.get(f['id']) == f['modifiedDate']:
+                up_to_date += 1
+            else:
+                pending.append((client_name, f))
+    return pending, up_to_date
+
+
+def _parse(content):
+    data = template_engine.parse(content)
+    if data is None:
+        raise ValueError("no tiene el formato de template.html")
+    return data
+
+
+def _import_item(client_name, f, data):
+    """Lo que guarda db.save_imported_trainings para un archivo ya descargado."""
+    training_name = f['title'][:-len('.html')] if f['title'].endswith('.html') else f['title']
+    data['fecha_creacion'] = data['fecha_creacion'] or f['modifiedDate'][:10]
+    return {
+        'file_id': f['id'],
+        'modified_date': f['modifiedDate'],
+        'client_name': client_name,
+        # La misma clave que usa app.py al finalizar: sus series se reemplazan, no se duplican
+        'session': f"drive:{client_name}/{training_name}",
+        'link': f.get('alternateLink') or None,
+        'data': data,
+    }
+
+
+def import_tree(storage, tree, path=None, max_workers=IMPORT_WORKERS, batch_size=BATCH_SIZE, on_progress=None):
+    """Importa los HTML finalizados del árbol. Devuelve {'imported', 'updated', 'skipped', 'errors'}.
+
+    on_progress(hechos, total) se llama desde el hilo actual tras cada archivo. Si
+    la importación se corta (una excepción, o Streamlit parando la página desde
+    on_progress) se guarda antes lo ya descargado. Los archivos con error no
+    pasan al punto de control y se reintentan en la siguiente importación.
+    """
+    pending, skipped = import_entries(tree, db.import_checkpoints(path))
+    result = {'imported': 0, 'updated': 0, 'skipped': skipped, 'errors': []}
+    total = skipped + len(pending)
+    batch = []
+
+    def flush():
+        try:
+            if batch:
+                inserted, updated = db.save_imported_trainings(batch, path)
+                result['imported'] += inserted
+                result['updated'] += updated
+        finally:
+            batch.clear()  # si el lote falla, sus archivos se descargan de nuevo la próxima vez
+
+    if on_progress:
+        on_progress(skipped, total)
+    downloads = iter_downloads(storage, pending, max_workers, file_id=lambda entry: entry[1]['id'])
+    try:
+        for (client_name, f), future in downloads:
+            try:
+                batch.append(_import_item(client_name, f, _parse(future.result())))
+            except Exception as e:
+                logger.warning("No se pudo importar %s/%s: %s", client_name, f['title'], e)
+                result['errors'].append(f"{client_name}/{f['title']}: {e}")
+            if len(batch) >= batch_size:
+                flush()
+            if on_progress:
+                done = skipped + result['imported'] + result['updated'] + len(batch) + len(result['errors'])
+                on_progress(done, total)
+    finally:
+        downloads.close()  # cancela las descargas encoladas antes de guardar lo ya descargado
+        flush()
+    return result
@@ -0,0 +1,295 @@
+"""Índice local y persistente del árbol 'JCT Entrenamientos' de Google Drive.
+
+La primera vez se construye con un listado completo. A partir de ahí solo se
+actualiza con el feed de cambios de Drive (changes.list) desde el último token
+guardado, de modo que cada carga de página lee del índice y hace, como mucho,
+una llamada barata para traer los cambios.
+
+La fuente de cambios es cualquier backend de storage.py (list_page,
+start_page_token, changes); en pruebas basta con un MemoryBackend.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from storage import FOLDER_MIME_TYPE, iter_children
+
+DRAFT_SUFFIX = ".draft.json"
+PARENTS_PER_QUERY = 40  # carpetas padre agrupadas en cada consulta del recorrido del árbol
+FINALIZED_BATCH = 50  # filas leídas del índice cada vez al recorrer los finalizados
+
+
+# --- RECORRIDO DEL ÁRBOL ---
+
+def split_trainings(files):
+    """Separa los archivos de un cliente en (borradores, finalizados), como list_trainings."""
+    drafts, finalized = [], []
+    for f in files:
+        if f['title'].endswith(DRAFT_SUFFIX):
+            drafts.append(f['title'][:-len(DRAFT_SUFFIX)])
+        elif f['mimeType'] == 'text/html' or f['title'].endswith('.html'):
+            finalized.append({'title': f['title'], 'alternateLink': f['alternateLink']})
+    return sorted(drafts), sorted(finalized, key=lambda x: x['title'], reverse=True)
+
+
+def walk_tree(source, root_id):
+    """Lista todo el árbol de clientes con el mínimo de consultas.
+
+    Una consulta para las carpetas de clientes y otra por cada PARENTS_PER_QUERY
+    clientes para su contenido (más las páginas extra que devuelva Drive). Solo
+    se piden los campos de storage.LIST_FIELDS.
+    Devuelve {cliente: {'folder_id': ..., 'files': [metadatos, ...]}}.
+    """
+    tree, folders = {}, {}
+    for f in iter_children(source, [root_id]):
+        if f['mimeType'] == FOLDER_MIME_TYPE and f['title'] not in tree:
+            tree[f['title']] = {'folder_id': f['id'], 'files': []}
+            folders[f['id']] = f['title']
+
+    folder_ids = list(folders)
+    for i in range(0, len(folder_ids), PARENTS_PER_QUERY):
+        for f in iter_children(source, folder_ids[i:i + PARENTS_PER_QUERY]):
+            for parent_id in f['parents']:
+                if parent_id in folders:
+                    tree[folders[parent_id]]['files'].append(f)
+    return tree
+
+
+# --- ÍNDICE ---
+
+class DriveIndex:
+    """Copia local de carpetas de clientes, borradores y HTML finalizados."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS files (id TEXT PRIMARY KEY, title TEXT, mime_type TEXT, parent_id TEXT, "
+            "alternate_link TEXT, modified_date TEXT);"
+            "CREATE INDEX IF NOT EXISTS files_parent ON files (parent_id);"
+            "CREATE INDEX IF NOT EXISTS files_parent_modified ON files (parent_id, modified_date, id);"
+            "CREATE TABLE IF NOT EXISTS index_state (key TEXT PRIMARY KEY, value TEXT);"
+        )
+        self._conn.commit()
+        self._lock = threading.RLock()
+        self._last_sync = 0.0
+        # Aumenta cada vez que cambia el conjunto de carpetas de clientes (sello para ClientDirectory)
+        self.clients_generation = 0
+
+    def _state(self, key):
+        row = self._conn.execute("SELECT value FROM index_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key, value):
+        self._conn.execute("REPLACE INTO index_state (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def root_id(self):
+        with self._lock:
+            return self._state('root_id')
+
+    # --- Sincronización ---
+
+    def sync(self, source, root_id, min_interval=0.0):
+        """Pone el índice al día. Devuelve los IDs de las carpetas que han desaparecido.
+
+        Si el índice no existe o apunta a otra carpeta raíz se reconstruye por completo;
+        si no, se aplica una sola consulta al feed de cambios (como mucho una cada min_interval).
+        """
+        with self._lock:
+            if self._state('root_id') != root_id or self._state('page_token') is None:
+                self._rebuild(source, root_id)
+                return []
+            if time.monotonic() - self._last_sync < min_interval:
+                return []
+            events, token = source.changes(self._state('page_token'))
+            removed = []
+            for event in events:
+                removed += self._apply(source, event)
+            self._set_state('page_token', token)
+            self._conn.commit()
+            self._last_sync = time.monotonic()
+            return removed
+
+    def _rebuild(self, source, root_id):
+        # El token se pide antes de listar para no perder cambios hechos durante el listado.
+        token = source.start_page_token()
+        tree = walk_tree(source, root_id)
+        self._conn.execute("DELETE FROM files")
+        for client_name, entry in tree.items():
+            self._upsert({'id': entry['folder_id'], 'title': client_name, 'mimeType': FOLDER_MIME_TYPE,
+                          'alternateLink': '', 'modifiedDate': ''}, root_id)
+            for f in entry['files']:
+                self._upsert(f, entry['folder_id'])
+        self._set_state('root_id', root_id)
+        self._set_state('page_token', token)
+        self._conn.commit()
+        self._last_sync = time.monotonic()
+        self.clients_generation += 1
+
+    def _upsert(self, f, parent_id):
+        self._conn.execute(
+            "REPLACE INTO files (id, title, mime_type, parent_id, alternate_link, modified_date) VALUES (?, ?, ?, ?, ?, ?)",
+            (f['id'], f['title'], f['mimeType'], parent_id, f['alternateLink'], f['modifiedDate']),
+        )
+
+    def _remove(self, file_id):
+        """Quita un archivo (y sus hijos si es carpeta). Devuelve los IDs de carpeta eliminados."""
+        row = self._conn.execute("SELECT mime_type FROM files WHERE id = ?", (file_id,)).fetchone()
+        if row is None:
+            return []
+        self._conn.execute("DELETE FROM files WHERE id = ? OR parent_id = ?", (file_id, file_id))
+        if row[0] != FOLDER_MIME_TYPE:
+            return []
+        self.clients_generation += 1
+        return [file_id]
+
+    def _is_client_folder(self, folder_id, root_id):
+        row = self._conn.execute("SELECT parent_id FROM files WHERE id = ?", (folder_id,)).fetchone()
+        return row is not None and row[0] == root_id
+
+    def _apply(self, source, event):
+        root_id = self._state('root_id')
+        f = event['file']
+        if event['removed'] or f['trashed']:
+            return self._remove(event['id'])
+        if f['id'] == root_id:
+            return []
+        if root_id in f['parents'] and f['mimeType'] == FOLDER_MIME_TYPE:
+            previous = self._conn.execute("SELECT title FROM files WHERE id = ?", (f['id'],)).fetchone()
+            is_new = previous is None
+            self._upsert(f, root_id)
+            if is_new or previous[0] != f['title']:
+                self.clients_generation += 1
+            if is_new and source is not None:
+                # Carpeta movida desde fuera del árbol: su contenido no vendrá en el feed.
+                for child in iter_children(source, [f['id']]):
+                    self._upsert(child, f['id'])
+            return []
+        for parent_id in f['parents']:
+            if self._is_client_folder(parent_id, root_id):
+                self._upsert(f, parent_id)
+                return []
+        # Ya no cuelga del árbol (movido fuera)
+        return self._remove(f['id'])
+
+    # --- Escrituras locales (para leer lo que acabamos de escribir sin esperar al feed) ---
+
+    def note_file(self, meta):
+        """Registra un archivo recién subido por la app (metadatos de storage.file_metadata)."""
+        meta = dict({'mimeType': '', 'parents': [], 'alternateLink': '', 'modifiedDate': '', 'trashed': False}, **meta)
+        with self._lock:
+            if self._state('root_id') is None:
+                return
+            self._apply(None, {'id': meta['id'], 'removed': False, 'file': meta})
+            self._conn.commit()
+
+    def note_removed(self, file_id):
+        """Registra un archivo recién borrado por la app."""
+        with self._lock:
+            self._remove(file_id)
+            self._conn.commit()
+
+    # --- Consultas ---
+
+    def clients(self):
+        """Nombres de las carpetas de clientes, ordenados."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title FROM files WHERE parent_id = ? AND mime_type = ? ORDER BY title",
+                (self._state('root_id'), FOLDER_MIME_TYPE),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def client_folders(self):
+        """[(ID de carpeta, nombre)] de todos los clientes."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, title FROM files WHERE parent_id = ? AND mime_type = ?",
+                (self._state('root_id'), FOLDER_MIME_TYPE),
+            ).fetchall()
+
+    def client_folder_id(self, client_name):
+        """ID de la carpeta del cliente, o None si no está en el índice."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM files WHERE parent_id = ? AND mime_type = ? AND title = ?",
+                (self._state('root_id'), FOLDER_MIME_TYPE, client_name),
+            ).fetchone()
+        return row[0] if row else None
+
+    def find_file(self, client_name, title):
+        """ID de un archivo de la carpeta del cliente, o None."""
+        folder_id = self.client_folder_id(client_name)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM files WHERE parent_id = ? AND title = ?", (folder_id, title)
+            ).fetchone()
+        return row[0] if row else None
+
+    def trainings(self, client_name):
+        """Devuelve (borradores, finalizados) del cliente con el mismo formato que list_trainings."""
+        folder_id = self.client_folder_id(client_name)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, mime_type, alternate_link FROM files WHERE parent_id = ?", (folder_id,)
+            ).fetchall()
+        return split_trainings([{'title': t, 'mimeType': m, 'alternateLink': link} for t, m, link in rows])
+
+    def drafts(self, client_name):
+        """Nombres de los borradores del cliente, ordenados."""
+        folder_id = self.client_folder_id(client_name)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title FROM files WHERE parent_id = ? AND title LIKE ?", (folder_id, f"%{DRAFT_SUFFIX}")
+            ).fetchall()
+        return sorted(title[:-len(DRAFT_SUFFIX)] for title, in rows if title.endswith(DRAFT_SUFFIX))
+
+    def iter_finalized(self, client_name, batch=FINALIZED_BATCH):
+        """Generador con los HTML finalizados del cliente, el último modificado primero.
+
+        Lee el índice por tandas de batch filas (paginación por clave sobre
+        (modified_date, id)), así que quien solo muestra los primeros no lee el resto.
+        Cada elemento es {'title', 'alternateLink', 'modifiedDate'}.
+        """
+        folder_id = self.client_folder_id(client_name)
+        query = ("SELECT id, title, alternate_link, modified_date FROM files "
+                 "WHERE parent_id = ? AND (mime_type = 'text/html' OR title LIKE '%.html') {} "
+                 "ORDER BY modified_date DESC, id DESC LIMIT ?")
+        last = None
+        while True:
+            with self._lock:
+                if last is None:
+                    rows = self._conn.execute(query.format(""), (folder_id, batch)).fetchall()
+                else:
+                    rows = self._conn.execute(
+                        query.format("AND (modified_date < ? OR (modified_date = ? AND id < ?))"),
+                        (folder_id, last[3], last[3], last[0], batch),
+                    ).fetchall()
+            for _, title, link, modified in rows:
+                yield {'title': title, 'alternateLink': link, 'modifiedDate': modified}
+            if len(rows) < batch:
+                return
+            last = rows[-1]
+
+    def snapshot(self):
+        """Devuelve el árbol completo con el mismo formato que walk_tree, sin llamar a Drive."""
+        with self._lock:
+            root_id = self._state('root_id')
+            clients = self._conn.execute(
+                "SELECT id, title FROM files WHERE parent_id = ? AND mime_type = ?", (root_id, FOLDER_MIME_TYPE)
+            ).fetchall()
+            files = self._conn.execute(
+                "SELECT id, title, mime_type, parent_id, alternate_link, modified_date FROM files WHERE parent_id != ?",
+                (root_id,),
+            ).fetchall()
+        tree = {title: {'folder_id': folder_id, 'files': []} for folder_id, title in clients}
+        folders = {folder_id: title for folder_id, title in clients}
+        for file_id, title, mime_type, parent_id, link, modified in files:
+            if parent_id in folders:
+                tree[folders[parent_id]]['files'].append({
+                    'id': file_id, 'title': title, 'mimeType': mime_type, 'parents': [parent_id],
+                    'alternateLink': link, 'modifiedDate': modified, 'trashed': False,
+                })
+        return tree
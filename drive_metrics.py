@@ -0,0 +1,142 @@
+"""Instrumentación de las llamadas al backend de almacenamiento.
+
+InstrumentedBackend envuelve cualquier backend de storage.py y registra, para
+cada operación, su tipo, un resumen de la consulta, la duración, los bytes
+transferidos y el error (si lo hubo). DriveMetrics agrupa esos registros por
+sesión, rerun de Streamlit y página, mantiene percentiles p50/p95/p99 móviles por
+tipo de operación y permite exportar las trazas como JSON lines.
+"""
+import json
+import math
+import threading
+import time
+from collections import defaultdict, deque
+
+OPERATIONS = (
+    'find_folder', 'create_folder', 'list_children', 'list_page', 'get_metadata', 'read_text',
+    'write_text', 'delete', 'get_link', 'start_page_token', 'changes',
+)
+WINDOW = 500  # duraciones recientes por operación para los percentiles
+TRACE_LIMIT = 5000  # trazas que se guardan en memoria
+
+
+def percentile(sorted_values, p):
+    """Percentil por rango más cercano de una lista ya ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def _describe(operation, args, kwargs):
+    """Resumen legible de los argumentos de una operación."""
+    if operation in ('find_folder', 'create_folder'):
+        return f"title={args[0] if args else kwargs.get('title')!r}"
+    if operation in ('list_children', 'list_page'):
+        parent_ids = args[0] if args else kwargs.get('parent_ids', [])
+        title = args[1] if len(args) > 1 else kwargs.get('title')
+        query = f"{len(parent_ids)} carpeta(s)" + (f", title={title!r}" if title else "")
+        if operation == 'list_page':
+            query += f", página de {kwargs.get('page_size', '?')}" + (" (siguiente)" if kwargs.get('page_token') else "")
+        return query
+    if operation == 'write_text':
+        title = args[1] if len(args) > 1 else kwargs.get('title')
+        return f"title={title!r}" + (" (actualización)" if kwargs.get('file_id') else "")
+    if args:
+        return str(args[0])
+    return ""
+
+
+class DriveMetrics:
+    """Registro de llamadas compartido por todo el proceso."""
+
+    def __init__(self, window=WINDOW, trace_limit=TRACE_LIMIT, trace_path=None):
+        self._lock = threading.Lock()
+        self._context = threading.local()
+        self._durations = defaultdict(lambda: deque(maxlen=window))
+        self._traces = deque(maxlen=trace_limit)
+        self.trace_path = trace_path
+
+    def begin_rerun(self, session_id, rerun, page):
+        """Marca el hilo actual como el del rerun indicado; las llamadas siguientes se asocian a él."""
+        self._context.value = {'session': session_id, 'rerun': rerun, 'page': page}
+
+    def record(self, operation, query, duration, nbytes, error=None):
+        context = getattr(self._context, 'value', None) or {
+            'session': None, 'rerun': None, 'page': threading.current_thread().name,
+        }
+        trace = dict(context, ts=time.time(), op=operation, query=query,
+                     duration_ms=round(duration * 1000, 2), bytes=nbytes, error=error)
+        line = json.dumps(trace, ensure_ascii=False) + '\n' if self.trace_path else None
+        with self._lock:
+            self._durations[operation].append(duration)
+            self._traces.append(trace)
+            if line:
+                # Con el mismo lock: las líneas de hilos distintos no se mezclan en el archivo
+                with open(self.trace_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+
+    # --- Consultas ---
+
+    def percentiles(self):
+        """{operación: {'count', 'p50', 'p95', 'p99'}} en milisegundos sobre la ventana móvil."""
+        with self._lock:
+            durations = {op: sorted(values) for op, values in self._durations.items()}
+        return {
+            op: {'count': len(values), **{f"p{p}": round(percentile(values, p) * 1000, 1) for p in (50, 95, 99)}}
+            for op, values in sorted(durations.items())
+        }
+
+    def traces(self, session_id=None, rerun=None):
+        with self._lock:
+            traces = list(self._traces)
+        if session_id is not None:
+            traces = [t for t in traces if t['session'] == session_id]
+        if rerun is not None:
+            traces = [t for t in traces if t['rerun'] == rerun]
+        return traces
+
+    def slowest(self, n=10, session_id=None):
+        return sorted(self.traces(session_id), key=lambda t: t['duration_ms'], reverse=True)[:n]
+
+    def by_page(self, session_id=None):
+        """{página: {'calls', 'total_ms'}} para ver qué página hace más viajes a Drive."""
+        pages = defaultdict(lambda: {'calls': 0, 'total_ms': 0.0})
+        for t in self.traces(session_id):
+            pages[t['page']]['calls'] += 1
+            pages[t['page']]['total_ms'] += t['duration_ms']
+        return dict(pages)
+
+    def export_jsonl(self, session_id=None):
+        return ''.join(json.dumps(t, ensure_ascii=False) + '\n' for t in self.traces(session_id))
+
+
+class InstrumentedBackend:
+    """Proxy de un backend que mide cada operación en un DriveMetrics."""
+
+    def __init__(self, backend, metrics):
+        self.backend = backend
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self.backend, name)
+        if name not in OPERATIONS:
+            return attr
+
+        def instrumented(*args, **kwargs):
+            start = time.perf_counter()
+            error, nbytes = None, 0
+            try:
+                result = attr(*args, **kwargs)
+                if name == 'read_text':
+                    nbytes = len(result.encode('utf-8'))
+                return result
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                if name == 'write_text':
+                    content = args[2] if len(args) > 2 else kwargs.get('content', '')
+                    nbytes = len(content.encode('utf-8'))
+                self.metrics.record(name, _describe(name, args, kwargs), time.perf_counter() - start, nbytes, error)
+        return instrumented
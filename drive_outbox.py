@@ -0,0 +1,104 @@
+"""Despachador del outbox de Drive de googledrive.py.
+
+Finalizar un entrenamiento es solo un commit local: db.finalize_training()
+escribe el entrenamiento y su fila en drive_outbox en la misma transacción. Un
+hilo en segundo plano vacía después el outbox por lotes:
+
+- toma hasta BATCH_SIZE filas vencidas, ordenadas por cliente para que la
+  carpeta de cada uno se resuelva una vez (mirror usa una caché de carpetas);
+- suma un intento a cada fila en su propia transacción y luego llama a
+  mirror(fila), que sube el archivo y devuelve su enlace. Si el proceso muere
+  antes de apuntar el lote, esas filas vuelven con intentos > 0 y mirror
+  reutiliza el archivo que llegó a crear;
+- apunta en una sola transacción los enlaces (entrenamientos.drive_link) y los
+  fallos, que se reintentan con espera exponencial hasta RETRY_DELAY_MAX.
+
+Lo que queda en la tabla tras un reinicio se sube en cuanto arranca el hilo.
+"""
+import logging
+import threading
+import time
+
+import db
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 20
+POLL_INTERVAL = 5.0  # segundos máximos entre revisiones del outbox (para los reintentos)
+RETRY_DELAY = 5.0  # el n-ésimo reintento espera RETRY_DELAY * 2**n
+RETRY_DELAY_MAX = 600.0
+
+
+class DriveOutbox:
+    """Hilo que sube a Drive los entrenamientos encolados en drive_outbox."""
+
+    def __init__(self, path=None, batch_size=BATCH_SIZE, poll_interval=POLL_INTERVAL, mirror=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._mirror = mirror
+        self._wake = threading.Event()
+        self._dispatch_lock = threading.Lock()  # un lote cada vez
+        self._thread = None
+        self.sent = 0
+        self.failed = 0
+        self.last_error = None
+        self.last_batch_at = None
+
+    def start(self, mirror):
+        """Registra mirror(fila) -> enlace y arranca el hilo si no corre."""
+        self._mirror = mirror
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="drive-outbox", daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def wake(self):
+        """Revisa el outbox ya, sin esperar a POLL_INTERVAL."""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(timeout=self.poll_interval)
+            self._wake.clear()
+            try:
+                # Un lote lleno indica que puede haber más filas vencidas esperando
+                while sum(self.dispatch()) == self.batch_size:
+                    pass
+            except Exception:
+                logger.exception("Error inesperado vaciando el outbox de Drive")
+
+    def dispatch(self, now=None):
+        """Sube un lote de filas vencidas. Devuelve (subidas, fallidas)."""
+        mirror = self._mirror
+        if mirror is None:
+            return 0, 0
+        with self._dispatch_lock:
+            rows = sorted(db.due_outbox(self.batch_size, now, self.path), key=lambda row: row['client_name'])
+            if not rows:
+                return 0, 0
+            db.start_outbox_attempts([row['outbox_id'] for row in rows], self.path)
+            sent, failed = [], []
+            for row in rows:
+                try:
+                    link = mirror(row)
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    logger.warning("No se pudo subir el entrenamiento %s a Drive: %s", row['entrenamiento_id'], error)
+                    delay = min(RETRY_DELAY * 2 ** row['intentos'], RETRY_DELAY_MAX)
+                    failed.append((row['outbox_id'], error, time.time() + delay))
+                    self.last_error = error
+                    continue
+                sent.append((row['outbox_id'], row['entrenamiento_id'], link))
+            db.record_outbox_results(sent, failed, self.path)
+            self.sent += len(sent)
+            self.failed += len(failed)
+            self.last_batch_at = time.time()
+            return len(sent), len(failed)
+
+    def stats(self):
+        return {'running': self.running(), 'sent': self.sent, 'failed': self.failed,
+                'last_error': self.last_error, 'last_batch_at': self.last_batch_at}
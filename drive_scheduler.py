@@ -0,0 +1,212 @@
+"""Planificador de las llamadas a Google Drive.
+
+Todas las operaciones de un backend de storage.py pasan por un DriveScheduler
+compartido por el proceso (ScheduledBackend hace de proxy), que:
+
+- limita el ritmo con un token bucket (RATE peticiones por segundo, ráfagas
+  de hasta BURST), de modo que las operaciones en bloque no agotan la cuota;
+- reintenta los fallos temporales con espera exponencial y jitter completo. Los
+  RateLimitedError se reintentan siempre (Drive ha rechazado la petición sin
+  hacer nada) y además frenan el bucket para todos los hilos. Los
+  TransientError (5xx) solo se reintentan en operaciones idempotentes, porque
+  repetir una creación que sí llegó a Drive duplicaría el archivo;
+- agrupa las lecturas idénticas que están en curso a la vez: la segunda
+  espera el resultado de la primera en lugar de repetir la petición;
+- cuenta llamadas, reintentos, esperas y peticiones deduplicadas, y expone la
+  cola (hilos esperando turno) para el panel de métricas.
+
+Los errores se reconocen por las excepciones de storage.py, así que se puede
+probar con un MemoryBackend y su inject_errors().
+"""
+import copy
+import random
+import threading
+import time
+from collections import Counter
+
+from storage import RateLimitedError, TransientError
+
+RATE = 8.0  # peticiones por segundo, por debajo de la cuota por usuario de Drive
+BURST = 16  # peticiones que pueden salir seguidas tras un rato sin actividad
+MAX_RETRIES = 5
+BASE_DELAY = 0.5  # segundos; el n-ésimo reintento espera hasta BASE_DELAY * 2**n
+MAX_DELAY = 32.0
+
+# Lecturas: se pueden repetir sin efectos y agrupar si coinciden en el tiempo.
+READ_OPERATIONS = ('find_folder', 'list_children', 'list_page', 'get_metadata', 'read_text', 'get_link',
+                   'start_page_token')
+# Además de las lecturas, operaciones que se pueden repetir tras un 5xx.
+IDEMPOTENT_OPERATIONS = READ_OPERATIONS + ('changes', 'delete')
+SCHEDULED_OPERATIONS = IDEMPOTENT_OPERATIONS + ('create_folder', 'write_text')
+
+
+class TokenBucket:
+    """Token bucket seguro entre hilos: acquire() bloquea hasta que hay un token."""
+
+    def __init__(self, rate=RATE, burst=BURST, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+
+    def acquire(self):
+        """Consume un token. Devuelve los segundos que ha tenido que esperar."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            self._sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """Nadie obtiene tokens durante `seconds` (tras un aviso de exceso de ritmo)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+            self._tokens = min(self._tokens, 1.0)
+
+
+class _Flight:
+    """Una lectura en curso que otros hilos pueden esperar."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class DriveScheduler:
+    """Ritmo, reintentos y deduplicación de las llamadas a Drive de todo el proceso."""
+
+    def __init__(self, rate=RATE, burst=BURST, max_retries=MAX_RETRIES, base_delay=BASE_DELAY,
+                 max_delay=MAX_DELAY, clock=time.monotonic, sleep=time.sleep, rng=None):
+        self.bucket = TokenBucket(rate, burst, clock, sleep)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._random = rng or random.Random()
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._waiting = 0  # hilos esperando token (la cola)
+        self._running = 0  # peticiones en curso
+        self.counters = Counter()
+        self.retries_by_operation = Counter()
+
+    def run(self, operation, fn, retry_server_errors=True, dedupe_key=None):
+        """Ejecuta fn() respetando el ritmo y reintentando los fallos temporales.
+
+        Con dedupe_key, si ya hay una llamada en curso con la misma clave se espera
+        su resultado (o su excepción) en lugar de repetirla.
+        """
+        if dedupe_key is None:
+            return self._run(operation, fn, retry_server_errors)
+        with self._lock:
+            flight = self._flights.get(dedupe_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[dedupe_key] = _Flight()
+            else:
+                self.counters['deduplicated'] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)  # cada llamador puede modificar su copia
+        try:
+            flight.result = self._run(operation, fn, retry_server_errors)
+            # También una copia: si el líder modificara flight.result, los demás podrían copiarlo a medias
+            return copy.deepcopy(flight.result)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[dedupe_key]
+            flight.done.set()
+
+    def _run(self, operation, fn, retry_server_errors):
+        attempt = 0
+        while True:
+            with self._lock:
+                self._waiting += 1
+            try:
+                waited = self.bucket.acquire()
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+                    self._running += 1
+                    self.counters['calls'] += 1
+                    if waited:
+                        self.counters['throttled'] += 1
+            error = None
+            try:
+                return fn()
+            except RateLimitedError as e:
+                error, kind = e, 'rate_limited'
+            except TransientError as e:
+                if not retry_server_errors:
+                    raise
+                error, kind = e, 'server_errors'
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+            with self._lock:
+                self.counters[kind] += 1
+                if attempt >= self.max_retries:
+                    self.counters['gave_up'] += 1
+                    raise error
+                self.counters['retries'] += 1
+                self.retries_by_operation[operation] += 1
+            delay = self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            if kind == 'rate_limited':
+                self.bucket.pause(delay)
+            self._sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        """Cola, peticiones en curso y contadores, para el panel de métricas."""
+        with self._lock:
+            return {
+                'queue_depth': self._waiting,
+                'in_flight': self._running,
+                'reads_in_flight': len(self._flights),
+                **{key: self.counters[key] for key in
+                   ('calls', 'throttled', 'retries', 'rate_limited', 'server_errors', 'gave_up', 'deduplicated')},
+                'retries_by_operation': dict(self.retries_by_operation),
+            }
+
+
+class ScheduledBackend:
+    """Proxy de un backend de storage.py que pasa cada operación por un DriveScheduler."""
+
+    def __init__(self, backend, scheduler):
+        self.backend = backend
+        self.scheduler = scheduler
+
+    def __getattr__(self, name):
+        attr = getattr(self.backend, name)
+        if name not in SCHEDULED_OPERATIONS:
+            return attr
+
+        def scheduled(*args, **kwargs):
+            dedupe_key = None
+            if name in READ_OPERATIONS:
+                # Por la identidad del backend, no por el proxy de cada sesión: las sesiones
+                # que leen del mismo Drive comparten la petición.
+                dedupe_key = (getattr(self.backend, 'identity', self.backend), name, repr(args),
+                              repr(sorted(kwargs.items())))
+            # Reemplazar el contenido de un archivo existente también se puede repetir.
+            retry = name in IDEMPOTENT_OPERATIONS or (name == 'write_text' and bool(kwargs.get('file_id')))
+            return self.scheduler.run(name, lambda: attr(*args, **kwargs), retry, dedupe_key)
+        return scheduled
@@ -0,0 +1,79 @@
+"""Extracción de series, repeticiones y cargas del texto libre de una sesión.
+
+Reconoce líneas como "5x5 @ 80kg", "3x10 back squat 60%", "Press banca: 4 x 8
+@ 82,5 kg" o "A1) 3x12 remo 22.5kg". Si una línea solo trae las series (p. ej.
+"5x5 @ 80kg") se usa como ejercicio la línea de texto anterior ("Back squat"),
+o UNNAMED si no la hay. Las libras se pasan a kg y los porcentajes se guardan
+aparte (porcentaje del 1RM), sin carga en kg. Se ignoran las líneas sin "NxM" y
+las de tiempo o distancia ("3x30\"", "2x400m").
+
+Solo usa la biblioteca estándar: se llama al finalizar cada sesión.
+"""
+import re
+
+from client_directory import normalize
+
+# Secciones del entrenamiento de las que se extraen series
+SECTIONS = ('fuerza', 'trabajo_especifico', 'conditioning')
+COLUMNS = ('seccion', 'ejercicio', 'series', 'repeticiones', 'carga_kg', 'porcentaje')
+LB_TO_KG = 0.45359237
+UNNAMED = "sin especificar"
+
+_SETS_REPS = re.compile(r'(?<![\d.,])(\d{1,2})\s*[x×*]\s*(\d{1,3})(?:\s*-\s*\d{1,3})?(?![\d.,]|\s*(?:[%"\']|m\b|km|s\b|seg|min|cal))', re.I)
+_LOAD = re.compile(r'(\d{1,4}(?:[.,]\d+)?)\s*(kgs?|kilos?|lbs?|libras?|%)(?![a-z])', re.I)
+_PREFIX = re.compile(r'^\s*(?:[-*•·]+|\d{1,2}[.)]|[a-z]\d{0,2}[.)])\s*', re.I)
+_NOISE = re.compile(r'[@:()\[\]{},;+|/="\']+')
+
+
+def _clean_name(text):
+    """Nombre normalizado del ejercicio (sin viñetas, signos ni espacios de más)."""
+    return normalize(_NOISE.sub(' ', _PREFIX.sub('', text))).strip(' .-')
+
+
+def parse_line(line, previous_name=''):
+    """La serie de una línea como dict con las claves de COLUMNS (sin 'seccion'), o None."""
+    match = _SETS_REPS.search(line)
+    if match is None:
+        return None
+    sets, reps = int(match.group(1)), int(match.group(2))
+    if not sets or not reps:
+        return None
+    rest = line[:match.start()] + ' ' + line[match.end():]
+
+    load_kg = percent = None
+    load = _LOAD.search(rest)
+    if load is not None:
+        value = float(load.group(1).replace(',', '.'))
+        unit = load.group(2).lower()
+        if unit == '%':
+            percent = value
+        elif unit.startswith(('lb', 'libra')):
+            load_kg = round(value * LB_TO_KG, 2)
+        else:
+            load_kg = value
+        rest = rest[:load.start()] + ' ' + rest[load.end():]
+
+    name = _clean_name(rest) or previous_name or UNNAMED
+    return {'ejercicio': name, 'series': sets, 'repeticiones': reps, 'carga_kg': load_kg, 'porcentaje': percent}
+
+
+def parse_exercises(text):
+    """Series encontradas en un bloque de texto, en orden."""
+    result, previous_name = [], ''
+    for line in re.split(r'[\n;]', text or ''):
+        if not line.strip():
+            continue
+        parsed = parse_line(line, previous_name)
+        if parsed is None:
+            # Una línea de texto sin series puede ser el nombre del ejercicio de las siguientes
+            name = _clean_name(line)
+            previous_name = name if name and len(name) <= 40 and not _LOAD.search(line) else ''
+            continue
+        result.append(parsed)
+        previous_name = parsed['ejercicio']
+    return result
+
+
+def extract_sets(data):
+    """Filas (con 'seccion') de las secciones de fuerza, trabajo específico y conditioning de una sesión."""
+    return [dict(row, seccion=section) for section in SECTIONS for row in parse_exercises(data.get(section))]
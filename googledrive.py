@@ -1,93 +1,122 @@
+import startup_profiler
+startup_profiler.install_from_env()  # antes del resto de imports, para poder medirlos
+
 import streamlit as st
-from PIL import Image
-import sqlite3
-import pandas as pd
 import os
-from passlib.context import CryptContext
 import datetime
-import json
 
-# Importaciones para la integración con Google Drive
-from pydrive2.auth import GoogleAuth
-from pydrive2.drive import GoogleDrive
+import db
+from db import get_draft, save_draft, delete_draft
+from client_directory import ClientDirectory, paginate
+from drive_client import DriveClient
+from drive_scheduler import DriveScheduler, ScheduledBackend
+from drive_outbox import DriveOutbox
+from storage import DriveBackend, LocalBackend, MemoryBackend, NotFoundError
 
 # --- CONFIGURACIÓN DE LA PÁGINA ---
 st.set_page_config(page_title="JCT - Panel de Entrenador", page_icon="💪", layout="wide")
 
 # --- INICIALIZACIÓN DE SEGURIDAD Y CONSTANTES ---
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-DB_DIR = "database"
-DB_PATH = os.path.join(DB_DIR, "jct_main.db")
 CREDENTIALS_FILE = "credentials.json"
+MAIN_FOLDER_NAME = "JCT Entrenamientos"
+TRAINING_ID_PROPERTY = "jct_entrenamiento_id"  # propiedad de Drive con el ID local del entrenamiento
+
+@st.cache_resource
+def get_pwd_context():
+    """Contexto de passlib para los hashes argon2; se carga solo cuando hay que crear usuarios."""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["argon2"], deprecated="auto")
 
 # --- LÓGICA DE GOOGLE DRIVE (INTEGRADA) ---
 
-# Configuración de autenticación de Google Drive usando los secrets de Streamlit
-GOOGLE_AUTH_SETTINGS = {
-    "client_config_backend": "settings",
-    "client_config": {
-        "web": {
-            "client_id": st.secrets.google_credentials.client_id,
-            "client_secret": st.secrets.google_credentials.client_secret,
-            "project_id": st.secrets.google_credentials.project_id,
-            "auth_uri": st.secrets.google_credentials.auth_uri,
-            "token_uri": st.secrets.google_credentials.token_uri,
-            "auth_provider_x509_cert_url": st.secrets.google_credentials.auth_provider_x509_cert_url,
-            "redirect_uris": st.secrets.google_credentials.redirect_uris
-        }
-    },
-    "oauth_scope": ["https://www.googleapis.com/auth/drive"]
-}
+def get_google_auth_settings():
+    """Configuración de autenticación de Google Drive usando los secrets de Streamlit."""
+    return {
+        "client_config_backend": "settings",
+        "client_config": {
+            "web": {
+                "client_id": st.secrets.google_credentials.client_id,
+                "client_secret": st.secrets.google_credentials.client_secret,
+                "project_id": st.secrets.google_credentials.project_id,
+                "auth_uri": st.secrets.google_credentials.auth_uri,
+                "token_uri": st.secrets.google_credentials.token_uri,
+                "auth_provider_x509_cert_url": st.secrets.google_credentials.auth_provider_x509_cert_url,
+                "redirect_uris": st.secrets.google_credentials.redirect_uris
+            }
+        },
+        "oauth_scope": ["https://www.googleapis.com/auth/drive"]
+    }
+
+@st.cache_resource
+def get_drive_client():
+    """Cliente de Drive compartido por todas las sesiones del proceso (el token se renueva en segundo plano)."""
+    return DriveClient(get_google_auth_settings(), CREDENTIALS_FILE)
 
 def authenticate_gdrive():
-    """Realiza la autenticación con Google Drive usando el flujo OAuth 2.0."""
+    """Devuelve el cliente de Google Drive compartido; si aún no hay credenciales, muestra el flujo OAuth 2.0."""
     try:
-        gauth = GoogleAuth(settings=GOOGLE_AUTH_SETTINGS)
-        
-        # Cargar credenciales si el archivo existe (para sesiones posteriores)
-        if os.path.exists(CREDENTIALS_FILE):
-            gauth.LoadCredentialsFile(CREDENTIALS_FILE)
-
-        if gauth.credentials is None:
+        client = get_drive_client()
+        drive = client.drive()
+        if drive is None:
             st.warning("Se necesita autorización para acceder a Google Drive.")
-            auth_url = gauth.GetAuthUrl()
+            auth_url = client.auth_url()
             st.markdown(f"**1. Haz clic aquí para autorizar:** [Enlace de Autorización de Google]({auth_url})", unsafe_allow_html=True)
-            
             code = st.text_input("2. Pega el código de autorización que recibiste aquí:")
             if st.button("Autorizar App"):
                 if code:
-                    gauth.Auth(code)
-                    gauth.SaveCredentialsFile(CREDENTIALS_FILE)
+                    client.authorize(code)
                     st.success("¡Autorización exitosa! La página se refrescará para continuar.")
                     st.rerun()
                 else:
                     st.error("El código no puede estar vacío.")
             st.stop()
-            
-        elif gauth.access_token_expired:
-            gauth.Refresh()
-            gauth.SaveCredentialsFile(CREDENTIALS_FILE)
-        else:
-            gauth.Authorize()
-            
-        return GoogleDrive(gauth)
-        
+        return drive
+
     except Exception as e:
         st.error(f"Error en la autenticación con Google Drive: {e}")
         st.info("Verifica la configuración de 'Secrets' en Streamlit Cloud.")
         return None
 
-def create_training_file_in_drive(drive, client_name, training_data):
-    """Crea una carpeta para el cliente y guarda el entrenamiento como un archivo .txt."""
-    try:
-        folder_list = drive.ListFile({'q': "title='JCT Entrenamientos' and mimeType='application/vnd.google-apps.folder' and trashed=false"}).GetList()
-        main_folder_id = folder_list[0]['id'] if folder_list else drive.CreateFile({'title': 'JCT Entrenamientos', 'mimeType': 'application/vnd.google-apps.folder'}).Upload()['id']
-
-        client_folder_list = drive.ListFile({'q': f"title='{client_name}' and '{main_folder_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"}).GetList()
-        client_folder_id = client_folder_list[0]['id'] if client_folder_list else drive.CreateFile({'title': client_name, 'mimeType': 'application/vnd.google-apps.folder', 'parents': [{'id': main_folder_id}]}).Upload()['id']
-
-        file_name = f"Entrenamiento_{training_data['fecha_creacion']}.txt"
-        content = f"""# Entrenamiento para: {client_name}
+@st.cache_resource
+def get_drive_scheduler():
+    """Ritmo, reintentos y deduplicación de las llamadas a Drive de todo el proceso."""
+    return DriveScheduler()
+
+def drive_storage(drive):
+    """Backend de storage.py sobre el cliente de PyDrive2, con las llamadas pasando por el planificador."""
+    return ScheduledBackend(DriveBackend(drive, http_pool=get_drive_client().http), get_drive_scheduler())
+
+@st.cache_resource
+def _shared_memory_backend():
+    """Backend en memoria compartido por todas las sesiones del proceso."""
+    return MemoryBackend()
+
+def open_storage(interactive=True):
+    """Backend donde se suben los entrenamientos, o None si falla la autenticación.
+
+    Como en app.py, JCT_STORAGE=local:<directorio> o JCT_STORAGE=memory permiten
+    usar la app sin Google Drive, y un backend ya guardado en st.session_state.storage
+    (el que inyectan los benchmarks) tiene prioridad. Con interactive=False no se
+    muestra el flujo OAuth: si Drive aún no está autorizado devuelve None.
+    """
+    if st.session_state.get('storage') is not None:
+        return st.session_state.storage
+    spec = os.environ.get("JCT_STORAGE", "drive")
+    if spec.startswith("local:"):
+        return ScheduledBackend(LocalBackend(spec[len("local:"):]), get_drive_scheduler())
+    if spec == "memory":
+        return ScheduledBackend(_shared_memory_backend(), get_drive_scheduler())
+    if interactive:
+        drive = authenticate_gdrive()
+    else:
+        try:
+            drive = get_drive_client().drive()
+        except Exception:  # sin secrets de Google o sin credenciales guardadas
+            drive = None
+    return drive_storage(drive) if drive else None
+
+def training_file_content(client_name, training_data):
+    return f"""# Entrenamiento para: {client_name}
 # Fecha: {training_data['fecha_creacion']} ({training_data.get('dia_semana', '')})
 \n## 🎯 Objetivo de la Sesión\n{training_data.get('objetivo_sesion', 'N/A')}
 \n## 🔥 Warm-Up General\n{training_data.get('warmup_general', 'N/A')}
@@ -97,54 +126,103 @@ def create_training_file_in_drive(drive, client_name, training_data):
 \n## 🏃 Conditioning\n{training_data.get('conditioning', 'N/A')}
 \n## 📝 Anotaciones del Coach\n{training_data.get('anotaciones_coach', 'N/A')}
 """
-        training_file = drive.CreateFile({'title': file_name, 'parents': [{'id': client_folder_id}], 'mimeType': 'text/plain'})
-        training_file.SetContentString(content)
-        training_file.Upload()
-        return training_file['alternateLink']
 
-    except Exception as e:
-        st.error(f"Error al crear el archivo en Google Drive: {e}")
-        return None
+def _get_or_create_folder(storage, title, parent_id=None, folders=None):
+    """ID de la carpeta (creándola si no existe), usando folders {(parent_id, título): id} como caché."""
+    key = (parent_id, title)
+    if folders is None or key not in folders:
+        folder_id = storage.find_folder(title, parent_id=parent_id) or storage.create_folder(title, parent_id=parent_id)['id']
+        if folders is None:
+            return folder_id
+        folders[key] = folder_id
+    return folders[key]
+
+def _write_training_file(storage, folder_id, client_name, training_data):
+    """Sube el .txt del entrenamiento a folder_id y devuelve su enlace.
+
+    Las filas del outbox traen 'entrenamiento_id': se guarda como propiedad del
+    archivo y, en los reintentos, se reutiliza el archivo si un intento anterior
+    llegó a crearlo (p. ej. Drive lo creó pero la respuesta se perdió, o el
+    proceso murió antes de apuntar el lote).
+    """
+    file_name = f"Entrenamiento_{training_data['fecha_creacion']}.txt"
+    training_id = training_data.get('entrenamiento_id')
+    properties = {TRAINING_ID_PROPERTY: str(training_id)} if training_id is not None else None
+    if properties and training_data.get('intentos'):
+        for existing in storage.list_children([folder_id], title=file_name):
+            if (existing.get('properties') or {}).get(TRAINING_ID_PROPERTY) == properties[TRAINING_ID_PROPERTY]:
+                return existing['alternateLink']
+    training_file = storage.write_text(folder_id, file_name, training_file_content(client_name, training_data),
+                                       mime_type='text/plain', properties=properties)
+    return training_file['alternateLink']
+
+def create_training_file_in_drive(storage, client_name, training_data, folders=None):
+    """Crea una carpeta para el cliente, guarda el entrenamiento como un archivo .txt y devuelve su enlace.
+
+    storage es un backend de storage.py (drive_storage() en producción). folders
+    es una caché opcional de IDs de carpetas; si Drive responde que la carpeta
+    del cliente ya no existe, se olvida y se reintenta una vez. Los errores se
+    propagan: quien llama (el hilo del outbox) decide cuándo reintentar.
+    """
+    main_folder_id = _get_or_create_folder(storage, MAIN_FOLDER_NAME, folders=folders)
+    client_folder_id = _get_or_create_folder(storage, client_name, main_folder_id, folders)
+    try:
+        return _write_training_file(storage, client_folder_id, client_name, training_data)
+    except NotFoundError:
+        if folders is None:
+            raise
+        folders.clear()  # la carpeta principal también puede haber desaparecido
+        main_folder_id = _get_or_create_folder(storage, MAIN_FOLDER_NAME, folders=folders)
+        client_folder_id = _get_or_create_folder(storage, client_name, main_folder_id, folders)
+        return _write_training_file(storage, client_folder_id, client_name, training_data)
+
+# --- OUTBOX DE DRIVE ---
+# Finalizar solo hace un commit local (db.finalize_training); el hilo de
+# drive_outbox.py sube después los entrenamientos encolados y reintenta los fallos.
+
+@st.cache_resource
+def get_drive_outbox():
+    """Despachador del outbox compartido por todas las sesiones del proceso."""
+    return DriveOutbox()
+
+@st.cache_resource
+def _outbox_folder_cache():
+    """Caché de carpetas propio del hilo del outbox (no tiene acceso a la sesión)."""
+    return {}
+
+def start_drive_outbox():
+    """Arranca (o mantiene) el hilo del outbox. Devuelve False si Drive aún no está autorizado."""
+    storage = open_storage(interactive=False)
+    if storage is None:
+        return False
+    folders = _outbox_folder_cache()
+    get_drive_outbox().start(lambda row: create_training_file_in_drive(storage, row['client_name'], row, folders))
+    return True
 
 # --- GESTIÓN DE LA BASE DE DATOS (SQLite) ---
+# Conexiones, pragmas, transacciones, consultas y migraciones viven en db.py
+def seed_sample_users():
+    """Crea los usuarios de ejemplo si la base está vacía (los hashes argon2 son lentos a propósito)."""
+    if db.get_connection().execute("SELECT 1 FROM users LIMIT 1").fetchone():
+        return
+    pwd_context = get_pwd_context()
+    sample_users = [("Ana García", "Pérdida de peso", "anagarcia", pwd_context.hash("ana2025"), "2025-09-15"), ("Carlos Sánchez", "Ganancia muscular", "csanchez", pwd_context.hash("carlosfit"), "2025-10-05")]
+    with db.transaction() as conn:
+        # Se vuelve a comprobar dentro de la transacción por si otro proceso sembró mientras tanto
+        if conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None:
+            conn.executemany("INSERT INTO users (nombre, objetivo, username, password_hash, fecha_registro) VALUES (?, ?, ?, ?, ?)", sample_users)
+
+@st.cache_resource
 def init_db():
-    os.makedirs(DB_DIR, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, nombre TEXT, objetivo TEXT, username TEXT UNIQUE, password_hash TEXT, fecha_registro TEXT)')
-    cursor.execute('CREATE TABLE IF NOT EXISTS entrenamientos (id INTEGER PRIMARY KEY, user_id INTEGER, fecha_creacion TEXT, dia_semana TEXT, objetivo_sesion TEXT, warmup_general TEXT, specific_warmup TEXT, fuerza TEXT, trabajo_especifico TEXT, conditioning TEXT, anotaciones_coach TEXT, FOREIGN KEY (user_id) REFERENCES users (id))')
-    cursor.execute('CREATE TABLE IF NOT EXISTS drafts (user_id INTEGER PRIMARY KEY, draft_data TEXT, last_updated TEXT, FOREIGN KEY (user_id) REFERENCES users (id))')
-    
-    cursor.execute("SELECT COUNT(*) FROM users")
-    if cursor.fetchone()[0] == 0:
-        sample_users = [("Ana García", "Pérdida de peso", "anagarcia", pwd_context.hash("ana2025"), "2025-09-15"), ("Carlos Sánchez", "Ganancia muscular", "csanchez", pwd_context.hash("carlosfit"), "2025-10-05")]
-        cursor.executemany("INSERT INTO users (nombre, objetivo, username, password_hash, fecha_registro) VALUES (?, ?, ?, ?, ?)", sample_users)
-    conn.commit()
-    conn.close()
-
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-# --- LÓGICA DE BORRADORES ---
-def get_draft(user_id):
-    conn = get_db_connection()
-    draft = conn.execute("SELECT draft_data FROM drafts WHERE user_id = ?", (user_id,)).fetchone()
-    conn.close()
-    return json.loads(draft['draft_data']) if draft else None
-
-def save_draft(user_id, data):
-    conn = get_db_connection()
-    conn.execute("REPLACE INTO drafts (user_id, draft_data, last_updated) VALUES (?, ?, ?)", (user_id, json.dumps(data), datetime.datetime.now().isoformat()))
-    conn.commit()
-    conn.close()
-
-def delete_draft(user_id):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM drafts WHERE user_id = ?", (user_id,))
-    conn.commit()
-    conn.close()
+    """Migra y siembra la base una sola vez por proceso; en los reruns es un acierto de caché."""
+    version = db.migrate()
+    seed_sample_users()
+    return version
+
+@st.cache_resource
+def get_client_directory():
+    """Directorio id→nombre de clientes; solo relee users cuando cambia su contador."""
+    return ClientDirectory(db.list_clients, db.users_version)
 
 # --- GESTIÓN DE NAVEGACIÓN ---
 if 'page' not in st.session_state:
@@ -179,12 +257,23 @@ def page_crear_entrenamiento():
 
     if st.session_state.wizard_step == 1:
         st.subheader("Paso 1: Cliente y Fecha")
-        conn = get_db_connection()
-        clientes = pd.read_sql_query("SELECT id, nombre FROM users", conn)
-        conn.close()
-        if clientes.empty: st.warning("No hay clientes registrados."); return
-
-        cliente_id = st.selectbox("Selecciona el cliente", clientes['id'], format_func=lambda x: clientes[clientes['id'] == x]['nombre'].iloc[0])
+        directorio = get_client_directory().refresh()
+        if not len(directorio): st.warning("No hay clientes registrados."); return
+
+        busqueda = st.text_input("Buscar cliente", key='wizard_client_query', placeholder="Nombre o parte del nombre",
+                                 on_change=lambda: st.session_state.update(wizard_client_page=0))
+        resultados = directorio.search(busqueda)
+        if not resultados: st.warning("Ningún cliente coincide con la búsqueda."); return
+
+        pagina, st.session_state.wizard_client_page, paginas = paginate(resultados, st.session_state.get('wizard_client_page', 0))
+        cliente_id = st.selectbox("Selecciona el cliente", [cid for cid, _ in pagina], format_func=directorio.name)
+        if paginas > 1:
+            c1, c2, c3 = st.columns([1, 2, 1])
+            if c1.button("◀ Anteriores", disabled=st.session_state.wizard_client_page == 0):
+                st.session_state.wizard_client_page -= 1; st.rerun()
+            c2.caption(f"Página {st.session_state.wizard_client_page + 1} de {paginas} · {len(resultados)} clientes")
+            if c3.button("Siguientes ▶", disabled=st.session_state.wizard_client_page == paginas - 1):
+                st.session_state.wizard_client_page += 1; st.rerun()
         
         draft = get_draft(cliente_id)
         if draft:
@@ -200,7 +289,7 @@ def page_crear_entrenamiento():
         
         data = st.session_state.wizard_data
         data['user_id'] = cliente_id
-        data['client_name'] = clientes[clientes['id'] == cliente_id]['nombre'].iloc[0]
+        data['client_name'] = directorio.name(cliente_id)
         
         try: date_val = datetime.datetime.fromisoformat(data['fecha_creacion']).date()
         except: date_val = datetime.date.today()
@@ -228,31 +317,139 @@ def page_crear_entrenamiento():
         if c2.button("💾 Guardar Borrador"): save_draft(data['user_id'], data); st.toast("¡Borrador guardado!")
         if c3.button("✅ Finalizar y Guardar en Drive", type="primary"):
             try:
-                conn = get_db_connection()
-                conn.execute("INSERT INTO entrenamientos (user_id, fecha_creacion, dia_semana, objetivo_sesion, warmup_general, specific_warmup, fuerza, trabajo_especifico, conditioning, anotaciones_coach) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (data['user_id'], data['fecha_creacion'], data.get('dia_semana'), data.get('objetivo_sesion'), data.get('warmup_general'), data.get('specific_warmup'), data.get('fuerza'), data.get('trabajo_especifico'), data.get('conditioning'), data.get('anotaciones_coach')))
-                conn.commit(); conn.close()
-                st.success("Entrenamiento guardado en la base de datos local.")
-
-                with st.spinner("Conectando con Google Drive..."):
-                    drive = authenticate_gdrive()
-                    if drive:
-                        link = create_training_file_in_drive(drive, data['client_name'], data)
-                        if link: st.success(f"¡Entrenamiento guardado en Google Drive! [Ver archivo]({link})", icon="✅")
-                
-                delete_draft(data['user_id'])
+                db.finalize_training(data)
+                st.success("Entrenamiento guardado. Se subirá a Google Drive en segundo plano.")
+                if not start_drive_outbox():
+                    st.info("Google Drive aún no está autorizado: la subida queda pendiente en «📤 Subidas a Drive».")
+                get_drive_outbox().wake()
                 st.balloons()
                 for key in list(st.session_state.keys()):
                     if key.startswith('wizard_'): del st.session_state[key]
                 
             except Exception as e: st.error(f"Error al guardar: {e}")
 
+def page_buscar_historial():
+    if st.button("⬅️ Volver al inicio"):
+        set_page('inicio'); st.rerun()
+
+    st.title("🔎 Buscar en el historial")
+    texto = st.text_input("Busca en todas las sesiones (objetivo, fuerza, conditioning, notas...)", placeholder="Ej: bulgarian split squat")
+    if not texto.strip():
+        return
+
+    resultados = db.search_trainings(texto)
+    if not resultados:
+        st.info("No hay sesiones que coincidan con la búsqueda."); return
+
+    st.caption(f"{len(resultados)} resultado(s), ordenados por relevancia")
+    for r in resultados:
+        st.markdown(f"**{r['nombre'] or 'Cliente eliminado'}** · {r['fecha_creacion']}")
+        st.markdown(r['snippet'], unsafe_allow_html=True)
+        st.divider()
+
+def page_progreso():
+    if st.button("⬅️ Volver al inicio"):
+        set_page('inicio'); st.rerun()
+
+    st.title("📈 Progreso de los clientes")
+    import training_load  # pandas y NumPy solo se cargan en esta página
+
+    clientes = db.series_clients()
+    if not clientes:
+        st.info("Todavía no hay series registradas. Se extraen de cada entrenamiento al finalizarlo."); return
+
+    cliente = st.selectbox("Cliente", clientes)
+    frame = training_load.load_frame(cliente)  # solo las series del cliente elegido
+
+    semanal = training_load.weekly_volume(frame).set_index('semana')
+    st.subheader("Volumen semanal")
+    c1, c2 = st.columns(2)
+    c1.caption("Tonelaje (kg)"); c1.bar_chart(semanal['tonelaje_kg'])
+    c2.caption("Repeticiones"); c2.bar_chart(semanal['repeticiones'])
+
+    tendencia = training_load.e1rm_trend(frame)
+    if not tendencia.empty:
+        st.subheader("1RM estimado (Epley)")
+        ejercicios = tendencia['ejercicio'].value_counts().index.tolist()
+        elegidos = st.multiselect("Ejercicios", ejercicios, default=ejercicios[:3])
+        tendencia = tendencia[tendencia['ejercicio'].isin(elegidos)]
+        st.line_chart(tendencia.pivot(index='semana', columns='ejercicio', values='e1rm_kg'))
+
+    st.subheader("Tonelaje por ejercicio")
+    st.dataframe(training_load.tonnage_by_exercise(frame).drop(columns='cliente'), hide_index=True, use_container_width=True)
+
+def _format_time(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).strftime("%d/%m %H:%M:%S") if timestamp else "—"
+
+def page_subidas_drive():
+    if st.button("⬅️ Volver al inicio"):
+        set_page('inicio'); st.rerun()
+
+    st.title("📤 Subidas a Google Drive")
+    outbox = get_drive_outbox()
+    if not start_drive_outbox():
+        st.warning("Las subidas están en pausa hasta que se autorice Google Drive.")
+        authenticate_gdrive()
+        return
+
+    pendientes = db.outbox_status()
+    estadisticas = outbox.stats()
+    st.caption(f"Subidos en esta ejecución: {estadisticas['sent']} · intentos fallidos: {estadisticas['failed']} · "
+               f"último lote: {_format_time(estadisticas['last_batch_at'])}")
+    if not pendientes:
+        st.success("No hay entrenamientos pendientes de subir."); return
+
+    if st.button("🔁 Reintentar ahora", type="primary"):
+        db.retry_outbox_now(); outbox.wake()
+        st.toast("Reintentando las subidas pendientes..."); st.rerun()
+
+    filas = ["| Cliente | Sesión | Finalizado | Intentos | Próximo intento | Último error |", "|---|---|---|---:|---|---|"]
+    for r in pendientes:
+        error = (r['ultimo_error'] or '').replace('|', '/')[:120]
+        filas.append(f"| {r['cliente']} | {r['fecha_creacion']} | {_format_time(r['creado'])} | {r['intentos']} | "
+                     f"{_format_time(r['proximo_intento'])} | {error} |")
+    st.markdown("\n".join(filas))
+
+def page_importar_drive():
+    if st.button("⬅️ Volver al inicio"):
+        set_page('inicio'); st.rerun()
+
+    st.title("📥 Importar el archivo de Google Drive")
+    st.caption(f"Vuelca los entrenamientos finalizados (.html) de «{MAIN_FOLDER_NAME}» en la base local, dando de alta "
+               "los clientes que falten. Si se interrumpe, la siguiente importación sigue donde se quedó; después "
+               "solo se descargan los archivos nuevos o modificados.")
+    storage = open_storage()
+    if storage is None:
+        return
+    if not st.button("📥 Importar", type="primary"):
+        return
+    from drive_import import import_tree  # solo se cargan al importar
+    from drive_index import walk_tree
+
+    with st.spinner("Listando el archivo de Google Drive..."):
+        main_folder_id = storage.find_folder(MAIN_FOLDER_NAME)
+        tree = walk_tree(storage, main_folder_id) if main_folder_id else {}
+    progress = st.progress(0.0, text="Importando entrenamientos...")
+
+    def on_progress(done, total):
+        progress.progress(done / total if total else 1.0, text=f"{done} de {total} archivos")
+
+    result = import_tree(storage, tree, on_progress=on_progress)
+    st.success(f"Importación terminada: {result['imported']} entrenamiento(s) nuevo(s), {result['updated']} actualizado(s) "
+               f"y {result['skipped']} ya al día.")
+    if result['errors']:
+        st.error(f"No se pudieron importar {len(result['errors'])} archivo(s); se reintentarán en la próxima importación.")
+        for error in result['errors']:
+            st.caption(error)
+
 def page_centro_control():
     # ... (código del centro de control sin cambios)
     pass
 
 # --- ROUTER PRINCIPAL DE LA APLICACIÓN ---
 def main():
-    init_db() # Asegura que la DB siempre esté lista
+    with startup_profiler.stage("init_db"):
+        init_db() # Solo trabaja en el primer rerun del proceso
 
     # El router decide qué página mostrar
     pages = {
@@ -261,7 +458,21 @@ def main():
         'ver_clientes': page_ver_clientes,
         'crear_entrenamiento': page_crear_entrenamiento,
         'centro_control': page_centro_control,
+        'buscar': page_buscar_historial,
+        'progreso': page_progreso,
+        'subidas': page_subidas_drive,
+        'importar': page_importar_drive,
     }
+    # Sube lo que quedara en el outbox (también tras un reinicio) si Drive ya está autorizado
+    start_drive_outbox()
+    st.sidebar.button("🔎 Buscar en el historial", on_click=set_page, args=('buscar',), use_container_width=True)
+    st.sidebar.button("📈 Progreso de los clientes", on_click=set_page, args=('progreso',), use_container_width=True)
+    st.sidebar.button("📤 Subidas a Drive", on_click=set_page, args=('subidas',), use_container_width=True)
+    st.sidebar.button("📥 Importar desde Drive", on_click=set_page, args=('importar',), use_container_width=True)
+    pendientes, fallidas = db.outbox_counts()
+    if pendientes:
+        st.sidebar.caption(f"⏳ {pendientes} entrenamiento(s) pendiente(s) de subir a Drive"
+                           + (f" · {fallidas} con errores" if fallidas else ""))
     pages[st.session_state.page]()
 
 if __name__ == "__main__":
@@ -0,0 +1,111 @@
+"""Perfilador del arranque en frío de las apps.
+
+Con JCT_PROFILE_STARTUP=1 en el entorno, install_from_env() engancha un finder en
+sys.meta_path que mide cuánto tarda en ejecutarse cada módulo importado (tiempo
+acumulado, con sus dependencias, y tiempo propio). stage() mide además los
+pasos de inicialización (migraciones, abrir el almacenamiento...) la primera
+vez que se ejecutan. report() devuelve ambas cosas para mostrarlas en la app.
+
+Sin la variable de entorno no se instala nada y stage() solo cuesta una
+comprobación, así que puede quedarse en el código.
+"""
+import importlib.abc
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+ENV_VAR = "JCT_PROFILE_STARTUP"
+
+_lock = threading.Lock()
+_local = threading.local()
+_imports = {}  # módulo -> [acumulado, propio] en segundos
+_stages = {}  # paso -> segundos (solo la primera ejecución)
+_finder = None
+
+
+class _TimingLoader(importlib.abc.Loader):
+    """Envuelve el loader real y mide exec_module descontando los imports anidados."""
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        stack = _local.__dict__.setdefault('stack', [])
+        stack.append(0.0)  # tiempo de los hijos
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with _lock:
+                _imports[module.__name__] = [elapsed, elapsed - children]
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimingLoader(spec.loader)
+                return spec
+        return None
+
+
+def install():
+    """Empieza a medir los imports a partir de ahora (idempotente)."""
+    global _finder
+    if _finder is None:
+        _finder = _TimingFinder()
+        sys.meta_path.insert(0, _finder)
+
+
+def install_from_env():
+    if os.environ.get(ENV_VAR) == "1":
+        install()
+
+
+def enabled():
+    return _finder is not None
+
+
+@contextmanager
+def stage(name):
+    """Mide un paso de inicialización; solo cuenta la primera vez que se ejecuta."""
+    if _finder is None or name in _stages:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _stages.setdefault(name, time.perf_counter() - start)
+
+
+def report(top=25):
+    """{'imports': [(módulo, acumulado_ms, propio_ms)], 'stages': [(paso, ms)], 'import_total_ms'}.
+
+    import_total_ms suma los tiempos propios de todos los módulos medidos.
+    """
+    with _lock:
+        imports = sorted(_imports.items(), key=lambda item: item[1][0], reverse=True)
+        stages = list(_stages.items())
+    return {
+        'imports': [(name, round(c * 1000, 1), round(s * 1000, 1)) for name, (c, s) in imports[:top]],
+        'stages': [(name, round(seconds * 1000, 1)) for name, seconds in stages],
+        'import_total_ms': round(sum(s for _, (_, s) in imports) * 1000, 1),
+    }
@@ -0,0 +1,652 @@
+"""Backends de almacenamiento para el panel del entrenador.
+
+app.py solo usa las operaciones de StorageBackend: buscar/crear carpetas,
+listar hijos (de una vez o por páginas, con iter_children), leer y escribir contenido, borrar, obtener metadatos (incluido el
+enlace) y el feed de cambios que usa drive_index.py. Hay tres implementaciones:
+
+- DriveBackend: Google Drive a través de PyDrive2 (la de producción).
+- LocalBackend: un directorio del disco, útil para trabajar sin conexión.
+- MemoryBackend: en memoria, con latencia simulada y contador de llamadas,
+  para pruebas y benchmarks.
+
+Todos devuelven los archivos como diccionarios con las claves de file_metadata()
+y traducen los errores de Drive a NotFoundError, RateLimitedError y
+TransientError (ver drive_error), que drive_scheduler.py usa para reintentar.
+"""
+import datetime
+import itertools
+import json
+import mimetypes
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+FILE_FIELDS = "id,title,mimeType,parents(id),labels(trashed),alternateLink,modifiedDate,properties(key,value)"
+LIST_FIELDS = "id,title,mimeType,parents(id),labels(trashed),alternateLink,modifiedDate"  # sin properties
+LIST_PAGE_SIZE = 200
+IN_FLIGHT_PER_WORKER = 2  # descargas encoladas por hilo en iter_downloads
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+
+class NotFoundError(Exception):
+    """El archivo o carpeta no existe (o está en la papelera)."""
+
+
+class TransientError(Exception):
+    """Fallo temporal de Drive (un 5xx): la misma petición puede funcionar más tarde."""
+
+    def __init__(self, message, status=None, reason=None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+
+
+class RateLimitedError(TransientError):
+    """Drive ha rechazado la petición por exceso de ritmo (403 rateLimitExceeded o 429)."""
+
+
+def drive_error(status, reason, message):
+    """Excepción de este módulo para un error HTTP de Drive, o None si no tiene equivalente."""
+    if status == 404:
+        return NotFoundError(message)
+    if status == 429 or (status == 403 and reason in RATE_LIMIT_REASONS):
+        return RateLimitedError(message, status, reason)
+    if status >= 500:
+        return TransientError(message, status, reason)
+    return None
+
+
+def _error_reason(error):
+    """El 'reason' del primer error de una respuesta de Drive ({'errors': [{'reason': ...}]})."""
+    try:
+        return error['errors'][0]['reason']
+    except (KeyError, IndexError, TypeError):
+        return ''
+
+
+def file_metadata(f):
+    """Normaliza los metadatos de un archivo de Drive (dict o GoogleDriveFile)."""
+    return {
+        'id': f['id'],
+        'title': f['title'],
+        'mimeType': f.get('mimeType', ''),
+        'parents': [p['id'] for p in f.get('parents', [])],
+        'alternateLink': f.get('alternateLink', ''),
+        'modifiedDate': f.get('modifiedDate', ''),
+        'trashed': f.get('labels', {}).get('trashed', False),
+        'properties': {p['key']: p['value'] for p in f.get('properties', [])},
+    }
+
+
+def iter_children(backend, parent_ids, title=None, page_size=LIST_PAGE_SIZE, fields=LIST_FIELDS):
+    """Generador con los hijos de parent_ids, pidiendo una página de page_size cada vez.
+
+    La siguiente página solo se pide cuando se ha consumido la anterior, así que
+    quien se quede con los primeros resultados no descarga el resto. Por defecto
+    se piden los campos de LIST_FIELDS (sin properties).
+    """
+    page_token = None
+    while True:
+        files, page_token = backend.list_page(parent_ids, title, page_size=page_size, page_token=page_token, fields=fields)
+        yield from files
+        if not page_token:
+            return
+
+
+def iter_downloads(backend, items, max_workers, file_id=lambda item: item['id']):
+    """Descarga el texto de items con max_workers descargas simultáneas y genera (item, future) según terminan.
+
+    Solo hay max_workers * IN_FLIGHT_PER_WORKER descargas encoladas a la vez, así
+    que si quien consume va más lento (escribir un ZIP, guardar en SQLite) no se
+    acumulan archivos en memoria. Si deja de iterar, las pendientes se cancelan.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        queue = iter(items)
+        in_flight = {}
+
+        def submit_next():
+            item = next(queue, None)
+            if item is not None:
+                in_flight[pool.submit(backend.read_text, file_id(item))] = item
+
+        try:
+            for _ in range(max_workers * IN_FLIGHT_PER_WORKER):
+                submit_next()
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    item = in_flight.pop(future)
+                    submit_next()  # la siguiente descarga empieza mientras se procesa esta
+                    yield item, future
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+def _now_iso():
+    return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+class StorageBackend:
+    """Interfaz común. Los IDs son opacos para app.py."""
+
+    name = "base"
+
+    @property
+    def identity(self):
+        """Identifica los datos a los que accede el backend: dos backends con la misma
+        identidad ven los mismos archivos (drive_scheduler agrupa sus lecturas)."""
+        return self
+
+    def find_folder(self, title, parent_id=None):
+        """ID de la carpeta con ese título (dentro de parent_id, si se indica), o None."""
+        raise NotImplementedError
+
+    def create_folder(self, title, parent_id=None):
+        """Crea una carpeta y devuelve sus metadatos."""
+        raise NotImplementedError
+
+    def list_children(self, parent_ids, title=None):
+        """Archivos no borrados cuyo padre está en parent_ids (opcionalmente con ese título)."""
+        raise NotImplementedError
+
+    def list_page(self, parent_ids, title=None, page_size=LIST_PAGE_SIZE, page_token=None, fields=FILE_FIELDS):
+        """Una página de list_children: devuelve (archivos, token de la siguiente o None).
+
+        fields indica qué metadatos hacen falta; los backends que no cobran por
+        campo pueden devolverlos todos.
+        """
+        raise NotImplementedError
+
+    def get_metadata(self, file_id):
+        """Metadatos de un archivo. Lanza NotFoundError si no existe."""
+        raise NotImplementedError
+
+    def read_text(self, file_id):
+        """Contenido de un archivo como texto. Lanza NotFoundError si no existe."""
+        raise NotImplementedError
+
+    def write_text(self, parent_id, title, content, mime_type=None, file_id=None, properties=None):
+        """Crea un archivo (o reemplaza el contenido de file_id) y devuelve sus metadatos.
+
+        properties son pares clave/valor propios de la app que se guardan con el
+        archivo (en Drive, propiedades privadas) y vuelven en metadatos['properties'].
+        """
+        raise NotImplementedError
+
+    def delete(self, file_id):
+        """Borra un archivo."""
+        raise NotImplementedError
+
+    def get_link(self, file_id):
+        """Enlace para abrir el archivo."""
+        return self.get_metadata(file_id)['alternateLink']
+
+    def start_page_token(self):
+        """Token a partir del cual changes() devolverá los cambios."""
+        raise NotImplementedError
+
+    def changes(self, page_token):
+        """Devuelve (eventos, nuevo_token). Cada evento es {'id', 'removed', 'file'}."""
+        raise NotImplementedError
+
+
+# --- GOOGLE DRIVE ---
+
+class DriveBackend(StorageBackend):
+    """Backend sobre un objeto GoogleDrive de PyDrive2.
+
+    http_pool, si se indica, es un context manager que presta un objeto HTTP
+    autorizado por petición (drive_client.DriveClient.http); si no, se usa uno
+    por hilo como hace PyDrive2.
+    """
+
+    name = "drive"
+
+    def __init__(self, drive, http_pool=None):
+        self.drive = drive
+        self.http_pool = http_pool
+
+    @property
+    def identity(self):
+        # El GoogleDrive de drive_client.DriveClient es el mismo para todas las sesiones
+        return ('drive', self.drive)
+
+    @contextmanager
+    def _http(self):
+        if self.http_pool is not None:
+            with self.http_pool() as http:
+                yield http
+            return
+        # Mismo criterio que PyDrive2: un objeto HTTP por hilo.
+        auth = self.drive.auth
+        if not getattr(auth.thread_local, "http", None):
+            auth.thread_local.http = auth.Get_Http_Object()
+        yield auth.thread_local.http
+
+    def _execute(self, request):
+        from googleapiclient.errors import HttpError
+
+        try:
+            with self._http() as http:
+                return request.execute(http=http)
+        except HttpError as e:
+            try:
+                reason = _error_reason(json.loads(e.content)['error'])
+            except (ValueError, KeyError, TypeError):
+                reason = ''
+            error = drive_error(e.resp.status, reason, str(e))
+            if error is None:
+                raise
+            raise error from e
+
+    def _call(self, operation):
+        """Ejecuta una operación de PyDrive2 (Upload, Delete...) con un objeto HTTP prestado."""
+        from pydrive2.files import ApiRequestError
+
+        try:
+            with self._http() as http:
+                return operation(param={'http': http})
+        except ApiRequestError as e:
+            error = drive_error(e.error.get('code', 0), _error_reason(e.error), str(e))
+            if error is None:
+                raise
+            raise error from e
+
+    def _query(self, query, fields=FILE_FIELDS):
+        files, page_token = [], None
+        while True:
+            response = self._execute(self.drive.auth.service.files().list(
+                q=query, maxResults=1000, pageToken=page_token, fields=f"nextPageToken,items({fields})",
+            ))
+            files += [file_metadata(f) for f in response.get('items', [])]
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return files
+
+    def find_folder(self, title, parent_id=None):
+        query = f"title='{title}' and mimeType='{FOLDER_MIME_TYPE}' and trashed=false"
+        if parent_id:
+            query += f" and '{parent_id}' in parents"
+        folders = self._query(query)
+        return folders[0]['id'] if folders else None
+
+    def create_folder(self, title, parent_id=None):
+        metadata = {'title': title, 'mimeType': FOLDER_MIME_TYPE}
+        if parent_id:
+            metadata['parents'] = [{'id': parent_id}]
+        folder = self.drive.CreateFile(metadata)
+        self._call(folder.Upload)
+        return file_metadata(folder)
+
+    @staticmethod
+    def _children_query(parent_ids, title):
+        parents = " or ".join(f"'{parent_id}' in parents" for parent_id in parent_ids)
+        query = f"({parents}) and trashed=false"
+        if title is not None:
+            query += f" and title='{title}'"
+        return query
+
+    def list_children(self, parent_ids, title=None):
+        return self._query(self._children_query(parent_ids, title))
+
+    def list_page(self, parent_ids, title=None, page_size=LIST_PAGE_SIZE, page_token=None, fields=FILE_FIELDS):
+        request = self.drive.auth.service.files().list(
+            q=self._children_query(parent_ids, title), maxResults=page_size, pageToken=page_token,
+            fields=f"nextPageToken,items({fields})",
+        )
+        response = self._execute(request)
+        return [file_metadata(f) for f in response.get('items', [])], response.get('nextPageToken')
+
+    def get_metadata(self, file_id):
+        request = self.drive.auth.service.files().get(fileId=file_id, fields=FILE_FIELDS)
+        metadata = file_metadata(self._execute(request))
+        if metadata['trashed']:
+            raise NotFoundError(file_id)
+        return metadata
+
+    def read_text(self, file_id):
+        request = self.drive.auth.service.files().get_media(fileId=file_id)
+        return self._execute(request).decode('utf-8')
+
+    def write_text(self, parent_id, title, content, mime_type=None, file_id=None, properties=None):
+        if file_id:
+            f = self.drive.CreateFile({'id': file_id})
+        else:
+            metadata = {'title': title, 'parents': [{'id': parent_id}]}
+            if mime_type:
+                metadata['mimeType'] = mime_type
+            f = self.drive.CreateFile(metadata)
+        if properties:
+            f['properties'] = [{'key': k, 'value': v, 'visibility': 'PRIVATE'} for k, v in properties.items()]
+        f.SetContentString(content, 'utf-8')
+        self._call(f.Upload)
+        return file_metadata(f)
+
+    def delete(self, file_id):
+        self._call(self.drive.CreateFile({'id': file_id}).Delete)
+
+    def start_page_token(self):
+        return self._execute(self.drive.auth.service.changes().getStartPageToken())['startPageToken']
+
+    def changes(self, page_token):
+        service = self.drive.auth.service
+        events = []
+        while True:
+            response = self._execute(service.changes().list(
+                pageToken=page_token, includeDeleted=True, maxResults=1000,
+                fields=f"nextPageToken,newStartPageToken,items(fileId,deleted,file({FILE_FIELDS}))",
+            ))
+            for item in response.get('items', []):
+                removed = item.get('deleted', False) or 'file' not in item
+                events.append({'id': item['fileId'], 'removed': removed,
+                               'file': None if removed else file_metadata(item['file'])})
+            if 'newStartPageToken' in response:
+                return events, response['newStartPageToken']
+            page_token = response['nextPageToken']
+
+
+# --- EN MEMORIA ---
+
+class MemoryBackend(StorageBackend):
+    """Backend en memoria con latencia inyectable.
+
+    Cada operación suma `latency` segundos a simulated_latency (y los duerme de
+    verdad si sleep=True) y se cuenta en calls, para medir viajes de ida y vuelta.
+    inject_errors() hace fallar las siguientes llamadas como lo haría Drive.
+    """
+
+    name = "memory"
+
+    def __init__(self, latency=0.0, sleep=False):
+        self.latency = latency
+        self.sleep = sleep
+        self.files = {}
+        self.contents = {}
+        self.log = []
+        self.calls = Counter()
+        self.simulated_latency = 0.0
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._faults = deque()
+
+    def inject_errors(self, *statuses, operation=None, reason='rateLimitExceeded'):
+        """Las próximas llamadas (a operation, o a cualquiera) fallarán con esos códigos HTTP, en orden.
+
+        Los 403 llevan `reason` (por defecto, el de exceso de ritmo de Drive).
+        """
+        with self._lock:
+            self._faults.extend((operation, status, reason if status == 403 else '') for status in statuses)
+
+    def _hit(self, operation):
+        with self._lock:
+            self.calls[operation] += 1
+            self.simulated_latency += self.latency
+            fault = None
+            if self._faults and self._faults[0][0] in (None, operation):
+                fault = self._faults.popleft()
+        if self.sleep and self.latency:
+            time.sleep(self.latency)
+        if fault is not None:
+            _, status, reason = fault
+            message = f"HTTP {status} simulado en {operation}" + (f" ({reason})" if reason else "")
+            raise drive_error(status, reason, message) or RuntimeError(message)
+
+    def _put(self, meta, content=None):
+        meta = dict(meta, modifiedDate=_now_iso())
+        self.files[meta['id']] = meta
+        if content is not None:
+            self.contents[meta['id']] = content
+        self.log.append({'id': meta['id'], 'removed': False, 'file': dict(meta)})
+        return dict(meta)
+
+    def _new(self, title, parent_id, mime_type):
+        file_id = f"mem{next(self._ids)}"
+        return {'id': file_id, 'title': title, 'mimeType': mime_type,
+                'parents': [parent_id] if parent_id else [], 'alternateLink': f"memory://{file_id}",
+                'modifiedDate': '', 'trashed': False, 'properties': {}}
+
+    def find_folder(self, title, parent_id=None):
+        self._hit('find_folder')
+        with self._lock:
+            for f in self.files.values():
+                if f['title'] == title and f['mimeType'] == FOLDER_MIME_TYPE and (parent_id is None or parent_id in f['parents']):
+                    return f['id']
+        return None
+
+    def create_folder(self, title, parent_id=None):
+        self._hit('create_folder')
+        with self._lock:
+            return self._put(self._new(title, parent_id, FOLDER_MIME_TYPE))
+
+    def list_children(self, parent_ids, title=None):
+        self._hit('list_children')
+        parent_ids = set(parent_ids)
+        with self._lock:
+            return [dict(f) for f in self.files.values()
+                    if parent_ids & set(f['parents']) and (title is None or f['title'] == title)]
+
+    def list_page(self, parent_ids, title=None, page_size=LIST_PAGE_SIZE, page_token=None, fields=FILE_FIELDS):
+        self._hit('list_page')
+        parent_ids = set(parent_ids)
+        start = int(page_token or 0)
+        with self._lock:
+            matches = [f for f in self.files.values()
+                       if parent_ids & set(f['parents']) and (title is None or f['title'] == title)]
+            page = [dict(f) for f in matches[start:start + page_size]]
+        more = start + page_size < len(matches)
+        return page, str(start + page_size) if more else None
+
+    def get_metadata(self, file_id):
+        self._hit('get_metadata')
+        with self._lock:
+            if file_id not in self.files:
+                raise NotFoundError(file_id)
+            return dict(self.files[file_id])
+
+    def read_text(self, file_id):
+        self._hit('read_text')
+        with self._lock:
+            if file_id not in self.files:
+                raise NotFoundError(file_id)
+            return self.contents.get(file_id, '')
+
+    def write_text(self, parent_id, title, content, mime_type=None, file_id=None, properties=None):
+        self._hit('write_text')
+        with self._lock:
+            if file_id:
+                if file_id not in self.files:
+                    raise NotFoundError(file_id)
+                meta = self.files[file_id]
+            elif parent_id not in self.files:
+                raise NotFoundError(parent_id)
+            else:
+                meta = self._new(title, parent_id, mime_type or 'application/octet-stream')
+            return self._put(dict(meta, properties=dict(meta['properties'], **(properties or {}))), content)
+
+    def delete(self, file_id):
+        self._hit('delete')
+        with self._lock:
+            if self.files.pop(file_id, None) is None:
+                raise NotFoundError(file_id)
+            self.contents.pop(file_id, None)
+            self.log.append({'id': file_id, 'removed': True, 'file': None})
+
+    def start_page_token(self):
+        self._hit('start_page_token')
+        with self._lock:
+            return str(len(self.log))
+
+    def changes(self, page_token):
+        self._hit('changes')
+        with self._lock:
+            return list(self.log[int(page_token):]), str(len(self.log))
+
+
+# --- DIRECTORIO LOCAL ---
+
+class LocalBackend(StorageBackend):
+    """Backend sobre un directorio local. Los IDs son rutas relativas a la raíz.
+
+    Un sistema de archivos no tiene feed de cambios, así que changes() compara el
+    directorio con el último recorrido que se hizo. Las propiedades de los
+    archivos se guardan aparte, en PROPERTIES_FILE dentro de la raíz.
+    """
+
+    name = "local"
+    PROPERTIES_FILE = ".jct-properties.json"
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._properties_lock = threading.Lock()
+        self._properties = None  # copia en memoria de PROPERTIES_FILE
+        self._scans = {}
+        self._tokens = itertools.count(1)
+
+    @property
+    def identity(self):
+        return ('local', self.root)
+
+    def _path(self, file_id):
+        return os.path.join(self.root, *file_id.split('/')) if file_id else self.root
+
+    def _meta(self, file_id):
+        path = self._path(file_id)
+        if not file_id or not os.path.exists(path):
+            raise NotFoundError(file_id)
+        is_dir = os.path.isdir(path)
+        parent, _, title = file_id.rpartition('/')
+        if is_dir:
+            mime_type = FOLDER_MIME_TYPE
+        else:
+            mime_type = mimetypes.guess_type(title)[0] or 'application/octet-stream'
+        modified = datetime.datetime.fromtimestamp(os.path.getmtime(path), datetime.timezone.utc)
+        return {'id': file_id, 'title': title, 'mimeType': mime_type, 'parents': [parent] if parent else [],
+                'alternateLink': 'file://' + path, 'modifiedDate': modified.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
+                'trashed': False, 'properties': self._load_properties().get(file_id, {})}
+
+    def _load_properties(self):
+        if self._properties is None:
+            try:
+                with open(os.path.join(self.root, self.PROPERTIES_FILE), 'r', encoding='utf-8') as f:
+                    self._properties = json.load(f)
+            except FileNotFoundError:
+                self._properties = {}
+        return self._properties
+
+    def _update_properties(self, file_id, properties):
+        """Fusiona (o, con properties=None, borra) las propiedades de file_id."""
+        with self._properties_lock:
+            stored = dict(self._load_properties())
+            if properties is None:
+                if stored.pop(file_id, None) is None:
+                    return
+            else:
+                stored[file_id] = dict(stored.get(file_id, {}), **properties)
+            self._properties = stored
+            path = os.path.join(self.root, self.PROPERTIES_FILE)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(stored, f)
+            os.replace(path + '.tmp', path)
+
+    def _child_id(self, parent_id, title):
+        return f"{parent_id}/{title}" if parent_id else title
+
+    def find_folder(self, title, parent_id=None):
+        file_id = self._child_id(parent_id, title)
+        return file_id if os.path.isdir(self._path(file_id)) else None
+
+    def create_folder(self, title, parent_id=None):
+        file_id = self._child_id(parent_id, title)
+        os.makedirs(self._path(file_id), exist_ok=True)
+        return self._meta(file_id)
+
+    def _children_ids(self, parent_ids, title):
+        for parent_id in parent_ids:
+            path = self._path(parent_id)
+            if not os.path.isdir(path):
+                continue
+            for name in sorted(os.listdir(path)):
+                if name == self.PROPERTIES_FILE:
+                    continue
+                if title is None or name == title:
+                    yield self._child_id(parent_id, name)
+
+    def list_children(self, parent_ids, title=None):
+        return [self._meta(file_id) for file_id in self._children_ids(parent_ids, title)]
+
+    def list_page(self, parent_ids, title=None, page_size=LIST_PAGE_SIZE, page_token=None, fields=FILE_FIELDS):
+        # Solo se leen del disco los metadatos de la página pedida
+        start = int(page_token or 0)
+        ids = list(self._children_ids(parent_ids, title))
+        page = [self._meta(file_id) for file_id in ids[start:start + page_size]]
+        return page, str(start + page_size) if start + page_size < len(ids) else None
+
+    def get_metadata(self, file_id):
+        return self._meta(file_id)
+
+    def read_text(self, file_id):
+        try:
+            with open(self._path(file_id), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError as e:
+            raise NotFoundError(file_id) from e
+
+    def write_text(self, parent_id, title, content, mime_type=None, file_id=None, properties=None):
+        file_id = file_id or self._child_id(parent_id, title)
+        path = self._path(file_id)
+        if not os.path.isdir(os.path.dirname(path)):
+            raise NotFoundError(parent_id)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        if properties:
+            self._update_properties(file_id, properties)
+        return self._meta(file_id)
+
+    def delete(self, file_id):
+        try:
+            os.remove(self._path(file_id))
+        except FileNotFoundError as e:
+            raise NotFoundError(file_id) from e
+        self._update_properties(file_id, None)
+
+    def _scan(self):
+        scan = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            rel = os.path.relpath(dirpath, self.root).replace(os.sep, '/')
+            rel = '' if rel == '.' else rel
+            for name in dirnames + filenames:
+                if name == self.PROPERTIES_FILE:
+                    continue
+                file_id = self._child_id(rel, name)
+                scan[file_id] = self._meta(file_id)
+        return scan
+
+    def start_page_token(self):
+        with self._lock:
+            token = str(next(self._tokens))
+            self._scans[token] = self._scan()
+            return token
+
+    def changes(self, page_token):
+        with self._lock:
+            previous = self._scans.pop(page_token, None)
+            current = self._scan()
+            token = str(next(self._tokens))
+            self._scans[token] = current
+        if previous is None:
+            # Token desconocido (p. ej. tras reiniciar): todo cuenta como modificado.
+            previous = {}
+        events = [{'id': file_id, 'removed': True, 'file': None} for file_id in previous if file_id not in current]
+        events += [{'id': file_id, 'removed': False, 'file': meta} for file_id, meta in current.items()
+                   if previous.get(file_id) != meta]
+        return events, token
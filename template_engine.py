@@ -0,0 +1,171 @@
+"""Motor de plantillas compilado para template.html.
+
+La plantilla se analiza con BeautifulSoup una sola vez por proceso (y otra vez
+solo si cambia la fecha de modificación del archivo). El resultado es una lista
+de fragmentos literales intercalados con los huecos de los ids conocidos, de
+modo que cada render es una simple concatenación de texto escapado.
+"""
+import datetime
+import html
+import os
+import threading
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "template.html")
+
+# Huecos de texto plano (se sustituyen con element.string = ...)
+TEXT_SLOTS = ['client_name', 'training_day', 'training_date']
+# Huecos multilínea (los saltos de línea se convierten en <br/>)
+SECTION_SLOTS = ['objetivo_sesion', 'warmup_general', 'specific_warmup', 'fuerza', 'trabajo_especifico', 'conditioning', 'anotaciones_coach']
+SLOT_IDS = TEXT_SLOTS + SECTION_SLOTS
+
+_MARKER = "@@JCT_SLOT_{}@@"
+
+_lock = threading.Lock()
+_compiled = {}  # ruta -> (mtime, fragmentos, huecos)
+
+
+def compile_template(source):
+    """Convierte el HTML de la plantilla en (fragmentos, huecos).
+
+    Se serializa con BeautifulSoup igual que hacía el render original, pero con un
+    marcador en cada hueco; así los fragmentos literales son idénticos byte a byte.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(source, "html.parser")
+    for slot_id in SLOT_IDS:
+        element = soup.find(id=slot_id)
+        if element:
+            element.string = _MARKER.format(slot_id)
+
+    serialized = str(soup)
+    chunks, slots = [], []
+    rest = serialized
+    while True:
+        positions = [(rest.find(_MARKER.format(s)), s) for s in SLOT_IDS]
+        positions = [(pos, s) for pos, s in positions if pos >= 0]
+        if not positions:
+            break
+        pos, slot_id = min(positions)
+        chunks.append(rest[:pos])
+        slots.append(slot_id)
+        rest = rest[pos + len(_MARKER.format(slot_id)):]
+    chunks.append(rest)
+    return chunks, slots
+
+
+def get_compiled_template(path=TEMPLATE_PATH):
+    """Devuelve la plantilla compilada, recompilándola si el archivo ha cambiado."""
+    mtime = os.stat(path).st_mtime_ns
+    cached = _compiled.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
+    with _lock:
+        cached = _compiled.get(path)
+        if not cached or cached[0] != mtime:
+            with open(path, "r", encoding="utf-8") as f:
+                chunks, slots = compile_template(f.read())
+            cached = _compiled[path] = (mtime, chunks, slots)
+    return cached[1], cached[2]
+
+
+def _escape_section(text):
+    """Escapa el texto de una sección y convierte los saltos de línea en <br/>."""
+    return "<br/>".join(html.escape(line, quote=False) for line in text.split("\n"))
+
+
+def slot_values(data, client_name):
+    """Calcula el contenido ya escapado de cada hueco a partir de los datos del entrenamiento."""
+    values = {
+        'client_name': html.escape(client_name, quote=False),
+        'training_day': html.escape(data.get('dia_semana', 'DÍA'), quote=False),
+        'training_date': datetime.datetime.fromisoformat(data['fecha_creacion']).strftime('%Y·%m·%d'),
+    }
+    for key in SECTION_SLOTS:
+        values[key] = _escape_section(data.get(key, ''))
+    return values
+
+
+def render(data, client_name, path=TEMPLATE_PATH):
+    """Rellena la plantilla compilada con los datos del entrenamiento y devuelve el HTML."""
+    chunks, slots = get_compiled_template(path)
+    values = slot_values(data, client_name)
+    parts = [chunks[0]]
+    for slot_id, chunk in zip(slots, chunks[1:]):
+        parts.append(values[slot_id])
+        parts.append(chunk)
+    return "".join(parts)
+
+
+# --- LECTURA DE HTML YA RENDERIZADOS ---
+
+_VOID_TAGS = {'br', 'img', 'hr', 'input', 'meta', 'link', 'wbr'}  # sin etiqueta de cierre
+
+
+class _SlotReader:
+    """Recoge el texto de los elementos con los ids de SLOT_IDS (<br/> como salto de línea).
+
+    Sus métodos son los manejadores de un html.parser.HTMLParser (ver parse).
+    """
+
+    def __init__(self):
+        self.values = {}
+        self._slot = None
+        self._depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self._slot is not None:
+            if tag == 'br':
+                self.values[self._slot].append("\n")
+            elif tag not in _VOID_TAGS:
+                self._depth += 1
+            return
+        slot_id = dict(attrs).get('id')
+        if slot_id in SLOT_IDS and slot_id not in self.values:
+            self._slot, self._depth = slot_id, 0
+            self.values[slot_id] = []
+
+    def handle_startendtag(self, tag, attrs):
+        if self._slot is not None and tag == 'br':
+            self.values[self._slot].append("\n")
+
+    def handle_endtag(self, tag):
+        if self._slot is None or tag in _VOID_TAGS:
+            return
+        if self._depth:
+            self._depth -= 1
+        else:
+            self._slot = None
+
+    def handle_data(self, data):
+        if self._slot is not None:
+            self.values[self._slot].append(data)
+
+
+def parse(source):
+    """Datos del entrenamiento (los de render) a partir de un HTML generado con la plantilla.
+
+    Devuelve un dict con 'client_name', 'dia_semana', 'fecha_creacion' (ISO) y
+    las secciones de SECTION_SLOTS, o None si el HTML no tiene los huecos de la
+    plantilla. Usa html.parser de la biblioteca estándar: se llama para miles de
+    archivos al importar el archivo de Drive.
+    """
+    from html.parser import HTMLParser  # no se carga al arrancar las apps
+
+    reader = _SlotReader()
+    parser = HTMLParser(convert_charrefs=True)
+    for handler in ('handle_starttag', 'handle_startendtag', 'handle_endtag', 'handle_data'):
+        setattr(parser, handler, getattr(reader, handler))
+    parser.feed(source)
+    parser.close()
+    values = {slot_id: "".join(parts) for slot_id, parts in reader.values.items()}
+    if not any(key in values for key in SECTION_SLOTS):
+        return None
+    data = {key: values.get(key, '') for key in SECTION_SLOTS}
+    data['client_name'] = values.get('client_name', '')
+    data['dia_semana'] = values.get('training_day', '')
+    try:
+        data['fecha_creacion'] = datetime.datetime.strptime(values.get('training_date', ''), '%Y·%m·%d').date().isoformat()
+    except ValueError:
+        data['fecha_creacion'] = None
+    return data
@@ -0,0 +1,85 @@
+"""Analítica de carga de entrenamiento sobre la tabla de series de db.py.
+
+Todo se calcula con operaciones vectorizadas de pandas/NumPy sobre columnas
+(sin recorrer las series una a una), así que años de historial de todos los
+clientes se resumen en milisegundos:
+
+- weekly_volume: series, repeticiones y tonelaje (kg) por cliente y semana;
+- tonnage_by_exercise: tonelaje, repeticiones y sesiones por cliente y ejercicio;
+- e1rm_trend: 1RM estimado (Epley) por cliente, ejercicio y semana.
+
+Las series con porcentaje del 1RM y sin carga en kg cuentan para el volumen
+pero no para el tonelaje ni para el 1RM estimado.
+
+Importa pandas y NumPy, que tardan en cargar: las apps solo deben importar este
+módulo dentro de las funciones que muestran el progreso.
+"""
+import numpy as np
+import pandas as pd
+
+import db
+
+E1RM_MAX_REPS = 12  # por encima de estas repeticiones la fórmula de Epley deja de ser fiable
+
+
+def _categorical(values):
+    """Categorical a partir de una lista de textos muy repetidos, convirtiendo solo los valores distintos."""
+    codes, uniques = pd.factorize(np.array(values, dtype=object))
+    return pd.Categorical.from_codes(codes, categories=pd.Index(uniques, dtype=object))
+
+
+def to_frame(columns):
+    """DataFrame tipado a partir de las columnas de db.load_series().
+
+    Cliente, ejercicio y fecha se repiten en muchas filas: se factorizan y solo se
+    convierten sus valores distintos (unos cientos de fechas en lugar de cientos
+    de miles). Los números pasan directamente a float64 de NumPy.
+    """
+    date_codes, dates = pd.factorize(np.array(columns['fecha'], dtype=object))
+    parsed = pd.to_datetime(pd.Series(dates, dtype=object), format='ISO8601', errors='coerce').to_numpy()
+    fecha = parsed[date_codes] if len(dates) else np.array([], dtype='datetime64[ns]')
+    frame = pd.DataFrame({
+        'cliente': _categorical(columns['cliente']),
+        'fecha': fecha,
+        'ejercicio': _categorical(columns['ejercicio']),
+        **{column: np.array(columns[column], dtype=float) for column in ('series', 'repeticiones', 'carga_kg', 'porcentaje')},
+    })
+    # Lunes de la semana de cada sesión (equivale a to_period('W-SUN'), pero sin objetos Period)
+    frame['semana'] = frame['fecha'].dt.normalize() - pd.to_timedelta(frame['fecha'].dt.weekday, unit='D')
+    frame['repeticiones_totales'] = frame['series'] * frame['repeticiones']
+    frame['tonelaje_kg'] = frame['repeticiones_totales'] * np.nan_to_num(frame['carga_kg'].to_numpy())
+    return frame[frame['fecha'].notna()]
+
+
+def load_frame(client_name=None, path=None):
+    """Series de un cliente (o de todos) como DataFrame listo para las funciones de este módulo."""
+    return to_frame(db.load_series(client_name, path))
+
+
+def weekly_volume(frame):
+    """Series, repeticiones y tonelaje por cliente y semana."""
+    return (frame.groupby(['cliente', 'semana'], sort=True, observed=True)
+            .agg(series=('series', 'sum'), repeticiones=('repeticiones_totales', 'sum'),
+                 tonelaje_kg=('tonelaje_kg', 'sum'))
+            .reset_index())
+
+
+def tonnage_by_exercise(frame):
+    """Tonelaje, repeticiones, sesiones y última fecha por cliente y ejercicio, de más a menos tonelaje."""
+    summary = (frame.groupby(['cliente', 'ejercicio'], sort=False, observed=True)
+               .agg(tonelaje_kg=('tonelaje_kg', 'sum'), repeticiones=('repeticiones_totales', 'sum'),
+                    sesiones=('fecha', 'nunique'), ultima_fecha=('fecha', 'max'))
+               .reset_index())
+    return summary.sort_values(['cliente', 'tonelaje_kg'], ascending=[True, False], ignore_index=True)
+
+
+def e1rm_trend(frame):
+    """Mejor 1RM estimado (Epley: carga × (1 + reps/30)) por cliente, ejercicio y semana."""
+    reps = frame['repeticiones'].to_numpy(dtype=float)
+    load = frame['carga_kg'].to_numpy(dtype=float)
+    valid = (load > 0) & (reps >= 1) & (reps <= E1RM_MAX_REPS)
+    # Con una repetición el 1RM es la propia carga
+    e1rm = np.where(reps == 1, load, load * (1.0 + reps / 30.0))
+    lifts = frame.loc[valid, ['cliente', 'ejercicio', 'semana']].assign(e1rm_kg=e1rm[valid].round(1))
+    return (lifts.groupby(['cliente', 'ejercicio', 'semana'], sort=True, observed=True)['e1rm_kg'].max()
+            .reset_index())